@@ -12,11 +12,17 @@
 #////                                                                       ///
 #//////////////////////////////////////////////////////////////////////////////
 #
-# Exports the required skims in CSV format for the commercial vehicle model.
-# 
+# Exports the required skims for the commercial vehicle model.
+#
+# Skims are written either as binary float32 NPY matrices (default), one
+# file per skim plus cvm_skim_zones.npy with the zone number for each row
+# and column, or in the legacy CSV text format where the first column of
+# each row is the zone number.
 #
 # Inputs:
-#    source: 
+#    output_directory: directory to write the skim files
+#    scenario: traffic scenario to use for the skims
+#    skim_format: "binary" (NPY) or "text" (legacy CSV)
 #
 # Files referenced:
 #
@@ -51,6 +57,7 @@ gen_utils = _m.Modeller().module("sandag.utilities.general")
 class ExportForCommercialVehicleModel(_m.Tool(), gen_utils.Snapshot):
 
     output_directory = _m.Attribute(str)
+    skim_format = _m.Attribute(str)
 
     tool_run_msg = ""
 
@@ -61,13 +68,15 @@ class ExportForCommercialVehicleModel(_m.Tool(), gen_utils.Snapshot):
     def __init__(self):
         project_dir = _dir(_m.Modeller().desktop.project.path)
         self.output_directory = _join(_dir(project_dir), "output")
-        self.attributes = ["output_directory"]
+        self.skim_format = "binary"
+        self.attributes = ["output_directory", "skim_format"]
 
     def page(self):
         pb = _m.ToolPageBuilder(self)
         pb.title = "Export for commercial vehicle model"
         pb.description = """
-        Exports the required skims in CSV format for the commercial vehicle model.
+        Exports the required skims for the commercial vehicle model,
+        as binary NPY matrices or in the legacy CSV text format.
         """
         pb.branding_text = "- SANDAG - Export"
         if self.tool_run_msg != "":
@@ -75,6 +84,8 @@ class ExportForCommercialVehicleModel(_m.Tool(), gen_utils.Snapshot):
 
         pb.add_select_file('output_directory', 'directory',
                            title='Select output directory')
+        options = [("binary", "Binary (NPY)"), ("text", "Text (legacy CSV)")]
+        pb.add_select("skim_format", keyvalues=options, title="Select skim format")
 
         return pb.render()
 
@@ -82,7 +93,7 @@ class ExportForCommercialVehicleModel(_m.Tool(), gen_utils.Snapshot):
         self.tool_run_msg = ""
         try:
             scenario = _m.Modeller().scenario
-            self(self.output_directory, scenario)
+            self(self.output_directory, scenario, self.skim_format)
             run_msg = "Tool complete"
             self.tool_run_msg = _m.PageBuilder.format_info(run_msg, escape=False)
         except Exception as error:
@@ -91,7 +102,9 @@ class ExportForCommercialVehicleModel(_m.Tool(), gen_utils.Snapshot):
             raise
 
     @_m.logbook_trace('Export skims for commercial vehicle model', save_arguments=True)
-    def __call__(self, output_directory, scenario):
+    def __call__(self, output_directory, scenario, skim_format="binary"):
+        if skim_format not in ("binary", "text"):
+            raise Exception("Unknown skim format '%s', expected 'binary' or 'text'" % skim_format)
         emmebank = scenario.emmebank
         modes = ['ldn', 'ldt', 'lhdn', 'lhdt', 'mhdn', 'mhdt', 'hhdn', 'hhdt']
         classes = ['SOV_NT_H', 'SOV_TR_H', 'TRK_L', 'TRK_L', 'TRK_M', 'TRK_M', 'TRK_H', 'TRK_H']
@@ -145,6 +158,24 @@ class ExportForCommercialVehicleModel(_m.Tool(), gen_utils.Snapshot):
             disutil_mat = coeffs[0] * time + coeffs[1] * distance + coeffs[2] * toll_cost
             output_matrices['imp%s_%s_DU.txt' % (mode, period)] = disutil_mat
 
+        if skim_format == "binary":
+            self.write_binary(output_directory, scenario, output_matrices)
+        else:
+            self.write_text(output_directory, output_matrices)
+
+    def write_binary(self, output_directory, scenario, output_matrices):
+        # Save each matrix as float32 NPY so that the CVM can memory-map it,
+        # along with the zone numbers for the rows and columns
+        zones = _np.array(scenario.zone_numbers, dtype=_np.int32)
+        _np.save(_join(output_directory, "cvm_skim_zones.npy"), zones)
+        for name, array in output_matrices.iteritems():
+            base_name = os.path.splitext(name)[0]
+            _np.save(_join(output_directory, base_name + ".npy"), array.astype(_np.float32))
+            # remove text skims from a previous run so they cannot be mistaken for current ones
+            if os.path.exists(_join(output_directory, name)):
+                os.remove(_join(output_directory, name))
+
+    def write_text(self, output_directory, output_matrices):
         # Insert row number into first column of the array
         # Note: assumes zone IDs are continuous
         for key, array in output_matrices.iteritems():
@@ -152,7 +183,11 @@ class ExportForCommercialVehicleModel(_m.Tool(), gen_utils.Snapshot):
 
         # Output DU matrices to CSV
         # Print first column as integer, subsequent columns as floats rounded to 6 decimals
-        fmt_spec = ['%i'] + ['%.6f'] * (disutil_mat.shape[0])
+        fmt_spec = ['%i'] + ['%.6f'] * (len(output_matrices.values()[0]))
         # Save to separate files
         for name, array in output_matrices.iteritems():
             _np.savetxt(_join(output_directory, name), array, fmt=fmt_spec, delimiter=',')
+            # binary skims from a previous run would otherwise take precedence in the CVM
+            binary_name = _join(output_directory, os.path.splitext(name)[0] + ".npy")
+            if os.path.exists(binary_name):
+                os.remove(binary_name)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+""" ABM Properties Module.
+
+This module contains the class used by the ABM Scenario Data Exporter
+Modules to read the ABM scenario properties file
+(conf/sandag_abm.properties). The properties file is tokenized once into a
+dictionary of property keys to string values that is shared by all readers
+of the file and re-read only if the file is modified. Typed accessors
+return the numeric, list and boolean property values.
+
+Notes:
+    docstring style guide - http://google.github.io/styleguide/pyguide.html
+"""
+
+import os
+
+
+class PropertiesFile(object):
+    """ This class holds the key-value tokens of an ABM properties file and
+    provides typed accessors to the property values. Tokens are cached by
+    file location and modification time so a properties file is tokenized
+    once however many classes read it.
+
+    Lines are split into a key and value at the first equals sign with
+    surrounding white space removed. Blank lines, comment lines (# or !) and
+    lines without an equals sign are skipped. If a key is repeated the last
+    occurrence is kept. Accessors return None for keys not in the file.
+
+    Args:
+        fn: String location of the properties file
+
+    Methods:
+        get: Returns a property value as a string
+        get_bool: Returns a property value as a boolean
+        get_float: Returns a property value as a float
+        get_int: Returns a property value as an integer
+        get_list: Returns a comma-separated property value as a list """
+
+    # properties file location -> (modification time, tokens)
+    _cache = {}
+
+    def __init__(self, fn: str) -> None:
+        self.fn = fn
+        self.tokens = self._tokenize(fn)
+
+    @classmethod
+    def _tokenize(cls, fn: str) -> dict:
+        """ Tokenizes a properties file into a dictionary of property keys to
+        string values, using the cached tokens if the file is unmodified.
+
+        Args:
+            fn: String location of the properties file
+
+        Returns:
+            A dictionary of property keys to string values """
+        fn = os.path.abspath(fn)
+        mtime = os.path.getmtime(fn)
+
+        if fn in cls._cache and cls._cache[fn][0] == mtime:
+            return cls._cache[fn][1]
+
+        tokens = {}
+        with open(fn, "r") as file:
+            for line in file:
+                line = line.strip()
+
+                if not line or line[0] in "#!" or "=" not in line:
+                    continue
+
+                key, value = line.split("=", 1)
+                tokens[key.strip()] = value.strip()
+
+        cls._cache[fn] = (mtime, tokens)
+
+        return tokens
+
+    def get(self, key: str) -> str:
+        """ Returns a property value as a string.
+
+        Args:
+            key: String property key (e.g. scenarioYear)
+
+        Returns:
+            The string property value, None if the key is not in the file """
+        return self.tokens.get(key)
+
+    def get_bool(self, key: str) -> bool:
+        """ Returns a property value (true, false) as a boolean.
+
+        Args:
+            key: String property key
+
+        Returns:
+            The boolean property value, None if the key is not in the file """
+        value = self.get(key)
+
+        return None if value is None else value.lower() == "true"
+
+    def get_float(self, key: str) -> float:
+        """ Returns a property value as a float.
+
+        Args:
+            key: String property key
+
+        Returns:
+            The float property value, None if the key is not in the file """
+        value = self.get(key)
+
+        return None if value is None else float(value)
+
+    def get_int(self, key: str) -> int:
+        """ Returns a property value as an integer.
+
+        Args:
+            key: String property key
+
+        Returns:
+            The integer property value, None if the key is not in the file """
+        value = self.get(key)
+
+        return None if value is None else int(value)
+
+    def get_list(self, key: str, dtype: type = float) -> list:
+        """ Returns a comma-separated property value as a list.
+
+        Args:
+            key: String property key
+            dtype: Type the list elements are converted to (default float)
+
+        Returns:
+            The list of property values, None if the key is not in the file """
+        value = self.get(key)
+
+        return None if value is None else [dtype(item.strip()) for item in value.split(",")]
@@ -10,21 +10,31 @@ Notes:
     docstring style guide - http://google.github.io/styleguide/pyguide.html
 """
 
-from datetime import time, timedelta, date, datetime
-from functools import lru_cache  # caching decorator for modules
+from datetime import time
+from concurrent.futures import ThreadPoolExecutor
 import itertools
 import numpy as np
 import os
 import pandas as pd
-import re
+from typing import Iterator
+from abmProperties import PropertiesFile
+from codeLookup import CodeLookup, map_codes
+from csvCache import read_csv
+from scenarioCache import ScenarioCache, scenario_cache
+from timePeriods import map_five_tod, map_half_hour
 
 
 class ScenarioData(object):
     """ This is the parent class for all information and utilities relating
     to a completed SANDAG Activity-Based Model (ABM) scenario.
 
+    Data-sets are held in a ScenarioCache shared by all exporter classes of
+    the ABM scenario folder until they are released.
+
     Args:
         scenario_path: String location of the completed ABM scenario folder
+        cache: Optional ScenarioCache holding the data-sets, defaults to the
+            cache shared by all exporter classes of the ABM scenario folder
 
     Methods:
         _map_time_periods: maps ABM half hour periods to ABM five time of
@@ -32,8 +42,11 @@ class ScenarioData(object):
         _map_vot_categories: maps continuous value of time (vot) values to
             vot categories ("Low", "Medium", "High") defined in the ABM
             scenario properties file (see vot_categories property)
+        release: releases data-sets of the class from the scenario cache
 
     Properties:
+        cvm_trip_data: Pandas DataFrame of the Commercial Vehicle Model trip
+            list files shared by the tour and trip list builders
         mgra_xref: Pandas DataFrame geography cross-reference of MGRAs to
             TAZs and LUZs
         pnr_taps: Pandas DataFrame of transit TAP park and ride data placed
@@ -52,11 +65,80 @@ class ScenarioData(object):
         TripLists: Holds all trip list data for a completed ABM scenario
             model run """
 
-    def __init__(self, scenario_path: str) -> None:
+    def __init__(self, scenario_path: str, cache: ScenarioCache = None) -> None:
         self.scenario_path = scenario_path
+        self.cache = cache if cache is not None else ScenarioCache.shared(scenario_path)
+
+    def release(self, *names: str) -> int:
+        """ Releases data-sets of the class from the scenario cache so they
+        can be freed once written out.
+
+        Args:
+            *names: String names of the data-set properties to release
+                (e.g. individual), all data-sets of the scenario cache are
+                released if no names are given
+
+        Returns:
+            Integer number of bytes of the released data-sets """
+        keys = [getattr(type(self), name).fget.cache_key for name in names]
+
+        return self.cache.release(*keys)
+
+    @property
+    @scenario_cache
+    def cvm_trip_data(self) -> pd.DataFrame:
+        """ Commercial Vehicle Model trip list files read into a single
+        Pandas DataFrame. The files are read once, in parallel across files,
+        and shared by the TourLists and TripLists class cvm properties.
+
+        Returns:
+            A Pandas DataFrame of the Commercial Vehicle Model trip list
+            files in file order """
+
+        # create list of all Commercial Vehicle model trip list files
+        # files are of the form Trip_<<ActorType>>_<<OriginalTimePeriod>>
+        files = ["Trip" + "_" + i + "_" + j + ".csv" for i, j in
+                 itertools.product(["FA", "GO", "IN", "RE", "SV", "TH", "WH"],
+                                   ["OE", "AM", "MD", "PM", "OL"])]
+
+        def read_file(file: str) -> pd.DataFrame:
+            return read_csv(os.path.join(self.scenario_path, "output", file),
+                            usecols=["SerialNo",
+                                     "Trip",
+                                     "HomeZone",
+                                     "ActorType",
+                                     "OPurp",
+                                     "DPurp",
+                                     "I",
+                                     "J",
+                                     "Mode",
+                                     "StartTime",
+                                     "EndTime",
+                                     "StopDuration",
+                                     "TourType",
+                                     "OriginalTimePeriod"],
+                            dtype={"SerialNo": "int32",
+                                   "Trip": "int8",
+                                   "ActorType": "string",
+                                   "HomeZone": "int16",
+                                   "OPurp": "string",
+                                   "DPurp": "string",
+                                   "I": "int16",
+                                   "J": "int16",
+                                   "Mode": "string",
+                                   "StartTime": "float32",
+                                   "EndTime": "float32",
+                                   "StopDuration": "float32",
+                                   "TourType": "string",
+                                   "OriginalTimePeriod": "string"})
+
+        # read all trip list files into a Pandas DataFrame
+        # the csv parser releases the GIL so files are read on a thread pool
+        with ThreadPoolExecutor() as executor:
+            return pd.concat(executor.map(read_file, files))
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def mgra_xref(self) -> pd.DataFrame:
         """ Cross reference of Master Geographic Reference Area (MGRA) model
         geography to Transportation Analysis Zone (TAZ) and Land Use Zone
@@ -67,13 +149,13 @@ class ScenarioData(object):
         # load the mgra based input file
         fn = "mgra13_based_input" + str(self.properties["year"]) + ".csv"
 
-        mgra = pd.read_csv(os.path.join(self.scenario_path, "input", fn),
-                           usecols=["mgra",  # MGRA geography
-                                    "taz",  # TAZ geography
-                                    "luz_id"],
-                           dtype={"mgra": "int16",
-                                  "taz": "int16",
-                                  "luz_id": "int16"})  # LUZ geography
+        mgra = read_csv(os.path.join(self.scenario_path, "input", fn),
+                        usecols=["mgra",  # MGRA geography
+                                 "taz",  # TAZ geography
+                                 "luz_id"],
+                        dtype={"mgra": "int16",
+                               "taz": "int16",
+                               "luz_id": "int16"})  # LUZ geography
 
         # genericize column names
         mgra.rename(columns={"mgra": "MGRA",
@@ -84,7 +166,7 @@ class ScenarioData(object):
         return mgra
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def pnr_taps(self) -> pd.DataFrame:
         """ Create the transit TAP park and ride lot data-set.
 
@@ -115,7 +197,7 @@ class ScenarioData(object):
         lots = lots.merge(five_tod)
 
         # load parking lot vehicles by time of day
-        vehicles = pd.read_csv(
+        vehicles = read_csv(
             os.path.join(self.scenario_path, "output", "PNRByTAP_Vehicles.csv"),
             usecols=["TAP",
                      "EA",
@@ -171,7 +253,7 @@ class ScenarioData(object):
                      "vehicles"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def properties(self) -> dict:
         """ Get the ABM scenario properties from the ABM scenario
         properties file (conf/sandag_abm.properties).
@@ -212,148 +294,37 @@ class ScenarioData(object):
         Returns:
             A dictionary defining the ABM scenario properties. """
 
-        # create dictionary holding ABM properties file information
-        # each property contains a dictionary {line, value} where the line
-        # is the string to match in the properties file to
-        # return the value of the property
-        lookup = {
-            "cvmScaleLight": {
-                "line": "cvm.scale_light=",
-                "type": "list",
-                "value": None},
-            "cvmScaleMedium": {
-                "line": "cvm.scale_medium=",
-                "type": "list",
-                "value": None},
-            "cvmScaleHeavy": {
-                "line": "cvm.scale_heavy=",
-                "type": "list",
-                "value": None},
-            "cvmShareLight": {
-                "line": "cvm.share.light=",
-                "type": "float",
-                "value": None},
-            "cvmShareMedium": {
-                "line": "cvm.share.medium=",
-                "type": "float",
-                "value": None},
-            "cvmShareHeavy": {
-                "line": "cvm.share.heavy=",
-                "type": "float",
-                "value": None},
-            "iterations": {
-                "line": None,
-                "type": "int",
-                "value": None},
-            "nonPooledTNCPassengers": {
-                "line": "TNC.single.passengersPerVehicle=",
-                "type": "float",
-                "value": None},
-            "pooledTNCPassengers": {
-                "line": "TNC.shared.passengersPerVehicle=",
-                "type": "float",
-                "value": None},
-            "sr2Passengers": {
-                "line": None,
-                "type": "int",
-                "value": 2},
-            "sr3Passengers": {
-                "line": None,
-                "type": "float",
-                "value": 3.34},
-            "taxiPassengers": {
-                "line": "Taxi.passengersPerVehicle=",
-                "type": "float",
-                "value": None},
-            "timePeriodWidthTNC": {
-                "line": "Maas.RoutingModel.minutesPerSimulationPeriod=",
-                "type": "int",
-                "value": None},
-            "sampleRate": {
-                "line": "sample_rates=",
-                "type": "float",
-                "value": None},
-            "valueOfTimeLow": {
-                "line": "valueOfTime.threshold.low=",
-                "type": "float",
-                "value": None},
-            "valueOfTimeMedium": {
-                "line": "valueOfTime.threshold.med=",
-                "type": "float",
-                "value": None},
-            "year": {
-                "line": "scenarioYear=",
-                "type": "int",
-                "value": None}
+        # get the ABM properties file tokens, the file is tokenized once
+        # and shared by all classes reading it
+        properties = PropertiesFile(
+            os.path.join(self.scenario_path, "conf", "sandag_abm.properties"))
+
+        # the number of model iterations is the number of sample rates
+        # specified and the final iteration sample rate is the final element
+        sample_rates = properties.get_list("sample_rates")
+
+        return {
+            "cvmScaleLight": properties.get_list("cvm.scale_light"),
+            "cvmScaleMedium": properties.get_list("cvm.scale_medium"),
+            "cvmScaleHeavy": properties.get_list("cvm.scale_heavy"),
+            "cvmShareLight": properties.get_float("cvm.share.light"),
+            "cvmShareMedium": properties.get_float("cvm.share.medium"),
+            "cvmShareHeavy": properties.get_float("cvm.share.heavy"),
+            "iterations": None if sample_rates is None else len(sample_rates),
+            "nonPooledTNCPassengers": properties.get_float("TNC.single.passengersPerVehicle"),
+            "pooledTNCPassengers": properties.get_float("TNC.shared.passengersPerVehicle"),
+            "sr2Passengers": 2,
+            "sr3Passengers": 3.34,
+            "taxiPassengers": properties.get_float("Taxi.passengersPerVehicle"),
+            "timePeriodWidthTNC": properties.get_int("Maas.RoutingModel.minutesPerSimulationPeriod"),
+            "sampleRate": None if sample_rates is None else sample_rates[-1],
+            "valueOfTimeLow": properties.get_float("valueOfTime.threshold.low"),
+            "valueOfTimeMedium": properties.get_float("valueOfTime.threshold.med"),
+            "year": properties.get_int("scenarioYear")
         }
 
-        # open the ABM scenario properties file
-        file = open(os.path.join(self.scenario_path, "conf", "sandag_abm.properties"), "r")
-
-        # loop through each line of the properties file
-        for line in file:
-            # strip all white space from the line
-            line = line.replace(" ", "")
-
-            # for each element of the properties dictionary
-            for name in lookup:
-                item = lookup[name]
-
-                # if the properties file contains the matching line
-                if item["line"] is not None:
-                    match = re.compile(item["line"]).match(line)
-                else:
-                    match = False
-
-                if match:
-                    # if the match is for the sample rate element
-                    # then take the portion of the line after the matching string
-                    # and split by the comma character
-                    if name == "sampleRate":
-                        line = line[match.end():].split(",")
-
-                        # set number of iterations to number of sample rates
-                        # that are specified
-                        lookup["iterations"]["value"] = len(line)
-
-                        # if the split line contains a single element
-                        # return that element otherwise return the final element
-                        if len(line) == 1:
-                            value = line[0]
-                        else:
-                            value = line[-1]
-                    # if the match is for a cvm scale element then take the
-                    # portion of the line after the matching string and split
-                    # by the comma character into a list of floats
-                    elif "cvmScale" in name:
-                        value = line[match.end():].split(",")
-                        value = list(map(float, value))
-                    # otherwise take the final element of the line
-                    else:
-                        value = line[match.end():]
-
-                    # update the dictionary value using the appropriate data type
-                    if item["type"] == "float":
-                        value = float(value)
-                    elif item["type"] == "int":
-                        value = int(value)
-                    else:
-                        pass
-
-                    item["value"] = value
-
-                    break
-
-        file.close()
-
-        # convert the property name and value to a non-nested dictionary
-        results = {}
-        for name in lookup:
-            results[name] = lookup[name]["value"]
-
-        return results
-
     @property
+    @scenario_cache
     def time_periods(self) -> dict:
         """ Dictionary of ABM model time resolution periods with start and
         end times where the start time is inclusive and the end time is
@@ -517,17 +488,7 @@ class ScenarioData(object):
         Returns:
             A Pandas Series of ABM five time of day periods """
 
-        conditions = [abm_half_hour.between(1, 3),
-                      abm_half_hour.between(4, 9),
-                      abm_half_hour.between(10, 22),
-                      abm_half_hour.between(23, 29),
-                      abm_half_hour.between(30, 40)]
-
-        choices = [1, 2, 3, 4, 5]
-
-        abm_5_tod = np.select(conditions, choices, default=np.NaN)
-
-        return pd.Series(abm_5_tod).astype("float")
+        return map_five_tod(abm_half_hour)
 
     def _map_vot_categories(self, vot: pd.Series) -> pd.Series:
         """ Map Pandas Series of continuous ABM value of time (vot) values to
@@ -562,13 +523,13 @@ class LandUse(ScenarioData):
         mgra_input: MGRA-based input file
     """
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def mgra_input(self) -> pd.DataFrame:
         """ Create the MGRA-based input file data-set. """
         # load the MGRA-based input file
         fn = "mgra13_based_input" + str(self.properties["year"]) + ".csv"
 
-        mgra = pd.read_csv(
+        mgra = read_csv(
             os.path.join(self.scenario_path, "input", fn),
             usecols=["mgra",
                      "taz",
@@ -691,7 +652,7 @@ class SyntheticPopulation(ScenarioData):
         persons:  Synthetic persons sampled
     """
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def households(self) -> pd.DataFrame:
         """ Create the synthetic households data-set.
 
@@ -702,7 +663,7 @@ class SyntheticPopulation(ScenarioData):
         Returns:
             A Pandas DataFrame of the synthetic households """
         # load input synthetic household list into Pandas DataFrame
-        input_households = pd.read_csv(
+        input_households = read_csv(
             os.path.join(self.scenario_path, "input", "households.csv"),
             usecols=["hhid",
                      "taz",
@@ -727,7 +688,7 @@ class SyntheticPopulation(ScenarioData):
 
         # load output sampled synthetic household list
         fn = "householdData_" + str(self.properties["iterations"]) + ".csv"
-        output_households = pd.read_csv(
+        output_households = read_csv(
             os.path.join(self.scenario_path, "output", fn),
             usecols=["hh_id",
                      "autos",
@@ -766,7 +727,7 @@ class SyntheticPopulation(ScenarioData):
         }
 
         for field in mappings:
-            households[field] = households[field].map(mappings[field]).astype("category")
+            households[field] = map_codes(households[field], mappings[field], "category")
 
         # rename columns to standard/generic ABM naming conventions
         households.rename(columns={"hh_id": "hhId",
@@ -799,7 +760,7 @@ class SyntheticPopulation(ScenarioData):
                            "poverty"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def persons(self) -> pd.DataFrame:
         """ Create the synthetic persons data-set.
 
@@ -810,7 +771,7 @@ class SyntheticPopulation(ScenarioData):
         Returns:
             A Pandas DataFrame of the synthetic persons """
         # load input synthetic person list into Pandas DataFrame
-        input_persons = pd.read_csv(
+        input_persons = read_csv(
             os.path.join(self.scenario_path, "input", "persons.csv"),
             usecols=["hhid",
                      "perid",
@@ -845,7 +806,7 @@ class SyntheticPopulation(ScenarioData):
 
         # load output sampled synthetic person list
         fn_person_data = "personData_" + str(self.properties["iterations"]) + ".csv"
-        output_persons = pd.read_csv(
+        output_persons = read_csv(
             os.path.join(self.scenario_path, "output", fn_person_data),
             usecols=["person_id",
                      "activity_pattern",
@@ -860,7 +821,7 @@ class SyntheticPopulation(ScenarioData):
 
         # load work-school location model results
         fn_ws_loc_results = "wsLocResults_" + str(self.properties["iterations"]) + ".csv"
-        ws_loc_results = pd.read_csv(
+        ws_loc_results = read_csv(
             os.path.join(self.scenario_path, "output", fn_ws_loc_results),
             usecols=["PersonID",
                      "HomeMGRA",
@@ -969,17 +930,15 @@ class SyntheticPopulation(ScenarioData):
                               **{key: value for (key, value) in zip(list(range(0, 57)),
                                                                     ["Unknown"] * 57)}
                               },
-            "WorkLocation": {key: value for (key, value) in zip(list(range(1, 23003)),
-                                                                list(range(1, 23003)))},
-            "SchoolLocation": {key: value for (key, value) in zip(list(range(1, 23003)),
-                                                                  list(range(1, 23003)))}
+            "WorkLocation": CodeLookup.identity(1, 23002),
+            "SchoolLocation": CodeLookup.identity(1, 23002)
         }
 
         for field in mappings:
             if field in ["WorkLocation", "SchoolLocation"]:
-                persons[field] = persons[field].map(mappings[field]).astype("float32")
+                persons[field] = map_codes(persons[field], mappings[field], "float32")
             else:
-                persons[field] = persons[field].map(mappings[field]).astype("category")
+                persons[field] = map_codes(persons[field], mappings[field], "category")
 
         # if employer does not reimburse for parking
         # set parking reimbursement percentage to missing
@@ -1046,6 +1005,10 @@ class TourLists(ScenarioData):
     The tour list data is loaded from raw ABM output files in the scenario
     output folder and transformed where applicable.
 
+    Methods:
+        _tour_ends: Creates tour records from the first and last trips of
+            each tour of a trip list
+
     Properties:
         cross_border: Mexican Resident Cross Border model tour list
         cvm: Commercial Vehicle model tour list
@@ -1054,8 +1017,49 @@ class TourLists(ScenarioData):
         joint: San Diego Resident Joint travel model tour list
         Visitor: Visitor model tour list
     """
+    @staticmethod
+    def _tour_ends(trips: pd.DataFrame, tour: str, order: str, end_fields: list,
+                   suffixes: tuple) -> pd.DataFrame:
+        """ Create tour records from the first and last trips of each tour
+        of a trip list. The trip list is sorted once by tour and trip order
+        and the first and last trip of each tour are located from the tour
+        boundaries of the sorted trip list in a single vectorized pass in
+        place of grouping the trip list and merging the first and last
+        trips. Matches taking the first trip of each tour (groupby.head)
+        and merging the end fields of the last trip (groupby.tail).
+
+        Args:
+            trips: Pandas DataFrame of the trip list
+            tour: String name of the integer tour surrogate key field
+            order: String name of the field ordering trips within tours
+            end_fields: List of field names taken from both the first and
+                last trip of each tour
+            suffixes: Tuple of string suffixes added to the end fields of
+                the first and last trip (e.g. ("Start", "End"))
+
+        Returns:
+            A Pandas DataFrame of tours ordered by the tour surrogate key
+            holding all fields of the first trip of each tour followed by
+            the end fields of the last trip of each tour """
+        trips = trips.sort_values(by=[tour, order])
+
+        # the first trip of each tour starts at a change of tour key
+        # the last trip of each tour precedes the next first trip
+        # an empty trip list has no tours
+        keys = trips[tour].to_numpy()
+        boundaries = np.flatnonzero(np.diff(keys)) + 1
+        first = np.concatenate([[0], boundaries])[:len(keys)].astype("int64")
+        last = np.concatenate([boundaries, [len(keys)]])[:len(keys)].astype("int64") - 1
+
+        tours = trips.iloc[first].reset_index(drop=True)
+        tours.rename(columns={field: field + suffixes[0] for field in end_fields}, inplace=True)
+        for field in end_fields:
+            tours[field + suffixes[1]] = trips[field].iloc[last].reset_index(drop=True)
+
+        return tours
+
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def cross_border(self) -> pd.DataFrame:
         """ Create the Cross-border Model tour list.
 
@@ -1066,7 +1070,7 @@ class TourLists(ScenarioData):
             A Pandas DataFrame of the Cross-border tour list """
 
         # load tour list into Pandas DataFrame
-        tours = pd.read_csv(
+        tours = read_csv(
             os.path.join(self.scenario_path, "output", "crossBorderTours.csv"),
             usecols=["id",
                      "purpose",
@@ -1111,7 +1115,7 @@ class TourLists(ScenarioData):
         }
 
         for field in mappings:
-            tours[field] = tours[field].map(mappings[field]).astype("category")
+            tours[field] = map_codes(tours[field], mappings[field], "category")
 
         # map abm half hours to abm five time of day
         tours["departTimeFiveTod"] = self._map_time_periods(abm_half_hour=tours.departTime)
@@ -1140,7 +1144,7 @@ class TourLists(ScenarioData):
                       "tourMode"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def cvm(self) -> pd.DataFrame:
         """ Create the Commercial Vehicle Model tour list.
 
@@ -1150,34 +1154,16 @@ class TourLists(ScenarioData):
 
         Returns:
             A Pandas DataFrame of the Commercial Vehicle tour list """
-        # create list of all Commercial Vehicle model trip list files
-        # files are of the form Trip_<<ActorType>>_<<OriginalTimePeriod>>
-        files = ["Trip" + "_" + i + "_" + j + ".csv" for i, j in
-                 itertools.product(["FA", "GO", "IN", "RE", "SV", "TH", "WH"],
-                                   ["OE", "AM", "MD", "PM", "OL"])]
-
-        # read all trip list files into a Pandas DataFrame
-        trips = pd.concat((
-            pd.read_csv(os.path.join(self.scenario_path, "output", file),
-                        usecols=["SerialNo",
-                                 "Trip",
-                                 "ActorType",
-                                 "HomeZone",
-                                 "Mode",
-                                 "StartTime",
-                                 "EndTime",
-                                 "TourType",
-                                 "OriginalTimePeriod"],
-                        dtype={"SerialNo": "int32",
-                               "Trip": "int8",
-                               "ActorType": "string",
-                               "HomeZone": "int16",
-                               "Mode": "string",
-                               "StartTime": "float32",
-                               "EndTime": "float32",
-                               "TourType": "string",
-                               "OriginalTimePeriod": "string"})
-            for file in files))
+        # select the tour fields of the Commercial Vehicle model trip list
+        trips = self.cvm_trip_data[["SerialNo",
+                                    "Trip",
+                                    "ActorType",
+                                    "HomeZone",
+                                    "Mode",
+                                    "StartTime",
+                                    "EndTime",
+                                    "TourType",
+                                    "OriginalTimePeriod"]]
 
         # apply re-allocation originally implemented in
         # Java by Nagendra Dhakar + Joel Freedman at RSG
@@ -1209,10 +1195,11 @@ class TourLists(ScenarioData):
         # create tour list using the first and last trip within each tour
         # all tour data constant across trips excepting start/end times
         # first trip provides start time, last trip provides end time
-        tours = trips.sort_values(by=["tourID", "Trip"]).groupby(["tourID"])
-        tours = tours.head(1).merge(tours.tail(1)[["tourID", "EndTime"]],
-                                    on="tourID",
-                                    suffixes=("_start", ""))
+        tours = self._tour_ends(trips,
+                                tour="tourID",
+                                order="Trip",
+                                end_fields=["EndTime"],
+                                suffixes=("_start", ""))
 
         # apply exhaustive field mappings where applicable
         mappings = {
@@ -1233,38 +1220,17 @@ class TourLists(ScenarioData):
         }
 
         for field in mappings:
-            tours[field] = tours[field].map(mappings[field]).astype("category")
+            tours[field] = map_codes(tours[field], mappings[field], "category")
 
         # map continuous start and end times to ABM half hour time periods
         # times are in continuous hours of the day (0-24) and can wrap into
         # the following day or even multiple following days (>24) with no
         # upper limit
 
-        # create times from continuous hour start and end times
-        # taking into account their wrapping into subsequent days
-        tours["StartTime"] = tours["StartTime"].apply(
-            lambda x: (datetime.combine(date.today(), time.min) +
-                       timedelta(hours=(x % 24))).time())
-        tours["EndTime"] = tours["EndTime"].apply(
-            lambda x: (datetime.combine(date.today(), time.min) +
-                       timedelta(hours=(x % 24))).time())
-
         # map continuous times to abm half hour periods
-        depart_half_hour = [
-            [p["period"] for p in self.time_periods["abmHalfHour"]
-             if p["startTime"] <= x < p["endTime"]]
-            for x in tours["StartTime"]]
-        depart_half_hour = [val for sublist in depart_half_hour for val in sublist]
-        tours = tours.assign(departTimeAbmHalfHour=depart_half_hour)
-        tours["departTimeAbmHalfHour"] = tours["departTimeAbmHalfHour"].astype("int8")
-
-        arrive_half_hour = [
-            [p["period"] for p in self.time_periods["abmHalfHour"]
-             if p["startTime"] <= x < p["endTime"]]
-            for x in tours["EndTime"]]
-        arrive_half_hour = [val for sublist in arrive_half_hour for val in sublist]
-        tours = tours.assign(arriveTimeAbmHalfHour=arrive_half_hour)
-        tours["arriveTimeAbmHalfHour"] = tours["arriveTimeAbmHalfHour"].astype("int8")
+        # taking into account their wrapping into subsequent days
+        tours["departTimeAbmHalfHour"] = map_half_hour(tours["StartTime"])
+        tours["arriveTimeAbmHalfHour"] = map_half_hour(tours["EndTime"])
 
         # map abm half hours to abm five time of day
         tours["departTimeFiveTod"] = self._map_time_periods(abm_half_hour=tours.departTimeAbmHalfHour)
@@ -1288,7 +1254,7 @@ class TourLists(ScenarioData):
                       "tourMode"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def ie(self) -> pd.DataFrame:
         """ Create the Internal-External Model tour list.
 
@@ -1299,7 +1265,7 @@ class TourLists(ScenarioData):
             A Pandas DataFrame of the Internal-External tour list """
 
         # load trip list into Pandas DataFrame
-        trips = pd.read_csv(
+        trips = read_csv(
             os.path.join(self.scenario_path, "output", "internalExternalTrips.csv"),
             usecols=["personID",
                      "tourID",
@@ -1324,10 +1290,11 @@ class TourLists(ScenarioData):
         # all tour data constant across trips excepting start/end times
         # first trip provides start time, last trip provides end time
         # first trip also provides the tour destination
-        tours = trips.sort_values(by=["tourID", "inbound"]).groupby(["tourID"])
-        tours = tours.head(1).merge(tours.tail(1)[["tourID", "period"]],
-                                    on="tourID",
-                                    suffixes=("Start", "End"))
+        tours = self._tour_ends(trips,
+                                tour="tourID",
+                                order="inbound",
+                                end_fields=["period"],
+                                suffixes=("Start", "End"))
 
         # apply exhaustive field mappings where applicable
         mappings = {
@@ -1346,7 +1313,7 @@ class TourLists(ScenarioData):
         }
 
         for field in mappings:
-            tours[field] = tours[field].map(mappings[field]).astype("category")
+            tours[field] = map_codes(tours[field], mappings[field], "category")
 
         # map abm half hours to abm five time of day
         tours["departTimeFiveTod"] = self._map_time_periods(abm_half_hour=tours.periodStart)
@@ -1371,7 +1338,7 @@ class TourLists(ScenarioData):
                       "tourMode"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def individual(self) -> pd.DataFrame:
         """ Create the Individual Model tour list.
 
@@ -1383,7 +1350,7 @@ class TourLists(ScenarioData):
 
         # load tour list into Pandas DataFrame
         fn = "indivTourData_" + str(self.properties["iterations"]) + ".csv"
-        tours = pd.read_csv(
+        tours = read_csv(
             os.path.join(self.scenario_path, "output", fn),
             usecols=["person_id",
                      "tour_id",
@@ -1425,7 +1392,7 @@ class TourLists(ScenarioData):
         }
 
         for field in mappings:
-            tours[field] = tours[field].map(mappings[field]).astype("category")
+            tours[field] = map_codes(tours[field], mappings[field], "category")
 
         # create tour surrogate key (person_id, tour_id, tour_purpose)
         tour_key = ["person_id", "tour_id", "tour_purpose"]
@@ -1470,7 +1437,7 @@ class TourLists(ScenarioData):
                       "tourMode"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def joint(self) -> pd.DataFrame:
         """ Create the Joint Model tour list.
 
@@ -1482,7 +1449,7 @@ class TourLists(ScenarioData):
 
         # load tour list into Pandas DataFrame
         fn = "jointTourData_" + str(self.properties["iterations"]) + ".csv"
-        tours = pd.read_csv(
+        tours = read_csv(
             os.path.join(self.scenario_path, "output", fn),
             usecols=["hh_id",
                      "tour_id",
@@ -1522,7 +1489,7 @@ class TourLists(ScenarioData):
         }
 
         for field in mappings:
-            tours[field] = tours[field].map(mappings[field]).astype("category")
+            tours[field] = map_codes(tours[field], mappings[field], "category")
 
         # create tour surrogate key (hh_id, tour_id)
         tour_key = ["hh_id", "tour_id"]
@@ -1569,7 +1536,7 @@ class TourLists(ScenarioData):
                       "tourMode"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def visitor(self) -> pd.DataFrame:
         """ Create the Visitor Model tour list.
 
@@ -1580,7 +1547,7 @@ class TourLists(ScenarioData):
             A Pandas DataFrame of the Visitor tour list """
 
         # load tour list into Pandas DataFrame
-        tours = pd.read_csv(
+        tours = read_csv(
             os.path.join(self.scenario_path, "output", "visitorTours.csv"),
             usecols=["id",
                      "segment",
@@ -1630,7 +1597,7 @@ class TourLists(ScenarioData):
         }
 
         for field in mappings:
-            tours[field] = tours[field].map(mappings[field]).astype("category")
+            tours[field] = map_codes(tours[field], mappings[field], "category")
 
         # add TAZ information in addition to MGRA information
         taz_info = self.mgra_xref[["MGRA", "TAZ"]]
@@ -1694,12 +1661,19 @@ class TripLists(ScenarioData):
             field
         _combine_mode_walk: Recodes ABM mode field using the ABM walk mode
             field for walk mode trips
+        expand_cvm: Expands the Commercial Vehicle model trip list before
+            share allocation to one record per vehicle class
+        individual_chunks: Creates the Individual model trip list in chunks
+            of the trip list file
+        joint_chunks: Creates the Joint model trip list in chunks of the
+            trip list file
 
     Properties:
         airport_cbx: Cross Border Express (CBX) model trip list
         airport_san: San Diego Airport (SAN) model trip list
         cross_border: Mexican Resident Cross Border model trip list
         cvm: Commercial Vehicle model trip list
+        cvm_base: Commercial Vehicle model trip list before share allocation
         ee: External-External model trip list, placed here until it can be
             properly incorporated into the EMME data exporter process
         ei: External-Internal model trip list, placed here until it can be
@@ -1713,6 +1687,31 @@ class TripLists(ScenarioData):
         zombie_av: 0-passenger Autonomous Vehicle trip list
         zombie_tnc: 0-passenger TNC Vehicle trip list
     """
+    # fields of the Commercial Vehicle model trip list before the share
+    # allocation (cvm_base property) excluding appended skims
+    CVM_BASE_FIELDS = ["tripID",
+                       "tourID",
+                       "stopID",
+                       "tripPurposeOrigin",
+                       "tripPurposeDestination",
+                       "departTimeAbmHalfHour",
+                       "arriveTimeAbmHalfHour",
+                       "departTimeFiveTod",
+                       "arriveTimeFiveTod",
+                       "stopDuration",
+                       "originTAZ",
+                       "destinationTAZ",
+                       "parkingTAZ",
+                       "tripMode",
+                       "valueOfTimeCategory",
+                       "transponderAvailable",
+                       "avUsed",
+                       "weightTrip",
+                       "weightPersonTrip",
+                       "SerialNo",
+                       "cvmScale",
+                       "cvmShare"]
+
 
     @staticmethod
     def _combine_mode_set(mode: pd.Series, transit_set: pd.Series) -> pd.Series:
@@ -1759,7 +1758,7 @@ class TripLists(ScenarioData):
         return pd.Series(mode).astype("category")
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def airport_cbx(self) -> pd.DataFrame:
         """ Create the Cross Border Express (CBX) Airport Model trip list.
 
@@ -1770,7 +1769,7 @@ class TripLists(ScenarioData):
             A Pandas DataFrame of the CBX trip list """
 
         # load trip list into Pandas DataFrame
-        trips = pd.read_csv(
+        trips = read_csv(
             os.path.join(self.scenario_path, "output", "airport_out.CBX.csv"),
             usecols=["id",
                      "direction",
@@ -1845,12 +1844,8 @@ class TripLists(ScenarioData):
                             9: "Pooled TNC",
                             10: "Shuttle/van/courtesy vehicle",
                             11: "Transit"},
-            "boardingTAP": {key: value for (key, value) in
-                            zip(list(range(1, 99999)),
-                                list(range(1, 99999)))},
-            "alightingTAP": {key: value for (key, value) in
-                             zip(list(range(1, 99999)),
-                                 list(range(1, 99999)))},
+            "boardingTAP": CodeLookup.identity(1, 99998),
+            "alightingTAP": CodeLookup.identity(1, 99998),
             "set": {-1: "",
                     0: "Local Bus",
                     1: "Premium Transit",
@@ -1862,7 +1857,7 @@ class TripLists(ScenarioData):
                 data_type = "float32"
             else:
                 data_type = "category"
-            trips[field] = trips[field].map(mappings[field]).astype(data_type)
+            trips[field] = map_codes(trips[field], mappings[field], data_type)
 
         # map abm half hours to abm five time of day
         trips["departTimeFiveTod"] = self._map_time_periods(abm_half_hour=trips.departTime)
@@ -1920,7 +1915,7 @@ class TripLists(ScenarioData):
                       "weightPersonTrip"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def airport_san(self) -> pd.DataFrame:
         """ Create the San Diego (SAN) Airport Model trip list.
 
@@ -1931,7 +1926,7 @@ class TripLists(ScenarioData):
             A Pandas DataFrame of the SAN trip list """
 
         # load trip list into Pandas DataFrame
-        trips = pd.read_csv(
+        trips = read_csv(
             os.path.join(self.scenario_path, "output", "airport_out.SAN.csv"),
             usecols=["id",
                      "direction",
@@ -2006,12 +2001,8 @@ class TripLists(ScenarioData):
                             9: "Pooled TNC",
                             10: "Shuttle/van/courtesy vehicle",
                             11: "Transit"},
-            "boardingTAP": {key: value for (key, value) in
-                            zip(list(range(1, 99999)),
-                                list(range(1, 99999)))},
-            "alightingTAP": {key: value for (key, value) in
-                             zip(list(range(1, 99999)),
-                                 list(range(1, 99999)))},
+            "boardingTAP": CodeLookup.identity(1, 99998),
+            "alightingTAP": CodeLookup.identity(1, 99998),
             "set": {-1: "",
                     0: "Local Bus",
                     1: "Premium Transit",
@@ -2023,7 +2014,7 @@ class TripLists(ScenarioData):
                 data_type = "float32"
             else:
                 data_type = "category"
-            trips[field] = trips[field].map(mappings[field]).astype(data_type)
+            trips[field] = map_codes(trips[field], mappings[field], data_type)
 
         # map abm half hours to abm five time of day
         trips["departTimeFiveTod"] = self._map_time_periods(
@@ -2082,7 +2073,7 @@ class TripLists(ScenarioData):
                       "weightPersonTrip"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def cross_border(self) -> pd.DataFrame:
         """ Create the Cross-border Model trip list.
 
@@ -2093,7 +2084,7 @@ class TripLists(ScenarioData):
             A Pandas DataFrame of the Cross-border trip list """
 
         # load trip list into Pandas DataFrame
-        trips = pd.read_csv(
+        trips = read_csv(
             os.path.join(self.scenario_path, "output", "crossBorderTrips.csv"),
             usecols=["tourID",
                      "tripID",
@@ -2162,12 +2153,8 @@ class TripLists(ScenarioData):
                          10: "Taxi",
                          11: "Non-Pooled TNC",
                          12: "Pooled TNC"},
-            "boardingTap": {key: value for (key, value) in
-                            zip(list(range(1, 99999)),
-                                list(range(1, 99999)))},
-            "alightingTap": {key: value for (key, value) in
-                             zip(list(range(1, 99999)),
-                                 list(range(1, 99999)))},
+            "boardingTap": CodeLookup.identity(1, 99998),
+            "alightingTap": CodeLookup.identity(1, 99998),
             "set": {-1: "",
                     0: "Local Bus",
                     1: "Premium Transit",
@@ -2176,9 +2163,9 @@ class TripLists(ScenarioData):
 
         for field in mappings:
             if field in ["boardingTap", "alightingTap"]:
-                trips[field] = trips[field].map(mappings[field]).astype("float32")
+                trips[field] = map_codes(trips[field], mappings[field], "float32")
             else:
-                trips[field] = trips[field].map(mappings[field]).astype("category")
+                trips[field] = map_codes(trips[field], mappings[field], "category")
 
         # map abm half hours to abm five time of day
         trips["departTimeFiveTod"] = self._map_time_periods(
@@ -2254,55 +2241,39 @@ class TripLists(ScenarioData):
                       "costParking"]]
 
     @property
-    @lru_cache(maxsize=1)
     def cvm(self) -> pd.DataFrame:
         """ Create the Commercial Vehicle Model trip list.
 
-        Read in the Commercial Vehicle trip list, apply trip scaling and share
-        allocation, map field values, and genericize field names.
+        Expands the Commercial Vehicle trip list before the share allocation
+        (see cvm_base property) to one record per vehicle class. The
+        expanded trip list is not held in the scenario cache, only the
+        cvm_base property trip list it is created from.
 
         Returns:
             A Pandas DataFrame of the Commercial Vehicle trip list """
+        return self.expand_cvm(self.cvm_base)
 
-        # create list of all Commercial Vehicle model trip list files
-        # files are of the form Trip_<<ActorType>>_<<OriginalTimePeriod>>
-        files = ["Trip" + "_" + i + "_" + j + ".csv" for i, j in
-                 itertools.product(["FA", "GO", "IN", "RE", "SV", "TH", "WH"],
-                                   ["OE", "AM", "MD", "PM", "OL"])]
+    @property
+    @scenario_cache
+    def cvm_base(self) -> pd.DataFrame:
+        """ Create the Commercial Vehicle Model trip list before the share
+        allocation of trip weights to Light Heavy Duty Trucks.
+
+        Read in the Commercial Vehicle trip list, apply trip scaling, map
+        field values, and genericize field names. The share allocation is
+        held as a weight vector of the trip list fields [cvmScale] and
+        [cvmShare] and only expanded to one record per vehicle class by the
+        expand_cvm method, so skims can be appended once per trip before the
+        expansion. The [tripID] field is a provisional identifier of the
+        record and the [tourID] field is set by the expand_cvm method.
 
-        # read all trip list files into a Pandas DataFrame
-        trips = pd.concat((
-            pd.read_csv(os.path.join(self.scenario_path, "output", file),
-                        usecols=["SerialNo",
-                                 "Trip",
-                                 "HomeZone",
-                                 "ActorType",
-                                 "OPurp",
-                                 "DPurp",
-                                 "I",
-                                 "J",
-                                 "Mode",
-                                 "StartTime",
-                                 "EndTime",
-                                 "StopDuration",
-                                 "TourType",
-                                 "OriginalTimePeriod"],
-                        dtype={"SerialNo": "int32",
-                               "Trip": "int8",
-                               "ActorType": "string",
-                               "HomeZone": "int16",
-                               "OPurp": "string",
-                               "DPurp": "string",
-                               "I": "int16",
-                               "J": "int16",
-                               "Mode": "string",
-                               "StartTime": "float32",
-                               "EndTime": "float32",
-                               "StopDuration": "float32",
-                               "TourType": "string",
-                               "OriginalTimePeriod": "string"}
-                        )
-            for file in files))
+        Returns:
+            A Pandas DataFrame of the Commercial Vehicle trip list with the
+            additional fields [SerialNo], [cvmScale] and [cvmShare] used by
+            the expand_cvm method """
+
+        # get the Commercial Vehicle model trip list
+        trips = self.cvm_trip_data
 
         # apply weighting and share re-allocation originally implemented in
         # Java by Nagendra Dhakar + Joel Freedman at RSG
@@ -2323,19 +2294,11 @@ class TripLists(ScenarioData):
         # merge trip list and lookup table
         trips = trips.merge(lookup)
 
-        # within each mode, the properties file designates a percentage of the
-        # trip weight to be removed from the original trip and given to a new
-        # identical trip with the "I" (light-heavy duty truck) mode
-        new_trips = trips.loc[trips["cvmShare"] > 0].copy()
-        new_trips.reset_index(drop=True, inplace=True)
-        new_trips["Mode"] = "I"
-
         # within each mode and tour start abm five time of day period, the
         # properties file designates a scaling factor to apply to the trip
-        # weight taking into account the share factor
-        new_trips["weightTrip"] = new_trips["cvmScale"] * new_trips["cvmShare"]
+        # weight taking into account the share factor, the share of the trip
+        # weight is given to a Light Heavy Duty Truck trip by expand_cvm
         trips["weightTrip"] = trips["cvmScale"] * (1 - trips["cvmShare"])
-        trips = pd.concat([trips, new_trips], ignore_index=True)
 
         # apply exhaustive field mappings where applicable
         mappings = {
@@ -2354,13 +2317,11 @@ class TripLists(ScenarioData):
         }
 
         for field in mappings:
-            trips[field] = trips[field].map(mappings[field]).astype("category")
+            trips[field] = map_codes(trips[field], mappings[field], "category")
 
-        # create tour and trip surrogate keys
-        # unique tour is defined by (SerialNo, Mode)
-        # unique trip is defined by (SerialNo, Mode, Trip)
-        trips["tourID"] = trips.groupby(["SerialNo", "Mode"]).ngroup().astype("int32") + 1
-        trips = trips.sort_values(by=["SerialNo", "Mode", "Trip"]).reset_index(drop=True)
+        # create provisional trip surrogate key
+        # tour and trip surrogate keys are created by expand_cvm
+        trips["tourID"] = pd.Series(0, index=trips.index, dtype="int32")
         trips["tripID"] = pd.Series(trips.index + 1, dtype="int32")
 
         # map continuous start and end times to ABM half hour time periods
@@ -2368,31 +2329,10 @@ class TripLists(ScenarioData):
         # the following day or even multiple following days (>24) with no
         # upper limit
 
-        # create times from continuous hour start and end times
-        # taking into account their wrapping into subsequent days
-        trips["StartTime"] = trips["StartTime"].apply(
-            lambda x: (datetime.combine(date.today(), time.min) +
-                       timedelta(hours=(x % 24))).time())
-        trips["EndTime"] = trips["EndTime"].apply(
-            lambda x: (datetime.combine(date.today(), time.min) +
-                       timedelta(hours=(x % 24))).time())
-
         # map continuous times to abm half hour periods
-        depart_half_hour = [
-            [p["period"] for p in self.time_periods["abmHalfHour"]
-             if p["startTime"] <= x < p["endTime"]]
-            for x in trips["StartTime"]]
-        depart_half_hour = [val for sublist in depart_half_hour for val in sublist]
-        trips = trips.assign(departTimeAbmHalfHour=depart_half_hour)
-        trips["departTimeAbmHalfHour"] = trips["departTimeAbmHalfHour"].astype("int8")
-
-        arrive_half_hour = [
-            [p["period"] for p in self.time_periods["abmHalfHour"]
-             if p["startTime"] <= x < p["endTime"]]
-            for x in trips["EndTime"]]
-        arrive_half_hour = [val for sublist in arrive_half_hour for val in sublist]
-        trips = trips.assign(arriveTimeAbmHalfHour=arrive_half_hour)
-        trips["arriveTimeAbmHalfHour"] = trips["arriveTimeAbmHalfHour"].astype("int8")
+        # taking into account their wrapping into subsequent days
+        trips["departTimeAbmHalfHour"] = map_half_hour(trips["StartTime"])
+        trips["arriveTimeAbmHalfHour"] = map_half_hour(trips["EndTime"])
 
         # map abm half hours to abm five time of day
         trips["departTimeFiveTod"] = self._map_time_periods(
@@ -2426,28 +2366,64 @@ class TripLists(ScenarioData):
                               "StopDuration": "stopDuration"},
                      inplace=True)
 
-        return trips[["tripID",
-                      "tourID",
-                      "stopID",
-                      "tripPurposeOrigin",
-                      "tripPurposeDestination",
-                      "departTimeAbmHalfHour",
-                      "arriveTimeAbmHalfHour",
-                      "departTimeFiveTod",
-                      "arriveTimeFiveTod",
-                      "stopDuration",
-                      "originTAZ",
-                      "destinationTAZ",
-                      "parkingTAZ",
-                      "tripMode",
-                      "valueOfTimeCategory",
-                      "transponderAvailable",
-                      "avUsed",
-                      "weightTrip",
-                      "weightPersonTrip"]]
+        return trips[self.CVM_BASE_FIELDS]
+
+    def expand_cvm(self, df: pd.DataFrame, skims=None) -> pd.DataFrame:
+        """ Expand the Commercial Vehicle Model trip list before the share
+        allocation (see cvm_base property) to one record per vehicle class
+        and create the tour and trip surrogate keys.
+
+        Within each mode, the properties file designates a percentage of the
+        trip weight to be removed from the original trip and given to a new
+        identical trip with the Light Heavy Duty Truck mode. The input
+        DataFrame can hold skims appended by the SkimAppender class. The
+        skims of new trips are taken from the original trip except for
+        Drive Alone trips, that use the auto skims of Drive Alone rather
+        than trucks, which are skimmed again if a SkimAppender is given.
+
+        Args:
+            df: Pandas DataFrame of the cvm_base property trip list with or
+                without appended skims
+            skims: Optional SkimAppender used to skim new trips of Drive
+                Alone trips
+
+        Returns:
+            A Pandas DataFrame of the Commercial Vehicle trip list """
+        # create new trips with the share of the trip weight
+        # only Drive Alone cvm trips use transponders
+        new_trips = df.loc[df["cvmShare"] > 0].copy()
+        new_trips.reset_index(drop=True, inplace=True)
+        drive_alone = (new_trips["tripMode"] == "Drive Alone").to_numpy()
+        new_trips["tripMode"] = "Light Heavy Duty Truck"
+        new_trips["transponderAvailable"] = False
+        new_trips["weightTrip"] = pd.Series(
+            new_trips["cvmScale"] * new_trips["cvmShare"] / self.properties["sampleRate"],
+            dtype="float32")
+        new_trips["weightPersonTrip"] = new_trips["weightTrip"]
+
+        # skim new trips of Drive Alone trips again as the skims differ
+        skim_cols = [col for col in df.columns if col not in self.CVM_BASE_FIELDS]
+        if skims is not None and len(skim_cols) > 0 and drive_alone.any():
+            skimmed = skims.append_skims(new_trips.loc[drive_alone, self.CVM_BASE_FIELDS],
+                                         auto_only=True,
+                                         terminal_skims=False)
+            for col in skim_cols:
+                new_trips.loc[drive_alone, col] = skimmed[col].to_numpy()
+
+        trips = pd.concat([df, new_trips], ignore_index=True)
+        trips["tripMode"] = trips["tripMode"].astype("object").astype("category")
+
+        # create tour and trip surrogate keys
+        # unique tour is defined by (SerialNo, Mode)
+        # unique trip is defined by (SerialNo, Mode, Trip)
+        trips["tourID"] = trips.groupby(["SerialNo", "tripMode"]).ngroup().astype("int32") + 1
+        trips = trips.sort_values(by=["SerialNo", "tripMode", "stopID"]).reset_index(drop=True)
+        trips["tripID"] = pd.Series(trips.index + 1, dtype="int32")
+
+        return trips.drop(columns=["SerialNo", "cvmScale", "cvmShare"])
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def ee(self) -> pd.DataFrame:
         """ Create the External-External Model trip list.
 
@@ -2457,7 +2433,7 @@ class TripLists(ScenarioData):
         Returns:
             A Pandas DataFrame of the External-External trips list """
         # load trip list into Pandas DataFrame
-        trips = pd.read_csv(
+        trips = read_csv(
             os.path.join(self.scenario_path, "report", "eetrip.csv"),
             usecols=["OTAZ",
                      "DTAZ",
@@ -2511,9 +2487,9 @@ class TripLists(ScenarioData):
 
         for field in mappings:
             if field == "TOD":
-                trips[field] = trips[field].map(mappings[field]).astype("int8")
+                trips[field] = map_codes(trips[field], mappings[field], "int8")
             else:
-                trips[field] = trips[field].map(mappings[field]).astype("category")
+                trips[field] = map_codes(trips[field], mappings[field], "category")
 
         # convert cents-based cost fields to dollars
         trips["AOC"] = trips["AOC"] / 100
@@ -2571,7 +2547,7 @@ class TripLists(ScenarioData):
                       "costTotal"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def ei(self) -> pd.DataFrame:
         """ Create the External-Internal Model trip list.
 
@@ -2581,7 +2557,7 @@ class TripLists(ScenarioData):
         Returns:
             A Pandas DataFrame of the External-Internal trips list """
         # load trip list into Pandas DataFrame
-        trips = pd.read_csv(
+        trips = read_csv(
             os.path.join(self.scenario_path, "report", "eitrip.csv"),
             usecols=["OTAZ",
                      "DTAZ",
@@ -2642,9 +2618,9 @@ class TripLists(ScenarioData):
 
         for field in mappings:
             if field == "TOD":
-                trips[field] = trips[field].map(mappings[field]).astype("int8")
+                trips[field] = map_codes(trips[field], mappings[field], "int8")
             else:
-                trips[field] = trips[field].map(mappings[field]).astype("category")
+                trips[field] = map_codes(trips[field], mappings[field], "category")
 
         # convert cents-based cost fields to dollars
         trips["AOC"] = trips["AOC"] / 100
@@ -2704,7 +2680,7 @@ class TripLists(ScenarioData):
                       "costTotal"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def ie(self) -> pd.DataFrame:
         """ Create the Internal-External Model trip list.
 
@@ -2714,7 +2690,7 @@ class TripLists(ScenarioData):
         Returns:
             A Pandas DataFrame of the Internal-External trip list """
         # load trip list into Pandas DataFrame
-        trips = pd.read_csv(
+        trips = read_csv(
             os.path.join(self.scenario_path, "output", "internalExternalTrips.csv"),
             usecols=["hhID",
                      "personID",
@@ -2749,7 +2725,7 @@ class TripLists(ScenarioData):
 
         # load output household transponder ownership data
         hh_fn = "householdData_" + str(self.properties["iterations"]) + ".csv"
-        hh = pd.read_csv(
+        hh = read_csv(
             os.path.join(self.scenario_path, "output", hh_fn),
             usecols=["hh_id",
                      "transponder"],
@@ -2773,12 +2749,8 @@ class TripLists(ScenarioData):
                          10: "Taxi",
                          11: "Non-Pooled TNC",
                          12: "Pooled TNC"},
-            "boardingTap": {key: value for (key, value) in
-                            zip(list(range(1, 99999)),
-                                list(range(1, 99999)))},
-            "alightingTap": {key: value for (key, value) in
-                             zip(list(range(1, 99999)),
-                                 list(range(1, 99999)))},
+            "boardingTap": CodeLookup.identity(1, 99998),
+            "alightingTap": CodeLookup.identity(1, 99998),
             "set": {-1: "",
                     0: "Local Bus",
                     1: "Premium Transit",
@@ -2790,7 +2762,7 @@ class TripLists(ScenarioData):
                 data_type = "float32"
             else:
                 data_type = "category"
-            trips[field] = trips[field].map(mappings[field]).astype(data_type)
+            trips[field] = map_codes(trips[field], mappings[field], data_type)
 
         # create trip surrogate key
         # create stop surrogate key
@@ -2868,70 +2840,184 @@ class TripLists(ScenarioData):
                       "weightTrip",
                       "weightPersonTrip"]]
 
-    @property
-    @lru_cache(maxsize=1)
-    def individual(self) -> pd.DataFrame:
-        """ Create the Individual Model trip list.
-
-        Read in the Individual trip list, map field values, and genericize
-        field names.
+    def _individual_csv(self) -> tuple:
+        """ Location and pandas.read_csv arguments of the Individual trip
+        list file (output/indivTripData_<<iteration>>.csv).
 
         Returns:
-            A Pandas DataFrame of the Individual trip list """
-        # load trip list into Pandas DataFrame
+            A tuple of the string location of the Individual trip list file
+            and a dictionary of pandas.read_csv keyword arguments """
         fn = "indivTripData_" + str(self.properties["iterations"]) + ".csv"
-        trips = pd.read_csv(
-            os.path.join(self.scenario_path, "output", fn),
-            usecols=["person_id",
-                     "tour_id",
-                     "stop_id",
-                     "inbound",
-                     "tour_purpose",
-                     "orig_purpose",
-                     "dest_purpose",
-                     "orig_mgra",
-                     "dest_mgra",
-                     "parking_mgra",
-                     "stop_period",
-                     "trip_mode",
-                     "av_avail",
-                     "trip_board_tap",
-                     "trip_alight_tap",
-                     "set",
-                     "valueOfTime",
-                     "transponder_avail",
-                     "micro_walkMode",
-                     "micro_trnAcc",
-                     "micro_trnEgr",
-                     "parkingCost"],
-            dtype={"person_id": "int32",
-                   "tour_id": "int8",
-                   "stop_id": "int8",
-                   "inbound": "bool",
-                   "tour_purpose": "string",
-                   "orig_purpose": "string",
-                   "dest_purpose": "string",
-                   "orig_mgra": "int16",
-                   "dest_mgra": "int16",
-                   "parking_mgra": "int16",
-                   "stop_period": "int8",
-                   "trip_mode": "int8",
-                   "av_avail": "bool",
-                   "trip_board_tap": "int16",
-                   "trip_alight_tap": "int16",
-                   "set": "int8",
-                   "valueOfTime": "float32",
-                   "transponder_avail": "bool",
-                   "micro_walkMode": "int8",
-                   "micro_trnAcc": "int8",
-                   "micro_trnEgr": "int8",
-                   "parkingCost": "float32"})
 
+        return os.path.join(self.scenario_path, "output", fn), {
+            "usecols": ["person_id",
+                        "tour_id",
+                        "stop_id",
+                        "inbound",
+                        "tour_purpose",
+                        "orig_purpose",
+                        "dest_purpose",
+                        "orig_mgra",
+                        "dest_mgra",
+                        "parking_mgra",
+                        "stop_period",
+                        "trip_mode",
+                        "av_avail",
+                        "trip_board_tap",
+                        "trip_alight_tap",
+                        "set",
+                        "valueOfTime",
+                        "transponder_avail",
+                        "micro_walkMode",
+                        "micro_trnAcc",
+                        "micro_trnEgr",
+                        "parkingCost"],
+            "dtype": {"person_id": "int32",
+                      "tour_id": "int8",
+                      "stop_id": "int8",
+                      "inbound": "bool",
+                      "tour_purpose": "string",
+                      "orig_purpose": "string",
+                      "dest_purpose": "string",
+                      "orig_mgra": "int16",
+                      "dest_mgra": "int16",
+                      "parking_mgra": "int16",
+                      "stop_period": "int8",
+                      "trip_mode": "int8",
+                      "av_avail": "bool",
+                      "trip_board_tap": "int16",
+                      "trip_alight_tap": "int16",
+                      "set": "int8",
+                      "valueOfTime": "float32",
+                      "transponder_avail": "bool",
+                      "micro_walkMode": "int8",
+                      "micro_trnAcc": "int8",
+                      "micro_trnEgr": "int8",
+                      "parkingCost": "float32"}}
+
+    def _joint_csv(self) -> tuple:
+        """ Location and pandas.read_csv arguments of the Joint trip list
+        file (output/jointTripData_<<iteration>>.csv).
+
+        Returns:
+            A tuple of the string location of the Joint trip list file and
+            a dictionary of pandas.read_csv keyword arguments """
+        fn = "jointTripData_" + str(self.properties["iterations"]) + ".csv"
+
+        return os.path.join(self.scenario_path, "output", fn), {
+            "usecols": ["hh_id",
+                        "tour_id",
+                        "stop_id",
+                        "inbound",
+                        "orig_purpose",
+                        "dest_purpose",
+                        "orig_mgra",
+                        "dest_mgra",
+                        "parking_mgra",
+                        "stop_period",
+                        "trip_mode",
+                        "av_avail",
+                        "num_participants",
+                        "trip_board_tap",
+                        "trip_alight_tap",
+                        "set",
+                        "valueOfTime",
+                        "transponder_avail",
+                        "parkingCost"],
+            "dtype": {"hh_id": "int32",
+                      "tour_id": "int8",
+                      "stop_id": "int8",
+                      "inbound": "bool",
+                      "orig_purpose": "string",
+                      "dest_purpose": "string",
+                      "orig_mgra": "int16",
+                      "dest_mgra": "int16",
+                      "parking_mgra": "int16",
+                      "stop_period": "int8",
+                      "trip_mode": "int8",
+                      "av_avail": "bool",
+                      "num_participants": "int8",
+                      "trip_board_tap": "int16",
+                      "trip_alight_tap": "int16",
+                      "set": "int8",
+                      "valueOfTime": "float32",
+                      "transponder_avail": "bool",
+                      "parkingCost": "float32"}}
+
+    @staticmethod
+    def _trip_keys(trips: pd.DataFrame, tour_key: list) -> pd.DataFrame:
+        """ Create the tour, tour stop, and trip surrogate keys of a Resident
+        model (Individual, Joint) trip list. Tours are numbered in order of
+        the tour key fields, tour stops are numbered within each tour in
+        order of the (inbound, stop_id) fields, and trips are numbered in
+        tour and tour stop order.
+
+        Args:
+            trips: Pandas DataFrame of the trip list holding the tour key
+                fields and the (inbound, stop_id) fields
+            tour_key: List of the tour key field names
+
+        Returns:
+            A Pandas DataFrame of the tourID, stopID, and tripID fields with
+            the index of the input trip list """
+        keys = pd.DataFrame(index=trips.index)
+
+        # create tour surrogate key
+        keys["tourID"] = pd.Series(trips.groupby(tour_key).ngroup() + 1, dtype="int32")
+
+        # create tour stop surrogate key (inbound, stop_id)
+        stop_key = ["inbound", "stop_id"]
+        keys["stopID"] = pd.Series(trips.sort_values(by=stop_key).groupby(tour_key).cumcount() + 1, dtype="int8")
+
+        # create unique trip surrogate key
+        keys["tripID"] = pd.Series(np.arange(1, len(trips) + 1, dtype="int32"),
+                                   index=trips.sort_values(by=tour_key + stop_key).index)
+
+        return keys
+
+    @staticmethod
+    def _chunk_keys(fn: str, kwargs: dict, tour_key: list) -> pd.DataFrame:
+        """ Create the tour, tour stop, and trip surrogate keys of a Resident
+        model trip list file for reading the file in chunks. Only the key
+        fields of the file are read, string tour key fields are read as
+        categoricals and replaced by their position in sorted order so keys
+        are identical to keys created from the whole trip list.
+
+        Args:
+            fn: String location of the trip list file
+            kwargs: Dictionary of pandas.read_csv keyword arguments of the
+                trip list file
+            tour_key: List of the tour key field names
+
+        Returns:
+            A Pandas DataFrame of the tourID, stopID, and tripID fields
+            indexed by record position in the trip list file """
+        fields = tour_key + ["inbound", "stop_id"]
+        dtype = {field: "category" if kwargs["dtype"][field] == "string" else kwargs["dtype"][field]
+                 for field in fields}
+
+        trips = read_csv(fn, usecols=fields, dtype=dtype)
+
+        for field in fields:
+            if dtype[field] == "category":
+                categories = trips[field].cat.categories.sort_values()
+                trips[field] = trips[field].cat.reorder_categories(categories).cat.codes
+
+        return TripLists._trip_keys(trips, tour_key)
+
+    def _individual_trips(self, trips: pd.DataFrame) -> pd.DataFrame:
+        """ Map field values and genericize field names of Individual trip
+        list records holding the tour, tour stop, and trip surrogate keys.
+
+        Args:
+            trips: Pandas DataFrame of Individual trip list records
+
+        Returns:
+            A Pandas DataFrame of the Individual trip list records ordered
+            by the trip surrogate key """
         # apply exhaustive field mappings where applicable
         mappings = {
-            "parking_mgra": {key: value for (key, value) in
-                             zip(list(range(1, 23003)),
-                                 list(range(1, 23003)))},
+            "parking_mgra": CodeLookup.identity(1, 23002),
             "trip_mode": {1: "Drive Alone",
                           2: "Shared Ride 2",
                           3: "Shared Ride 3+",
@@ -2945,12 +3031,8 @@ class TripLists(ScenarioData):
                           11: "Non-Pooled TNC",
                           12: "Pooled TNC",
                           13: "School Bus"},
-            "trip_board_tap": {key: value for (key, value) in
-                               zip(list(range(1, 99999)),
-                                   list(range(1, 99999)))},
-            "trip_alight_tap": {key: value for (key, value) in
-                                zip(list(range(1, 99999)),
-                                    list(range(1, 99999)))},
+            "trip_board_tap": CodeLookup.identity(1, 99998),
+            "trip_alight_tap": CodeLookup.identity(1, 99998),
             "set": {0: "Local Bus",
                     1: "Premium Transit",
                     2: "Local Bus and Premium Transit"},
@@ -2970,19 +3052,7 @@ class TripLists(ScenarioData):
                 data_type = "float32"
             else:
                 data_type = "category"
-            trips[field] = trips[field].map(mappings[field]).astype(data_type)
-
-        # create tour surrogate key (person_id, tour_id, tour_purpose)
-        tour_key = ["person_id", "tour_id", "tour_purpose"]
-        trips["tourID"] = pd.Series(trips.groupby(tour_key).ngroup() + 1, dtype="int32")
-
-        # create tour stop surrogate key (inbound, stop_id)
-        stop_key = ["inbound", "stop_id"]
-        trips["stopID"] = pd.Series(trips.sort_values(by=stop_key).groupby(tour_key).cumcount() + 1, dtype="int8")
-
-        # create unique trip surrogate key
-        trips = trips.sort_values(by=tour_key + stop_key).reset_index(drop=True)
-        trips["tripID"] = pd.Series(trips.index + 1, dtype="int32")
+            trips[field] = map_codes(trips[field], mappings[field], data_type)
 
         # add TAZ information in addition to MGRA information
         taz_info = self.mgra_xref[["MGRA", "TAZ"]]
@@ -2997,6 +3067,9 @@ class TripLists(ScenarioData):
         trips.rename(columns={"TAZ": "parkingTAZ"}, inplace=True)
         trips["parkingTAZ"] = trips["parkingTAZ"].astype("float32")
 
+        # order records by the trip surrogate key
+        trips = trips.sort_values(by="tripID", kind="mergesort").reset_index(drop=True)
+
         # map abm half hours to abm five time of day
         trips["departTimeFiveTod"] = self._map_time_periods(
             abm_half_hour=trips.stop_period
@@ -3084,65 +3157,107 @@ class TripLists(ScenarioData):
                       "costParking"]]
 
     @property
-    @lru_cache(maxsize=1)
-    def joint(self) -> pd.DataFrame:
-        """ Create the Joint Model trip list.
+    @scenario_cache
+    def individual(self) -> pd.DataFrame:
+        """ Create the Individual Model trip list.
 
-        Read in the Joint trip list, map field values, genericize field
-        names, append skim values, replicate data-set records for each trip
-        participant creating data-set format of one record per participant,
-        and assign trip weights accounting for replicated records.
+        Read in the Individual trip list, map field values, and genericize
+        field names.
 
         Returns:
-            A Pandas DataFrame of the Joint trip list """
+            A Pandas DataFrame of the Individual trip list """
         # load trip list into Pandas DataFrame
-        fn_trips = "jointTripData_" + str(self.properties["iterations"]) + ".csv"
-        trips = pd.read_csv(
-            os.path.join(self.scenario_path, "output", fn_trips),
+        fn, kwargs = self._individual_csv()
+        trips = read_csv(fn, **kwargs)
+
+        # create tour surrogate key (person_id, tour_id, tour_purpose)
+        # tour stop surrogate key (inbound, stop_id) and trip surrogate key
+        trips = trips.join(self._trip_keys(trips, ["person_id", "tour_id", "tour_purpose"]))
+
+        return self._individual_trips(trips)
+
+    def individual_chunks(self, chunksize: int) -> Iterator[pd.DataFrame]:
+        """ Create the Individual Model trip list in chunks of the
+        Individual trip list file. Surrogate keys are created for the whole
+        file from its key fields so records are identical to records of the
+        individual property, memory use is bounded by the chunk size in
+        place of the trip list size.
+
+        Args:
+            chunksize: Integer number of Individual trip list file records
+                of each chunk
+
+        Returns:
+            An iterator of Pandas DataFrames of Individual trip list chunks
+            each ordered by the trip surrogate key """
+        fn, kwargs = self._individual_csv()
+        keys = self._chunk_keys(fn, kwargs, ["person_id", "tour_id", "tour_purpose"])
+
+        for trips in read_csv(fn, chunksize=chunksize, **kwargs):
+            yield self._individual_trips(trips.join(keys))
+
+    def _joint_participants(self) -> pd.DataFrame:
+        """ Create the Joint Model tour participants, one record per tour
+        participant holding the person id of the participant.
+
+        Returns:
+            A Pandas DataFrame of the Joint tour participants """
+        # load tour list into Pandas DataFrame
+        fn_tours = "jointTourData_" + str(
+            self.properties["iterations"]) + ".csv"
+        tours = read_csv(
+            os.path.join(self.scenario_path, "output", fn_tours),
             usecols=["hh_id",
                      "tour_id",
-                     "stop_id",
-                     "inbound",
-                     "orig_purpose",
-                     "dest_purpose",
-                     "orig_mgra",
-                     "dest_mgra",
-                     "parking_mgra",
-                     "stop_period",
-                     "trip_mode",
-                     "av_avail",
-                     "num_participants",
-                     "trip_board_tap",
-                     "trip_alight_tap",
-                     "set",
-                     "valueOfTime",
-                     "transponder_avail",
-                     "parkingCost"],
+                     "tour_participants"],
             dtype={"hh_id": "int32",
                    "tour_id": "int8",
-                   "stop_id": "int8",
-                   "inbound": "bool",
-                   "orig_purpose": "string",
-                   "dest_purpose": "string",
-                   "orig_mgra": "int16",
-                   "dest_mgra": "int16",
-                   "parking_mgra": "int16",
-                   "stop_period": "int8",
-                   "trip_mode": "int8",
-                   "av_avail": "bool",
-                   "num_participants": "int8",
-                   "trip_board_tap": "int16",
-                   "trip_alight_tap": "int16",
-                   "set": "int8",
-                   "valueOfTime": "float32",
-                   "transponder_avail": "bool",
-                   "parkingCost": "float32"})
+                   "tour_participants": "string"})
 
+        # split the tour participants column by " " and append in wide-format
+        # to each record
+        tours = pd.concat(
+            [tours[["hh_id", "tour_id"]],
+             tours["tour_participants"].str.split(" ", expand=True)],
+            axis=1
+        )
+
+        # melt the wide-format tour participants to long-format
+        tours = pd.melt(tours, id_vars=["hh_id", "tour_id"],
+                        value_name="person_num")
+        tours = tours[tours["person_num"].notnull()]
+        tours["person_num"] = tours["person_num"].astype("int8")
+
+        # load output person data into Pandas DataFrame
+        fn_persons = "personData_" + str(self.properties["iterations"]) + ".csv"
+        persons = read_csv(
+            os.path.join(self.scenario_path, "output", fn_persons),
+            usecols=["hh_id",
+                     "person_num",
+                     "person_id"],
+            dtype={"hh_id": "int32",
+                   "person_num": "int8",
+                   "person_id": "int32"})
+        persons.rename(columns={"person_id": "personID"}, inplace=True)
+
+        # merge persons with the long-format tour participants to get the person id
+        return tours.merge(persons, on=["hh_id", "person_num"])
+
+    def _joint_trips(self, trips: pd.DataFrame, participants: pd.DataFrame) -> pd.DataFrame:
+        """ Map field values, genericize field names, replicate records for
+        each trip participant, and assign trip weights of Joint trip list
+        records holding the tour, tour stop, and trip surrogate keys.
+
+        Args:
+            trips: Pandas DataFrame of Joint trip list records
+            participants: Pandas DataFrame of the Joint tour participants
+
+        Returns:
+            A Pandas DataFrame of the Joint trip list records, one record
+            per trip participant, ordered by the trip surrogate key """
         # apply exhaustive field mappings where applicable
         mappings = {
-            "parking_mgra": {key: value for (key, value) in
-                             zip(list(range(1, 23003)),
-                                 list(range(1, 23003)))},
+            "parking_mgra": CodeLookup.identity(1, 23002),
             "trip_mode": {2: "Shared Ride 2",
                           3: "Shared Ride 3+",
                           4: "Walk",
@@ -3154,12 +3269,8 @@ class TripLists(ScenarioData):
                           10: "Taxi",
                           11: "Non-Pooled TNC",
                           12: "Pooled TNC"},
-            "trip_board_tap": {key: value for (key, value) in
-                               zip(list(range(1, 99999)),
-                                   list(range(1, 99999)))},
-            "trip_alight_tap": {key: value for (key, value) in
-                                zip(list(range(1, 99999)),
-                                    list(range(1, 99999)))},
+            "trip_board_tap": CodeLookup.identity(1, 99998),
+            "trip_alight_tap": CodeLookup.identity(1, 99998),
             "set": {0: "Local Bus",
                     1: "Premium Transit",
                     2: "Local Bus and Premium Transit"},
@@ -3170,23 +3281,7 @@ class TripLists(ScenarioData):
                 data_type = "float32"
             else:
                 data_type = "category"
-            trips[field] = trips[field].map(mappings[field]).astype(data_type)
-
-        # create tour surrogate key (hh_id, tour_id)
-        tour_key = ["hh_id", "tour_id"]
-        trips["tourID"] = pd.Series(
-            trips.groupby(tour_key).ngroup() + 1,
-            dtype="int32")
-
-        # create tour stop surrogate key (inbound, stop_id)
-        stop_key = ["inbound", "stop_id"]
-        trips["stopID"] = pd.Series(
-            trips.sort_values(by=stop_key).groupby(tour_key).cumcount() + 1,
-            dtype="int8")
-
-        # create unique trip surrogate key
-        trips = trips.sort_values(by=tour_key + stop_key).reset_index(drop=True)
-        trips["tripID"] = pd.Series(trips.index + 1, dtype="int32")
+            trips[field] = map_codes(trips[field], mappings[field], data_type)
 
         # add TAZ information in addition to MGRA information
         taz_info = self.mgra_xref[["MGRA", "TAZ"]]
@@ -3200,6 +3295,7 @@ class TripLists(ScenarioData):
         trips = trips.merge(taz_info, how="left", left_on="parking_mgra",
                             right_on="MGRA")
         trips.rename(columns={"TAZ": "parkingTAZ"}, inplace=True)
+        trips["parkingTAZ"] = trips["parkingTAZ"].astype("float32")
 
         # map abm half hours to abm five time of day
         trips["departTimeFiveTod"] = self._map_time_periods(
@@ -3234,51 +3330,13 @@ class TripLists(ScenarioData):
                               "transponder_avail": "transponderAvailable"},
                      inplace=True)
 
-        # load tour list into Pandas DataFrame
-        fn_tours = "jointTourData_" + str(
-            self.properties["iterations"]) + ".csv"
-        tours = pd.read_csv(
-            os.path.join(self.scenario_path, "output", fn_tours),
-            usecols=["hh_id",
-                     "tour_id",
-                     "tour_participants"],
-            dtype={"hh_id": "int32",
-                   "tour_id": "int8",
-                   "tour_participants": "string"})
-
-        # split the tour participants column by " " and append in wide-format
-        # to each record
-        tours = pd.concat(
-            [tours[["hh_id", "tour_id"]],
-             tours["tour_participants"].str.split(" ", expand=True)],
-            axis=1
-        )
-
-        # melt the wide-format tour participants to long-format
-        tours = pd.melt(tours, id_vars=["hh_id", "tour_id"],
-                        value_name="person_num")
-        tours = tours[tours["person_num"].notnull()]
-        tours["person_num"] = tours["person_num"].astype("int8")
-
-        # load output person data into Pandas DataFrame
-        fn_persons = "personData_" + str(self.properties["iterations"]) + ".csv"
-        persons = pd.read_csv(
-            os.path.join(self.scenario_path, "output", fn_persons),
-            usecols=["hh_id",
-                     "person_num",
-                     "person_id"],
-            dtype={"hh_id": "int32",
-                   "person_num": "int8",
-                   "person_id": "int32"})
-        persons.rename(columns={"person_id": "personID"}, inplace=True)
-
-        # merge persons with the long-format tour participants to get the person id
-        tours = tours.merge(persons, on=["hh_id", "person_num"])
-
         # merge long-format tour participants with the trip list
         # this many-to-one merge replicates trip records for each participant
         # as well as appending the person id to each replicated record
-        trips = trips.merge(tours, on=["hh_id", "tour_id"])
+        trips = trips.merge(participants, on=["hh_id", "tour_id"])
+
+        # order records by the trip surrogate key
+        trips = trips.sort_values(by="tripID", kind="mergesort").reset_index(drop=True)
 
         # add vehicle/trip-based weight and person-based weight
         # adjust by the ABM scenario final iteration sample rate
@@ -3316,7 +3374,50 @@ class TripLists(ScenarioData):
                       "costParking"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
+    def joint(self) -> pd.DataFrame:
+        """ Create the Joint Model trip list.
+
+        Read in the Joint trip list, map field values, genericize field
+        names, append skim values, replicate data-set records for each trip
+        participant creating data-set format of one record per participant,
+        and assign trip weights accounting for replicated records.
+
+        Returns:
+            A Pandas DataFrame of the Joint trip list """
+        # load trip list into Pandas DataFrame
+        fn, kwargs = self._joint_csv()
+        trips = read_csv(fn, **kwargs)
+
+        # create tour surrogate key (hh_id, tour_id)
+        # tour stop surrogate key (inbound, stop_id) and trip surrogate key
+        trips = trips.join(self._trip_keys(trips, ["hh_id", "tour_id"]))
+
+        return self._joint_trips(trips, self._joint_participants())
+
+    def joint_chunks(self, chunksize: int) -> Iterator[pd.DataFrame]:
+        """ Create the Joint Model trip list in chunks of the Joint trip
+        list file. Surrogate keys are created for the whole file from its
+        key fields so records are identical to records of the joint
+        property, memory use is bounded by the chunk size in place of the
+        trip list size.
+
+        Args:
+            chunksize: Integer number of Joint trip list file records of
+                each chunk, before replication for each trip participant
+
+        Returns:
+            An iterator of Pandas DataFrames of Joint trip list chunks each
+            ordered by the trip surrogate key """
+        fn, kwargs = self._joint_csv()
+        keys = self._chunk_keys(fn, kwargs, ["hh_id", "tour_id"])
+        participants = self._joint_participants()
+
+        for trips in read_csv(fn, chunksize=chunksize, **kwargs):
+            yield self._joint_trips(trips.join(keys), participants)
+
+    @property
+    @scenario_cache
     def truck(self) -> pd.DataFrame:
         """ Create the Truck Model trip list.
 
@@ -3326,7 +3427,7 @@ class TripLists(ScenarioData):
         Returns:
             A Pandas DataFrame of the External-External trips list """
         # load trip list into Pandas DataFrame
-        trips = pd.read_csv(
+        trips = read_csv(
             os.path.join(self.scenario_path, "report", "trucktrip.csv"),
             usecols=["OTAZ",
                      "DTAZ",
@@ -3367,9 +3468,9 @@ class TripLists(ScenarioData):
 
         for field in mappings:
             if field == "TOD":
-                trips[field] = trips[field].map(mappings[field]).astype("int8")
+                trips[field] = map_codes(trips[field], mappings[field], "int8")
             else:
-                trips[field] = trips[field].map(mappings[field]).astype("category")
+                trips[field] = map_codes(trips[field], mappings[field], "category")
 
         # convert cents-based cost fields to dollars
         trips["AOC"] = trips["AOC"] / 100
@@ -3421,7 +3522,7 @@ class TripLists(ScenarioData):
                       "costTotal"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def visitor(self) -> pd.DataFrame:
         """ Create the Visitor Model trip list.
 
@@ -3431,7 +3532,7 @@ class TripLists(ScenarioData):
         Returns:
             A Pandas DataFrame of the Visitor trip list """
         # load trip list into Pandas DataFrame
-        trips = pd.read_csv(
+        trips = read_csv(
             os.path.join(self.scenario_path, "output", "visitorTrips.csv"),
             usecols=["tourID",
                      "tripID",
@@ -3494,12 +3595,8 @@ class TripLists(ScenarioData):
                          10: "Taxi",
                          11: "Non-Pooled TNC",
                          12: "Pooled TNC"},
-            "boardingTap": {key: value for (key, value) in
-                            zip(list(range(1, 99999)),
-                                list(range(1, 99999)))},
-            "alightingTap": {key: value for (key, value) in
-                             zip(list(range(1, 99999)),
-                                 list(range(1, 99999)))},
+            "boardingTap": CodeLookup.identity(1, 99998),
+            "alightingTap": CodeLookup.identity(1, 99998),
             "set": {0: "Local Bus",
                     1: "Premium Transit",
                     2: "Local Bus and Premium Transit"},
@@ -3519,7 +3616,7 @@ class TripLists(ScenarioData):
                 data_type = "float32"
             else:
                 data_type = "category"
-            trips[field] = trips[field].map(mappings[field]).astype(data_type)
+            trips[field] = map_codes(trips[field], mappings[field], data_type)
 
         # create unique trip surrogate key
         # the tripID field included in the data-set is a stopID
@@ -3614,7 +3711,7 @@ class TripLists(ScenarioData):
                       "costParking"]]
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def zombie_av(self) -> pd.DataFrame:
         """ Create the 0-Passenger Autonomous Vehicle trip list.
 
@@ -3628,7 +3725,7 @@ class TripLists(ScenarioData):
         # file does not exist if AV-component of model is turned off
         if os.path.isfile(fn):
             # load trip list into Pandas DataFrame
-            trips = pd.read_csv(
+            trips = read_csv(
                 fn,
                 usecols=["hh_id",
                          "veh_id",
@@ -3666,7 +3763,7 @@ class TripLists(ScenarioData):
 
             # load output household transponder ownership data
             hh_fn = "householdData_" + str(self.properties["iterations"]) + ".csv"
-            hh = pd.read_csv(
+            hh = read_csv(
                 os.path.join(self.scenario_path, "output", hh_fn),
                 usecols=["hh_id", "transponder"],
                 dtype={"hh_id": "int32",
@@ -3764,7 +3861,7 @@ class TripLists(ScenarioData):
                          "weightPersonTrip"]))
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
     def zombie_tnc(self) -> pd.DataFrame:
         """ Create the 0-Passenger TNC trip list.
 
@@ -3774,7 +3871,7 @@ class TripLists(ScenarioData):
         Returns:
             A Pandas DataFrame of the 0-Passenger TNC Vehicle trip list """
         # load trip list into Pandas DataFrame
-        trips = pd.read_csv(
+        trips = read_csv(
             os.path.join(self.scenario_path, "output", "TNCTrips.csv"),
             usecols=["trip_ID",
                      "originMgra",
@@ -3816,7 +3913,7 @@ class TripLists(ScenarioData):
         }
 
         for field in mappings:
-            trips[field] = trips[field].map(mappings[field]).astype("category")
+            trips[field] = map_codes(trips[field], mappings[field], "category")
 
         # only map TNC time periods to ABM time periods if they nest
         period_width = self.properties["timePeriodWidthTNC"]
@@ -3824,30 +3921,13 @@ class TripLists(ScenarioData):
             # map TNC time periods to actual period start times
             # take the defined width of the time periods multiplied
             # by the time period number as the minutes after 3am allowing
-            # the time periods to wrap around 12am and set the time value
-            trips["StartTime"] = trips["startPeriod"].apply(
-                lambda x: (datetime.combine(date.today(), time(3, 0)) +
-                           timedelta(minutes=(x-1) * period_width)).time())
-            trips["EndTime"] = trips["endPeriod"].apply(
-                lambda x: (datetime.combine(date.today(), time(3, 0)) +
-                           timedelta(minutes=(x-1) * period_width)).time())
+            # the time periods to wrap around 12am
+            trips["StartTime"] = 3 + (trips["startPeriod"] - 1) * period_width / 60
+            trips["EndTime"] = 3 + (trips["endPeriod"] - 1) * period_width / 60
 
             # map continuous times to abm half hour periods
-            depart_half_hour = [
-                [p["period"] for p in self.time_periods["abmHalfHour"]
-                 if p["startTime"] <= x < p["endTime"]]
-                for x in trips["StartTime"]]
-            depart_half_hour = [val for sublist in depart_half_hour for val in sublist]
-            trips = trips.assign(departTimeAbmHalfHour=depart_half_hour)
-            trips["departTimeAbmHalfHour"] = trips["departTimeAbmHalfHour"].astype("int8")
-
-            arrive_half_hour = [
-                [p["period"] for p in self.time_periods["abmHalfHour"]
-                 if p["startTime"] <= x < p["endTime"]]
-                for x in trips["EndTime"]]
-            arrive_half_hour = [val for sublist in arrive_half_hour for val in sublist]
-            trips = trips.assign(arriveTimeAbmHalfHour=arrive_half_hour)
-            trips["arriveTimeAbmHalfHour"] = trips["arriveTimeAbmHalfHour"].astype("int8")
+            trips["departTimeAbmHalfHour"] = map_half_hour(trips["StartTime"])
+            trips["arriveTimeAbmHalfHour"] = map_half_hour(trips["EndTime"])
 
             # map abm half hours to abm five time of day
             trips["departTimeFiveTod"] = self._map_time_periods(
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+""" Skim Appender Benchmark Module.
+
+This module times the SkimAppender class OMX auto and transit skim
+appending methods over a range of skim thread pool sizes. A synthetic ABM
+scenario holding OMX auto and transit skim files and a synthetic trip list
+are written to a temporary folder that is removed when the benchmark
+completes. Each worker count is timed with an empty skim cache (cold),
+including the OMX file reads, and again with the skim matrices held in the
+skim cache (warm).
+
+Usage:
+    python benchmarkSkimAppender.py --zones 400 --taps 300 --trips 2000000
+        --workers 1 2 4 8
+
+Notes:
+    docstring style guide - http://google.github.io/styleguide/pyguide.html
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import openmatrix as omx  # https://github.com/osPlanning/omx-python
+import pandas as pd
+from skimAppender import SkimAppender
+
+
+# ABM scenario properties file tokens read by the SkimAppender class
+PROPERTIES = """active.microtransit.accessTime=2.0
+aoc.fuel=12.5
+aoc.maintenance=5.5
+active.micromobility.fixedCost=1.0
+active.microtransit.fixedCost=1.25
+TNC.single.baseFare=2.2
+TNC.shared.baseFare=1.8
+taxi.baseFare=3.0
+active.bike.minutes.per.mile=4.0
+TNC.single.costMinimum=7.2
+TNC.shared.costMinimum=3.0
+Mobility.AV.CostPerMileFactor=0.7
+TNC.single.costPerMile=1.3
+TNC.shared.costPerMile=0.8
+taxi.costPerMile=2.5
+active.micromobility.variableCost=0.15
+active.microtransit.variableCost=0.0
+TNC.single.costPerMinute=0.25
+TNC.shared.costPerMinute=0.15
+taxi.costPerMinute=0.3
+active.micromobility.speed=15
+active.microtransit.speed=17
+Mobility.AV.TerminalTimeFactor=0.65
+active.microtransit.waitTime=4.0
+TNC.single.waitTime.mean=3.0,6.3,8.4,8.5,10.3
+TNC.shared.waitTime.mean=5.0,8.0,11.0,15.0,15.0
+WaitTimeDistribution.EndPopEmpPerSqMi=500,2000,5000,15000,9999999999
+Taxi.waitTime.mean=5.5,9.5,13.3,17.3,26.5
+active.walk.minutes.per.mile=20
+scenarioYear=2016
+"""
+
+TODS = ["EA", "AM", "MD", "PM", "EV"]
+
+AUTO_MODES = ["Drive Alone",
+              "Shared Ride 2",
+              "Shared Ride 3+",
+              "Heavy Heavy Duty Truck"]
+
+TRANSIT_MODES = ["Walk to Transit - Local Bus",
+                 "Walk to Transit - Premium Transit",
+                 "Walk to Transit - Local Bus and Premium Transit"]
+
+
+def create_scenario(scenario_path: str, zones: int, taps: int) -> None:
+    """ Writes a synthetic ABM scenario holding the properties file, the
+    OMX auto skim files (output/traffic_skims_<TOD>.omx) and the OMX transit
+    skim file (output/transit_skims.omx) filled with random skims.
+
+    Args:
+        scenario_path: String location of the synthetic ABM scenario folder
+        zones: Integer number of TAZs of the OMX auto skim files
+        taps: Integer number of TAPs of the OMX transit skim file """
+    rng = np.random.default_rng(0)
+
+    for folder in ["conf", "output"]:
+        os.makedirs(os.path.join(scenario_path, folder), exist_ok=True)
+
+    with open(os.path.join(scenario_path, "conf", "sandag_abm.properties"), "w") as file:
+        file.write(PROPERTIES)
+
+    for tod in TODS:
+        omx_file = omx.open_file(
+            os.path.join(scenario_path, "output", "traffic_skims_" + tod + ".omx"), "w")
+        omx_file.create_mapping("zone_number", np.arange(1, zones + 1))
+        for mode in ["SOV_NT", "SOV_TR", "HOV2", "HOV3", "TRK"]:
+            for vot in ["L", "M", "H"]:
+                for skim in ["TIME", "DIST", "TOLLCOST"]:
+                    omx_file["_".join([tod, mode, vot, skim])] = \
+                        rng.uniform(0, 60, (zones, zones)).astype("float32")
+        omx_file.close()
+
+    omx_file = omx.open_file(os.path.join(scenario_path, "output", "transit_skims.omx"), "w")
+    omx_file.create_mapping("zone_number", np.arange(1, taps + 1))
+    for tod in TODS:
+        for skim_set in ["BUS", "PREM", "ALLPEN"]:
+            for skim in ["TOTALIVTT", "TIER1IVTT", "BRTYELIVTT", "BRTREDIVTT",
+                         "EXPIVTT", "BUSIVTT", "LRTIVTT", "CMRIVTT", "FIRSTWAIT",
+                         "TOTALWAIT", "TOTALWALK", "TOTDIST", "FARE", "XFERS"]:
+                omx_file["_".join([tod, skim_set, skim])] = \
+                    rng.uniform(0, 30, (taps, taps)).astype("float32")
+    omx_file.close()
+
+
+def create_trips(n: int, zones: int, taps: int) -> pd.DataFrame:
+    """ Returns a synthetic trip list of auto and transit mode trips holding
+    the fields used by the SkimAppender class OMX skim appending methods.
+
+    Args:
+        n: Integer number of trips
+        zones: Integer number of TAZs
+        taps: Integer number of TAPs
+
+    Returns:
+        A Pandas DataFrame trip list """
+    rng = np.random.default_rng(1)
+    mode = rng.choice(AUTO_MODES + TRANSIT_MODES, n)
+    transit = np.isin(mode, TRANSIT_MODES)
+
+    return pd.DataFrame({
+        "tripID": np.arange(1, n + 1, dtype="int32"),
+        "departTimeFiveTod": rng.integers(1, 6, n).astype("int8"),
+        "tripMode": pd.Categorical(mode),
+        "transponderAvailable": rng.random(n) < 0.5,
+        "valueOfTimeCategory": pd.Categorical(rng.choice(["Low", "Medium", "High"], n)),
+        "originTAZ": rng.integers(1, zones + 1, n).astype("int16"),
+        "destinationTAZ": rng.integers(1, zones + 1, n).astype("int16"),
+        "parkingTAZ": np.full(n, np.nan, dtype="float32"),
+        "boardingTAP": np.where(transit, rng.integers(1, taps + 1, n), np.nan).astype("float32"),
+        "alightingTAP": np.where(transit, rng.integers(1, taps + 1, n), np.nan).astype("float32")})
+
+
+def run(skims: SkimAppender, trips: pd.DataFrame) -> float:
+    """ Appends OMX auto and transit skims to a copy of a trip list and
+    returns the elapsed time in seconds.
+
+    Args:
+        skims: SkimAppender of the synthetic ABM scenario
+        trips: Pandas DataFrame trip list
+
+    Returns:
+        Float elapsed time in seconds """
+    start = time.perf_counter()
+    df = skims.omx_auto_skim_appender(trips.copy())
+    skims.omx_transit_skims(df)
+
+    return time.perf_counter() - start
+
+
+def benchmark(zones: int, taps: int, n: int, workers: list) -> pd.DataFrame:
+    """ Times the SkimAppender class OMX skim appending methods on a
+    synthetic ABM scenario for each number of skim workers.
+
+    Args:
+        zones: Integer number of TAZs of the OMX auto skim files
+        taps: Integer number of TAPs of the OMX transit skim file
+        n: Integer number of trips
+        workers: List of integer numbers of skim workers
+
+    Returns:
+        A Pandas DataFrame of cold and warm skim cache timings in seconds
+        and the speedup relative to the first number of skim workers """
+    scenario_path = tempfile.mkdtemp(prefix="skimAppenderBenchmark")
+
+    try:
+        create_scenario(scenario_path, zones, taps)
+        trips = create_trips(n, zones, taps)
+
+        results = []
+        for count in workers:
+            skims = SkimAppender(scenario_path, skim_workers=count)
+            results.append({"workers": count,
+                            "cold": run(skims, trips),
+                            "warm": run(skims, trips)})
+    finally:
+        shutil.rmtree(scenario_path, ignore_errors=True)
+
+    results = pd.DataFrame(results)
+    results["speedupCold"] = results["cold"].iloc[0] / results["cold"]
+    results["speedupWarm"] = results["warm"].iloc[0] / results["warm"]
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--zones", type=int, default=400, help="number of TAZs")
+    parser.add_argument("--taps", type=int, default=300, help="number of TAPs")
+    parser.add_argument("--trips", type=int, default=2000000, help="number of trips")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="numbers of skim workers")
+    args = parser.parse_args()
+
+    print(benchmark(args.zones, args.taps, args.trips, args.workers).round(2).to_string(index=False))
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+""" Chunk Writer Module.
+
+This module contains the function used by the ABM Scenario Data Exporter
+Modules to write data-sets created in chunks (e.g. TripLists.individual_chunks)
+to a csv file ordered by a surrogate key without holding the whole
+data-set in memory. Chunks are split into buckets of key ranges spilled to
+a temporary folder, each bucket is then read back, ordered by the key and
+appended to the csv file. The csv file is identical to the csv file written
+from the whole data-set ordered by the key.
+
+Notes:
+    docstring style guide - http://google.github.io/styleguide/pyguide.html
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Iterable
+import pandas as pd
+
+
+def write_sorted_csv(chunks: Iterable[pd.DataFrame], fn: str, key: str, bucket_size: int) -> int:
+    """ Writes chunks of a data-set to a csv file ordered by a positive
+    integer key field. Records sharing a key value must be held in a single
+    chunk, their order within the chunk is kept. Memory use is bounded by
+    the chunk size and the number of records per bucket of key values.
+
+    Args:
+        chunks: Iterable of Pandas DataFrames holding the same fields
+        fn: String location of the csv file
+        key: String name of the positive integer key field
+        bucket_size: Integer number of key values of each bucket
+
+    Returns:
+        Integer number of records written
+
+    Raises:
+        ValueError: If the fields of a chunk differ from the fields of the
+            first chunk """
+    # spill buckets next to the csv file
+    spill_path = tempfile.mkdtemp(prefix="chunkWriter", dir=os.path.dirname(os.path.abspath(fn)))
+
+    try:
+        columns = None
+        pieces = {}  # bucket -> list of spilled piece locations
+        for chunk in chunks:
+            if columns is None:
+                columns = list(chunk.columns)
+            elif list(chunk.columns) != columns:
+                raise ValueError("chunk fields differ from first chunk fields")
+
+            buckets = (chunk[key].to_numpy(dtype="int64") - 1) // bucket_size
+            for bucket, idx in pd.Series(buckets).groupby(buckets).indices.items():
+                piece_fn = os.path.join(spill_path, str(bucket) + "_" +
+                                        str(len(pieces.get(bucket, []))) + ".pkl")
+                chunk.iloc[idx].to_pickle(piece_fn)
+                pieces.setdefault(bucket, []).append(piece_fn)
+
+        # write each bucket ordered by the key field keeping chunk order
+        records = 0
+        header = True
+        with open(fn, "w", newline="") as file:
+            if columns is not None and not pieces:
+                pd.DataFrame(columns=columns).to_csv(file, index=False)
+
+            for bucket in sorted(pieces):
+                df = pd.concat([pd.read_pickle(piece_fn) for piece_fn in pieces[bucket]])
+                df = df.sort_values(by=key, kind="mergesort")
+                df.to_csv(file, index=False, header=header)
+
+                records += len(df)
+                header = False
+                for piece_fn in pieces[bucket]:
+                    os.remove(piece_fn)
+    finally:
+        shutil.rmtree(spill_path, ignore_errors=True)
+
+    return records
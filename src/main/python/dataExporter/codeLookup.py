@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+""" Code Lookup Module.
+
+This module contains the class and function used by the ABM Scenario Data
+Exporter Modules to map coded ABM output fields (e.g. mode, purpose, TAP)
+to their values. Each mapping is compiled once into a dense NumPy array of
+value codes indexed by integer key, or a Pandas Index for other keys, and
+whole columns are mapped with array indexing in place of Pandas .map with
+a Python dictionary. Identity mappings of a range of integer codes are not
+mapped at all, codes outside the range are set to missing in a single
+vectorized check.
+
+Notes:
+    docstring style guide - http://google.github.io/styleguide/pyguide.html
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_categorical_dtype, is_integer_dtype, is_numeric_dtype
+
+
+class CodeLookup(object):
+    """ This class holds a mapping of codes to values compiled for
+    vectorized lookups. The distinct mapping values are held as categories
+    and each key is mapped to the position of its value. Integer keys
+    spanning fewer than max_span codes are held in a dense NumPy array
+    indexed by code, other keys are held in a Pandas Index.
+
+    Args:
+        mapping: Dictionary of codes to values
+
+    Methods:
+        codes: Returns the category positions of the values of coded fields
+        identity: Creates an identity mapping of a range of integer codes
+        map: Maps a coded field to its values """
+
+    # maximum span of integer keys held in a dense array
+    max_span = 1000000
+
+    def __init__(self, mapping: dict) -> None:
+        self.mapping = mapping
+        self.bounds = None  # range of integer codes of an identity mapping
+
+        # distinct values in order of appearance and the value of each key
+        self.categories = pd.Index(pd.unique(pd.Series(list(mapping.values()),
+                                                       dtype=None if mapping else "object")))
+        value_codes = self.categories.get_indexer(list(mapping.values())).astype("int32")
+
+        keys = list(mapping.keys())
+        self._offset = None
+        self._dense = None
+        self._keys = pd.Index(keys)
+        self._value_codes = value_codes
+
+        if len(keys) > 0 and all(isinstance(key, (int, np.integer)) and
+                                 not isinstance(key, bool) for key in keys):
+            low, high = min(keys), max(keys)
+            if high - low < self.max_span:
+                self._offset = low
+                self._dense = np.full(high - low + 1, -1, dtype="int32")
+                self._dense[np.asarray(keys, dtype="int64") - low] = value_codes
+
+    @classmethod
+    def identity(cls, low: int, high: int) -> "CodeLookup":
+        """ Creates an identity mapping of a range of integer codes. Codes
+        in the range map to themselves, all other codes map to missing.
+
+        Args:
+            low: Integer lowest code of the range
+            high: Integer highest code of the range (inclusive)
+
+        Returns:
+            A CodeLookup of the identity mapping """
+        lookup = cls({})
+        lookup.bounds = (low, high)
+
+        return lookup
+
+    def codes(self, values: pd.Series) -> np.ndarray:
+        """ Returns the category positions of the values of a coded field.
+
+        Args:
+            values: Pandas Series of codes
+
+        Returns:
+            A NumPy int32 array of category positions, -1 where the code is
+            not in the mapping """
+        if self._dense is not None and is_numeric_dtype(values) and \
+                not is_categorical_dtype(values):
+            if is_integer_dtype(values):
+                idx = values.to_numpy(dtype="int64") - self._offset
+                valid = (idx >= 0) & (idx < len(self._dense))
+            else:
+                # non-integer codes are unknown
+                idx = values.to_numpy(dtype="float64") - self._offset
+                valid = (idx >= 0) & (idx < len(self._dense)) & (idx == np.floor(idx))
+
+            # codes outside the dense array are unknown
+            if valid.all():
+                codes = self._dense[idx.astype("int64")]
+            else:
+                codes = np.full(len(idx), -1, dtype="int32")
+                codes[valid] = self._dense[idx[valid].astype("int64")]
+        else:
+            idx = self._keys.get_indexer(values)
+            codes = np.where(idx >= 0, self._value_codes[idx], -1).astype("int32")
+
+        return codes
+
+    def _values(self, codes: np.ndarray) -> np.ndarray:
+        """ Returns the numeric mapping values of category positions.
+
+        Args:
+            codes: NumPy array of category positions, -1 where missing
+
+        Returns:
+            A NumPy array of the mapping values, float (object if boolean)
+            with NaN where missing if any positions are missing """
+        result = np.asarray(self.categories)[np.maximum(codes, 0)]
+
+        if (codes < 0).any():
+            missing_type = "object" if result.dtype == "bool" else "float64"
+            result = np.where(codes >= 0, result.astype(missing_type), np.nan)
+
+        return result
+
+    def map(self, values: pd.Series, dtype: str) -> pd.Series:
+        """ Maps a coded field to its values. Matches the result of
+        values.map(mapping).astype(dtype): codes not in the mapping are set
+        to missing and categorical results hold the sorted categories
+        present in the result.
+
+        Args:
+            values: Pandas Series of codes
+            dtype: String data type of the result (e.g. category, float32)
+
+        Returns:
+            A Pandas Series of the mapped values
+
+        Raises:
+            ValueError: If an integer data type is requested and codes not
+                in the mapping are present """
+        if is_categorical_dtype(values) and self.bounds is None:
+            # categorical fields are mapped by Pandas once per category
+            return values.map(self.mapping).astype(dtype)
+
+        if self.bounds is not None:
+            keys = values.to_numpy(dtype="float64")
+            valid = (keys >= self.bounds[0]) & (keys <= self.bounds[1]) & \
+                (keys == np.floor(keys))
+            result = np.where(valid, keys, np.nan)
+            codes = np.where(valid, 0, -1)
+        else:
+            codes = self.codes(values)
+            result = None
+
+        if dtype == "category":
+            if self.bounds is not None or is_numeric_dtype(self.categories):
+                if result is None:
+                    result = self._values(codes)
+                return pd.Series(result, index=values.index, name=values.name).astype("category")
+
+            # keep the categories present in the result sorted by value
+            used = np.flatnonzero(np.bincount(codes[codes >= 0], minlength=len(self.categories)))
+            categories = self.categories[used].sort_values()
+            # unknown codes (-1) index the trailing missing position
+            positions = np.full(len(self.categories) + 1, -1, dtype="int32")
+            positions[self.categories.get_indexer(categories)] = np.arange(len(categories))
+
+            categorical = pd.Categorical.from_codes(positions[codes], categories=categories)
+
+            return pd.Series(categorical, index=values.index, name=values.name)
+
+        if is_integer_dtype(np.dtype(dtype)) and (codes < 0).any():
+            unknown = pd.unique(values[codes < 0])
+            raise ValueError(str(values.name) + " codes not in mapping: " +
+                             ", ".join(map(str, unknown[:10])))
+
+        if result is None:
+            result = self._values(codes)
+
+        return pd.Series(result, index=values.index, name=values.name).astype(dtype)
+
+
+def map_codes(values: pd.Series, mapping, dtype: str) -> pd.Series:
+    """ Maps a coded field to its values with a CodeLookup.
+
+    Args:
+        values: Pandas Series of codes
+        mapping: Dictionary of codes to values or a CodeLookup
+        dtype: String data type of the result (e.g. category, float32)
+
+    Returns:
+        A Pandas Series of the mapped values """
+    if not isinstance(mapping, CodeLookup):
+        mapping = CodeLookup(mapping)
+
+    return mapping.map(values, dtype)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+""" CSV Cache Module.
+
+This module contains the functions used by the ABM Scenario Data Exporter
+Modules to read the csv files of a completed SANDAG Activity-Based Model
+(ABM) scenario (e.g. output/indivTripData_<<iteration>>.csv) through a
+columnar file cache. On first read each parsed csv file is written as a
+typed Parquet file to a csvCache folder next to the csv file, later reads
+of the same csv file with the same read arguments are read from the
+Parquet file in place of re-parsing the csv file. Cache files are keyed by
+the csv file location, size and modification time, the read arguments and
+the cache reader version so a modified csv file is parsed again.
+
+The cache is optional. It requires the pyarrow package (see environment.yml),
+without it csv files are parsed on every read. As cache files are written to
+the input and output folders of the ABM scenario the cache can be switched
+off by setting the ABM_CSV_CACHE environment variable to 0 or the module
+enabled attribute to False, csv files are then parsed on every read and no
+cache files are written. The cache of an ABM scenario can be reported and
+cleared from the command line.
+
+Usage:
+    python csvCache.py report <<scenario_path>>
+    python csvCache.py clear <<scenario_path>>
+
+Notes:
+    docstring style guide - http://google.github.io/styleguide/pyguide.html
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import threading
+import pandas as pd
+
+try:
+    import pyarrow  # https://arrow.apache.org/docs/python/
+except ImportError:
+    pyarrow = None
+
+# version of the cache reader, increment to invalidate existing cache files
+# if the cache file format or the parsed data-sets change
+READER_VERSION = 1
+
+# name of the cache folder created next to the cached csv files
+CACHE_FOLDER = "csvCache"
+
+# switch the cache on or off, set from the ABM_CSV_CACHE environment variable
+enabled = os.environ.get("ABM_CSV_CACHE", "1") != "0"
+
+
+def cache_key(fn: str, **kwargs) -> str:
+    """ Returns the cache key of a csv file read. The key is a hash of the
+    csv file location, size and modification time, the pandas.read_csv
+    keyword arguments and the cache reader, Pandas and pyarrow versions.
+
+    Args:
+        fn: String location of the csv file
+        **kwargs: Keyword arguments passed to pandas.read_csv
+
+    Returns:
+        String hexadecimal cache key """
+    stat = os.stat(fn)
+    token = repr([os.path.abspath(fn),
+                  stat.st_size,
+                  stat.st_mtime_ns,
+                  sorted(kwargs.items()),
+                  READER_VERSION,
+                  pd.__version__,
+                  pyarrow.__version__ if pyarrow is not None else None])
+
+    return hashlib.sha1(token.encode("utf-8")).hexdigest()[:16]
+
+
+def read_csv(fn: str, **kwargs) -> pd.DataFrame:
+    """ Reads a csv file into a Pandas DataFrame through the csv file
+    cache. Returns the cached Parquet file if it is current, otherwise the
+    csv file is parsed with pandas.read_csv and the result is written to
+    the cache. Cache files of the csv file older than the csv file are
+    removed. If the cache is switched off, the pyarrow package is not
+    available or the cache file cannot be written the csv file is parsed
+    without caching.
+
+    Args:
+        fn: String location of the csv file
+        **kwargs: Keyword arguments passed to pandas.read_csv, arguments
+            returning an iterator (chunksize, iterator) are not cached
+
+    Returns:
+        A Pandas DataFrame of the csv file """
+    if not enabled or pyarrow is None or kwargs.get("chunksize") is not None or kwargs.get("iterator"):
+        return pd.read_csv(fn, **kwargs)
+
+    folder = os.path.join(os.path.dirname(os.path.abspath(fn)), CACHE_FOLDER)
+    stem = os.path.splitext(os.path.basename(fn))[0]
+    cache_fn = os.path.join(folder, stem + "." + cache_key(fn, **kwargs) + ".parquet")
+
+    if os.path.exists(cache_fn):
+        return pd.read_parquet(cache_fn, engine="pyarrow")
+
+    df = pd.read_csv(fn, **kwargs)
+
+    # write to a temporary file so concurrent readers never see a partial
+    # cache file, the cache is skipped if the data-set cannot be written
+    tmp_fn = cache_fn + "." + str(os.getpid()) + "." + str(threading.get_ident()) + ".tmp"
+    try:
+        os.makedirs(folder, exist_ok=True)
+        df.to_parquet(tmp_fn, engine="pyarrow")
+        os.replace(tmp_fn, cache_fn)
+    except (OSError, ValueError, TypeError, pyarrow.ArrowException):
+        if os.path.exists(tmp_fn):
+            os.remove(tmp_fn)
+        return df
+
+    # remove cache files of previous versions of the csv file
+    mtime = os.path.getmtime(fn)
+    for old_fn in glob.glob(os.path.join(folder, glob.escape(stem) + ".*.parquet")):
+        if old_fn != cache_fn and os.path.getmtime(old_fn) < mtime:
+            os.remove(old_fn)
+
+    return df
+
+
+def _cache_files(scenario_path: str) -> list:
+    """ Returns the cache files of an ABM scenario folder.
+
+    Args:
+        scenario_path: String location of the ABM scenario folder
+
+    Returns:
+        List of string locations of the cache files """
+    files = []
+    for root, dirs, names in os.walk(scenario_path):
+        if os.path.basename(root) == CACHE_FOLDER:
+            files += [os.path.join(root, name) for name in names
+                      if name.endswith((".parquet", ".tmp"))]
+
+    return sorted(files)
+
+
+def report(scenario_path: str) -> pd.DataFrame:
+    """ Reports the cache files of an ABM scenario folder.
+
+    Args:
+        scenario_path: String location of the ABM scenario folder
+
+    Returns:
+        A Pandas DataFrame of the cache files with the cache folder
+        relative to the ABM scenario folder, the csv file name, the cache
+        file name and its size in bytes sorted largest first """
+    records = []
+    for fn in _cache_files(scenario_path):
+        name = os.path.basename(fn)
+        records.append({"folder": os.path.relpath(os.path.dirname(fn), scenario_path),
+                        "source": name.rsplit(".", 2)[0] + ".csv",
+                        "file": name,
+                        "bytes": os.path.getsize(fn)})
+
+    return pd.DataFrame(records, columns=["folder", "source", "file", "bytes"]) \
+        .sort_values(by="bytes", ascending=False) \
+        .reset_index(drop=True)
+
+
+def clear(scenario_path: str) -> int:
+    """ Removes the cache files of an ABM scenario folder.
+
+    Args:
+        scenario_path: String location of the ABM scenario folder
+
+    Returns:
+        Integer number of bytes of the removed cache files """
+    nbytes = 0
+    for fn in _cache_files(scenario_path):
+        nbytes += os.path.getsize(fn)
+        os.remove(fn)
+
+    return nbytes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("command", choices=["report", "clear"],
+                        help="report or clear the cache files")
+    parser.add_argument("scenario_path", help="ABM scenario folder")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        files = report(args.scenario_path)
+        if len(files) > 0:
+            print(files.to_string(index=False))
+        print("{:,} cache files, {:,.1f} MB".format(len(files), files["bytes"].sum() / 1e6))
+    else:
+        print("Removed {:,.1f} MB of cache files".format(clear(args.scenario_path) / 1e6))
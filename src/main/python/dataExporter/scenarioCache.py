@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+""" ABM Scenario Cache Module.
+
+This module contains the class and decorator used by the ABM Scenario Data
+Exporter Modules to hold the data-sets created from a completed SANDAG
+Activity-Based Model (ABM) scenario. A single cache is shared by every
+exporter class of a scenario folder so a data-set (e.g. the MGRA
+geography cross-reference) is created once however many classes use it.
+Data-sets are held until they are explicitly released, so large data-sets
+can be freed as soon as they are written out.
+
+Notes:
+    docstring style guide - http://google.github.io/styleguide/pyguide.html
+"""
+
+import functools
+import os
+import sys
+import pandas as pd
+
+
+class ScenarioCache(object):
+    """ This class holds the data-sets created from a completed ABM scenario
+    keyed by name along with their size in bytes. Data-sets are created on
+    first use by a loader function and held until released. Used as a
+    context manager the cache releases all data-sets on exit.
+
+    Args:
+        scenario_path: String location of the completed ABM scenario folder
+
+    Methods:
+        get: Returns a data-set, creating it with a loader function if it
+            is not held in the cache
+        memory_usage: Returns the size in bytes of each held data-set
+        release: Releases data-sets from the cache
+        shared: Returns the cache shared by all exporter classes of an ABM
+            scenario folder
+
+    Properties:
+        nbytes: Number of bytes of data-sets held in the cache """
+
+    # ABM scenario folder location -> shared ScenarioCache
+    _shared = {}
+
+    def __init__(self, scenario_path: str) -> None:
+        self.scenario_path = scenario_path
+        self._data = {}
+        self._nbytes = {}
+
+    def __enter__(self) -> "ScenarioCache":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    @classmethod
+    def shared(cls, scenario_path: str) -> "ScenarioCache":
+        """ Returns the cache shared by all exporter classes of an ABM
+        scenario folder, creating it on first use.
+
+        Args:
+            scenario_path: String location of the completed ABM scenario folder
+
+        Returns:
+            The shared ScenarioCache of the ABM scenario folder """
+        path = os.path.abspath(scenario_path)
+
+        if path not in cls._shared:
+            cls._shared[path] = cls(scenario_path)
+
+        return cls._shared[path]
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes of data-sets held in the cache. """
+        return sum(self._nbytes.values())
+
+    @staticmethod
+    def _sizeof(value) -> int:
+        """ Returns the size in bytes of a data-set. Pandas objects include
+        the memory used by their index and object values.
+
+        Args:
+            value: Data-set
+
+        Returns:
+            Integer size of the data-set in bytes """
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(index=True, deep=True).sum())
+        elif isinstance(value, pd.Series):
+            return int(value.memory_usage(index=True, deep=True))
+        elif hasattr(value, "nbytes"):
+            return int(value.nbytes)
+        else:
+            return sys.getsizeof(value)
+
+    def get(self, key: str, loader):
+        """ Returns a data-set, creating it with a loader function and
+        holding it in the cache if it is not already held.
+
+        Args:
+            key: String name of the data-set (e.g. TripLists.individual)
+            loader: Function taking no arguments that returns the data-set
+
+        Returns:
+            The data-set """
+        if key not in self._data:
+            value = loader()
+            self._data[key] = value
+            self._nbytes[key] = self._sizeof(value)
+
+        return self._data[key]
+
+    def memory_usage(self) -> pd.Series:
+        """ Returns the size in bytes of each data-set held in the cache.
+
+        Returns:
+            A Pandas Series of data-set sizes in bytes indexed by data-set
+            name sorted largest first """
+        return pd.Series(self._nbytes, dtype="int64").sort_values(ascending=False)
+
+    def release(self, *keys: str) -> int:
+        """ Releases data-sets from the cache. The data-sets are freed once
+        no other references to them remain and are created again if used.
+
+        Args:
+            *keys: String names of the data-sets to release, all data-sets
+                are released if no names are given
+
+        Returns:
+            Integer number of bytes of the released data-sets """
+        if not keys:
+            keys = list(self._data.keys())
+
+        nbytes = 0
+        for key in keys:
+            if key in self._data:
+                del self._data[key]
+                nbytes += self._nbytes.pop(key)
+
+        return nbytes
+
+
+def scenario_cache(func):
+    """ Decorator holding the return value of a method taking no arguments
+    in the ScenarioCache of the class instance (the cache attribute). The
+    value is keyed by the qualified name of the method (e.g.
+    TripLists.individual) so methods inherited from a parent class are
+    shared by all subclass instances of the same ABM scenario folder. Used
+    below the property decorator in place of functools.lru_cache.
+
+    Args:
+        func: Method taking no arguments
+
+    Returns:
+        The wrapped method """
+    key = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(self):
+        return self.cache.get(key, lambda: func(self))
+
+    wrapper.cache_key = key
+
+    return wrapper
@@ -1,3 +1,5 @@
+from chunkWriter import write_sorted_csv
+import csvCache
 from hwyShapeExport import export_highway_shape
 from skimAppender import SkimAppender
 from abmScenario import ScenarioData, LandUse, SyntheticPopulation, TourLists, TripLists
@@ -5,9 +7,23 @@ import os
 import sys
 
 
-def export_data(fp):
+def report_skim_lookups(skims):
+    # print and reset the omx skim lookup counts of the last trip list
+    counts = skims.reset_lookup_counts()
+    if counts["keys"] > 0:
+        print("Skim lookups: {:,} records, {:,} unique keys ({:.1f}x deduplication)".format(
+            counts["records"], counts["keys"], counts["records"] / counts["keys"]))
+
+
+def export_data(fp, chunk_size=None, csv_cache=None):
     # set file path to completed ABM run scenario folder
+    # if a chunk size is given the Individual and Joint trip lists are
+    # streamed in chunks of that many trip list file records
+    # if csv_cache is given switch the scenario csv file cache on or off
+    # otherwise the ABM_CSV_CACHE environment variable setting is kept
     # set report folder path
+    if csv_cache is not None:
+        csvCache.enabled = csv_cache
     scenarioPath = fp
     reportPath = os.path.join(scenarioPath, "report")
 
@@ -19,6 +35,7 @@ def export_data(fp):
     # write out transit TAP park and ride file
     print("Writing: Transit PNR Input File")
     scenario_data.pnr_taps.to_csv(os.path.join(reportPath, "transitPNR.csv"), index=False)
+    scenario_data.release("pnr_taps")
 
 
     # initialize land use class
@@ -27,6 +44,7 @@ def export_data(fp):
     land_use = LandUse(scenarioPath)
     print("Writing: MGRA-Based Input File")
     land_use.mgra_input.to_csv(os.path.join(reportPath, "mgraBasedInput.csv"), index=False)
+    land_use.release("mgra_input")
 
 
     # initialize synthetic population class
@@ -36,9 +54,11 @@ def export_data(fp):
 
     print("Writing: Households File")
     population.households.to_csv(os.path.join(reportPath, "households.csv"), index=False)
+    population.release("households")
 
     print("Writing: Persons File")
     population.persons.to_csv(os.path.join(reportPath, "persons.csv"), index=False)
+    population.release("persons")
 
 
     # initialize tour list class
@@ -48,21 +68,27 @@ def export_data(fp):
 
     print("Writing: Commercial Vehicle Tours")
     tours.cvm.to_csv(os.path.join(reportPath, "commercialVehicleTours.csv"), index=False)
+    tours.release("cvm")
 
     print("Writing: Cross Border Tours")
     tours.cross_border.to_csv(os.path.join(reportPath, "crossBorderTours.csv"), index=False)
+    tours.release("cross_border")
 
     print("Writing: Individual Tours")
     tours.individual.to_csv(os.path.join(reportPath, "individualTours.csv"), index=False)
+    tours.release("individual")
 
     print("Writing: Internal-External Tours")
     tours.ie.to_csv(os.path.join(reportPath, "internalExternalTours.csv"), index=False)
+    tours.release("ie")
 
     print("Writing: Joint Tours")
     tours.joint.to_csv(os.path.join(reportPath, "jointTours.csv"), index=False)
+    tours.release("joint")
 
     print("Writing: Visitor Tours")
     tours.visitor.to_csv(os.path.join(reportPath, "visitorTours.csv"), index=False)
+    tours.release("visitor")
 
 
     print("Initializing Trip List Output")
@@ -80,6 +106,8 @@ def export_data(fp):
                        terminal_skims=False).to_csv(
         os.path.join(reportPath, "airportSANTrips.csv"),
         index=False)
+    trips.release("airport_san")
+    report_skim_lookups(skims)
 
     print("Writing: Airport-CBX Trips")
     skims.append_skims(trips.airport_cbx,
@@ -87,13 +115,18 @@ def export_data(fp):
                        terminal_skims=False).to_csv(
         os.path.join(reportPath, "airportCBXTrips.csv"),
         index=False)
+    trips.release("airport_cbx")
+    report_skim_lookups(skims)
 
     print("Writing: Commercial Vehicle Trips")
-    skims.append_skims(trips.cvm,
-                       auto_only=True,
-                       terminal_skims=False).to_csv(
+    trips.expand_cvm(skims.append_skims(trips.cvm_base,
+                                        auto_only=True,
+                                        terminal_skims=False),
+                     skims).to_csv(
         os.path.join(reportPath, "commercialVehicleTrips.csv"),
         index=False)
+    trips.release("cvm_base", "cvm_trip_data")
+    report_skim_lookups(skims)
 
     print("Writing: Cross-Border Trips")
     skims.append_skims(trips.cross_border,
@@ -101,23 +134,37 @@ def export_data(fp):
                        terminal_skims=False).to_csv(
         os.path.join(reportPath, "crossBorderTrips.csv"),
         index=False)
+    trips.release("cross_border")
+    report_skim_lookups(skims)
 
     print("Writing: External-External Trips")
     trips.ee.to_csv(
         os.path.join(reportPath, "externalExternalTrips.csv"),
         index=False)
+    trips.release("ee")
 
     print("Writing: External-Internal Trips")
     trips.ei.to_csv(
         os.path.join(reportPath, "externalInternalTrips.csv"),
         index=False)
+    trips.release("ei")
 
     print("Writing: Individual Trips")
-    skims.append_skims(trips.individual,
-                       auto_only=False,
-                       terminal_skims=True).to_csv(
-        os.path.join(reportPath, "individualTrips.csv"),
-        index=False)
+    if chunk_size is None:
+        skims.append_skims(trips.individual,
+                           auto_only=False,
+                           terminal_skims=True).to_csv(
+            os.path.join(reportPath, "individualTrips.csv"),
+            index=False)
+        trips.release("individual")
+    else:
+        write_sorted_csv(
+            (skims.append_skims(chunk, auto_only=False, terminal_skims=True)
+             for chunk in trips.individual_chunks(chunk_size)),
+            os.path.join(reportPath, "individualTrips.csv"),
+            key="tripID",
+            bucket_size=chunk_size)
+    report_skim_lookups(skims)
 
     print("Writing: Internal-External Trips")
     skims.append_skims(trips.ie,
@@ -125,18 +172,31 @@ def export_data(fp):
                        terminal_skims=False).to_csv(
         os.path.join(reportPath, "internalExternalTrips.csv"),
         index=False)
+    trips.release("ie")
+    report_skim_lookups(skims)
 
     print("Writing: Joint Trips")
-    skims.append_skims(trips.joint,
-                       auto_only=False,
-                       terminal_skims=True).to_csv(
-        os.path.join(reportPath, "jointTrips.csv"),
-        index=False)
+    if chunk_size is None:
+        skims.append_skims(trips.joint,
+                           auto_only=False,
+                           terminal_skims=True).to_csv(
+            os.path.join(reportPath, "jointTrips.csv"),
+            index=False)
+        trips.release("joint")
+    else:
+        write_sorted_csv(
+            (skims.append_skims(chunk, auto_only=False, terminal_skims=True)
+             for chunk in trips.joint_chunks(chunk_size)),
+            os.path.join(reportPath, "jointTrips.csv"),
+            key="tripID",
+            bucket_size=chunk_size)
+    report_skim_lookups(skims)
 
     print("Writing: Truck Trips")
     trips.truck.to_csv(
         os.path.join(reportPath, "truckTrips.csv"),
         index=False)
+    trips.release("truck")
 
     print("Writing: Visitor Trips")
     skims.append_skims(trips.visitor,
@@ -144,6 +204,8 @@ def export_data(fp):
                        terminal_skims=False).to_csv(
         os.path.join(reportPath, "visitorTrips.csv"),
         index=False)
+    trips.release("visitor")
+    report_skim_lookups(skims)
 
     print("Writing: Zombie AV Trips")
     skims.append_skims(trips.zombie_av,
@@ -151,6 +213,8 @@ def export_data(fp):
                        terminal_skims=False).to_csv(
         os.path.join(reportPath, "zombieAVTrips.csv"),
         index=False)
+    trips.release("zombie_av")
+    report_skim_lookups(skims)
 
     print("Writing: Zombie TNC Trips")
     skims.append_skims(trips.zombie_tnc,
@@ -158,11 +222,19 @@ def export_data(fp):
                        terminal_skims=False).to_csv(
         os.path.join(reportPath, "zombieTNCTrips.csv"),
         index=False)
+    trips.release("zombie_tnc")
+    report_skim_lookups(skims)
+
+    # release remaining data-sets of the scenario
+    scenario_data.release()
 
     print("Writing: Highway Load Shape File")
     export_highway_shape(scenarioPath).to_file(
         os.path.join(reportPath, "hwyLoad.shp"))
         
 if __name__ == '__main__':
-    targets = sys.argv[1:]
-    export_data(targets[0])
+    # optional --no-csv-cache flag switches off the scenario csv file cache
+    targets = [arg for arg in sys.argv[1:] if arg != "--no-csv-cache"]
+    export_data(targets[0],
+                int(targets[1]) if len(targets) > 1 else None,
+                False if "--no-csv-cache" in sys.argv[1:] else None)
@@ -12,11 +12,14 @@ Notes:
 
 import itertools
 import os
-import re
-from functools import lru_cache  # caching decorator for modules
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import openmatrix as omx  # https://github.com/osPlanning/omx-python
 import pandas as pd
+from abmProperties import PropertiesFile
+from csvCache import read_csv
+from scenarioCache import ScenarioCache, scenario_cache
+from skimCache import SkimCache, SparseSkim
 
 
 class SkimAppender(object):
@@ -25,11 +28,27 @@ class SkimAppender(object):
 
     Args:
         scenario_path: String location of the completed ABM scenario folder
+        skim_memory_budget: Integer maximum number of bytes of OMX skim
+            matrices held in memory by the skim cache (default 4GB)
+        skim_mmap_path: Optional string location of a folder used by the
+            skim cache to hold extracted memory-mapped OMX skim matrices
+        skim_workers: Integer number of threads used to gather OMX skims
+            for separate OMX files and skim matrices (default 1, serial)
+        cache: Optional ScenarioCache holding the scenario data-sets,
+            defaults to the cache shared by all exporter classes of the ABM
+            scenario folder
 
     Methods:
+        _assign_skims: Assigns skim fields to trip list records by row
+            position
+        _gather_skims: Gathers OMX skim values once per distinct
+            origin-destination pair and broadcasts them back to records
+        _map_skim_tasks: Runs independent skim gathering tasks on the skim
+            thread pool returning results in task order
         _get_omx_auto_skim_dataset: Maps ABM trip list records to OMX files
             and OMX skim matrices
         append_skims: Master method to append all skims to ABM trip lists
+        reset_lookup_counts: Resets the OMX skim lookup counts
         auto_fare_cost: Appends auto fare cost to ABM trip list records
         auto_operating_cost: Appends auto operating cost to ABM trip list records
         auto_terminal_skims: Appends auto-mode terminal walk time and distance
@@ -62,16 +81,119 @@ class SkimAppender(object):
             records
 
     Properties:
+        bike_mgra_skims: SparseSkim of MGRA-MGRA bicycle skims
+        bike_taz_skims: SparseSkim of TAZ-TAZ bicycle skims
+        drive_access_skims: SparseSkim of TAZ-TAP drive to transit access
+            skims
+        lookup_counts: Dictionary of the number of OMX skim lookups
+            requested (records) and gathered (keys) since the last reset
         mgra_xref: Pandas DataFrame geography cross-reference of MGRAs to
             TAZs and LUZs
+        micro_mgra_skims: SparseSkim of MGRA-MGRA walk, micro-mobility, and
+            micro-transit skims
+        micro_mgra_tap_skims: SparseSkim of MGRA-TAP walk, micro-mobility,
+            and micro-transit transit access/egress skims
         properties: Dictionary of ABM properties file token values
-            (conf/sandag_abm.properties) """
-
-    def __init__(self, scenario_path: str) -> None:
+            (conf/sandag_abm.properties)
+        skim_cache: SkimCache of OMX skim matrices shared by all trip lists """
+
+    def __init__(self, scenario_path: str,
+                 skim_memory_budget: int = 4 * 1024 ** 3,
+                 skim_mmap_path: str = None,
+                 skim_workers: int = 1,
+                 cache: ScenarioCache = None) -> None:
         self.scenario_path = scenario_path
+        self.cache = cache if cache is not None else ScenarioCache.shared(scenario_path)
+        self.skim_cache = SkimCache(memory_budget=skim_memory_budget,
+                                    mmap_path=skim_mmap_path)
+        self.skim_workers = skim_workers
+        self._lookup_counts = {"records": 0, "keys": 0}
+        self._lookup_lock = threading.Lock()
+
+    @property
+    def lookup_counts(self) -> dict:
+        """ Number of OMX skim lookups requested (records) and gathered
+        (keys) once per distinct origin-destination pair since the counts
+        were last reset, summed over all OMX skim matrices. """
+        with self._lookup_lock:
+            return dict(self._lookup_counts)
+
+    def reset_lookup_counts(self) -> dict:
+        """ Resets the OMX skim lookup counts.
+
+        Returns:
+            A dictionary of the OMX skim lookup counts before the reset """
+        with self._lookup_lock:
+            counts = self._lookup_counts
+            self._lookup_counts = {"records": 0, "keys": 0}
+
+        return counts
+
+    @property
+    @scenario_cache
+    def bike_mgra_skims(self) -> SparseSkim:
+        """ MGRA-MGRA bicycle skims from the ABM scenario output
+        (output/bikeMgraLogsum.csv) held in a SparseSkim keyed by origin MGRA
+        with skim field:
+            time - bicycle time in minutes """
+        return SparseSkim.from_csv(
+            os.path.join(self.scenario_path, "output", "bikeMgraLogsum.csv"),
+            origin="i",
+            destination="j",
+            usecols=["i",  # origin MGRA geography
+                     "j",  # destination MGRA geography
+                     "time"],  # time in minutes
+            dtype={"i": "int16",
+                   "j": "int16",
+                   "time": "float32"})
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
+    def bike_taz_skims(self) -> SparseSkim:
+        """ TAZ-TAZ bicycle skims from the ABM scenario output
+        (output/bikeTazLogsum.csv) held in a SparseSkim keyed by origin TAZ
+        with skim field:
+            time - bicycle time in minutes """
+        return SparseSkim.from_csv(
+            os.path.join(self.scenario_path, "output", "bikeTazLogsum.csv"),
+            origin="i",
+            destination="j",
+            usecols=["i",  # origin TAZ geography
+                     "j",  # destination TAZ geography
+                     "time"],  # time in minutes
+            dtype={"i": "int16",
+                   "j": "int16",
+                   "time": "float32"})
+
+    @property
+    @scenario_cache
+    def drive_access_skims(self) -> SparseSkim:
+        """ TAZ-TAP drive to transit access skims from the ABM scenario input
+        file (input/accessam.csv) held in a SparseSkim keyed by TAZ. This
+        file is used in place of auto skim matrices for drive to transit and
+        is loaded once for the life of the class instance. Skim fields:
+            timeDriveTransit - time in minutes
+            distanceDriveTransit - distance in miles """
+        return SparseSkim.from_csv(
+            os.path.join(self.scenario_path, "input", "accessam.csv"),
+            origin="TAZ",
+            destination="TAP",
+            names=["TAZ",  # TAZ geography
+                   "TAP",  # transit access point (TAP)
+                   "timeDriveTransit",  # time in minutes
+                   "distanceDriveTransit",  # distance in miles
+                   "mode"],
+            usecols=["TAZ",
+                     "TAP",
+                     "timeDriveTransit",
+                     "distanceDriveTransit"],
+            dtype={"TAZ": "int16",
+                   "TAP": "int16",
+                   "timeDriveTransit": "float32",
+                   "distanceDriveTransit": "float32"})
+
+    @property
+    @scenario_cache
     def mgra_xref(self) -> pd.DataFrame:
         """ Cross reference of Master Geographic Reference Area (MGRA) model
         geography to Transportation Analysis Zone (TAZ) and Land Use Zone
@@ -82,14 +204,14 @@ class SkimAppender(object):
         # load the mgra based input file
         fn = "mgra13_based_input" + str(self.properties["year"]) + ".csv"
 
-        mgra = pd.read_csv(os.path.join(self.scenario_path, "input", fn),
-                           usecols=["mgra",  # MGRA geography
-                                    "taz",  # TAZ geography
-                                    "luz_id",  # LUZ geography
-                                    "MicroAccessTime"],  # Micro-Mobility AccessTime
-                           dtype={"mgra": "int16",
-                                  "taz": "int16",
-                                  "luz_id": "int16"})
+        mgra = read_csv(os.path.join(self.scenario_path, "input", fn),
+                        usecols=["mgra",  # MGRA geography
+                                 "taz",  # TAZ geography
+                                 "luz_id",  # LUZ geography
+                                 "MicroAccessTime"],  # Micro-Mobility AccessTime
+                        dtype={"mgra": "int16",
+                               "taz": "int16",
+                               "luz_id": "int16"})
 
         # genericize column names
         mgra.rename(columns={"mgra": "MGRA",
@@ -100,7 +222,68 @@ class SkimAppender(object):
         return mgra
 
     @property
-    @lru_cache(maxsize=1)
+    @scenario_cache
+    def micro_mgra_skims(self) -> SparseSkim:
+        """ MGRA-MGRA walk, micro-mobility, and micro-transit skims from the
+        ABM scenario output (output/microMgraEquivMinutes.csv) held in a
+        SparseSkim keyed by origin MGRA with skim fields:
+            walkTime - walk time in minutes
+            dist - distance in miles
+            mmTime - micro-mobility time in minutes
+            mmCost - micro-mobility cost in dollars
+            mtTime - micro-transit time in minutes
+            mtCost - micro-transit cost in dollars """
+        return SparseSkim.from_csv(
+            os.path.join(self.scenario_path, "output", "microMgraEquivMinutes.csv"),
+            origin="i",
+            destination="j",
+            usecols=["i",  # origin MGRA geography
+                     "j",  # destination MGRA geography
+                     "walkTime",  # walk time in minutes
+                     "dist",  # distance in miles
+                     "mmTime",  # micro-mobility time in minutes
+                     "mmCost",  # micro-mobility cost in dollars
+                     "mtTime",  # micro-transit time in minutes
+                     "mtCost"],  # micro-transit cost in dollars
+            dtype={"i": "int16",
+                   "j": "int16",
+                   "walkTime": "float32",
+                   "dist": "float32",
+                   "mmTime": "float32",
+                   "mmCost": "float32",
+                   "mtTime": "float32",
+                   "mtCost": "float32"})
+
+    @property
+    @scenario_cache
+    def micro_mgra_tap_skims(self) -> SparseSkim:
+        """ MGRA-TAP walk, micro-mobility, and micro-transit transit
+        access/egress skims from the ABM scenario output
+        (output/microMgraTapEquivMinutes.csv) held in a SparseSkim keyed by
+        MGRA with the same skim fields as the micro_mgra_skims property. """
+        return SparseSkim.from_csv(
+            os.path.join(self.scenario_path, "output", "microMgraTapEquivMinutes.csv"),
+            origin="mgra",
+            destination="tap",
+            usecols=["mgra",  # origin MGRA geography
+                     "tap",  # destination TAP
+                     "walkTime",  # walk time in minutes
+                     "dist",  # distance in miles
+                     "mmTime",  # micro-mobility time in minutes
+                     "mmCost",  # micro-mobility cost in dollars
+                     "mtTime",  # micro-transit time in minutes
+                     "mtCost"],  # micro-transit cost in dollars
+            dtype={"mgra": "int16",
+                   "tap": "int16",
+                   "walkTime": "float32",
+                   "dist": "float32",
+                   "mmTime": "float32",
+                   "mmCost": "float32",
+                   "mtTime": "float32",
+                   "mtCost": "float32"})
+
+    @property
+    @scenario_cache
     def properties(self) -> dict:
         """ Get the ABM scenario properties from the ABM scenario
         properties file (conf/sandag_abm.properties).
@@ -147,201 +330,44 @@ class SkimAppender(object):
         Returns:
             A dictionary defining the ABM scenario properties. """
 
-        # create dictionary holding ABM properties file information
-        # each property contains a dictionary {line, value} where the line
-        # is the string to match in the properties file to
-        # return the value of the property
-        lookup = {
-            "accessTimeMicroTransit": {
-                "line": "active.microtransit.accessTime=",
-                "type": "float",
-                "value": None
-            },
-            "aocFuel": {
-                "line": "aoc.fuel=",
-                "type": "float",
-                "value": None
-            },
-            "aocMaintenance": {
-                "line": "aoc.maintenance=",
-                "type": "float",
-                "value": None
-            },
-            "baseFareMicroMobility": {
-                "line": "active.micromobility.fixedCost=",
-                "type": "float",
-                "value": None
-            },
-            "baseFareMicroTransit": {
-                "line": "active.microtransit.fixedCost=",
-                "type": "float",
-                "value": None
-            },
-            "baseFareNonPooledTNC": {
-                "line": "TNC.single.baseFare=",
-                "type": "float",
-                "value": None
-            },
-            "baseFarePooledTNC": {
-                "line": "TNC.shared.baseFare=",
-                "type": "float",
-                "value": None
-            },
-            "baseFareTaxi": {
-                "line": "taxi.baseFare=",
-                "type": "float",
-                "value": None
-            },
-            "bicycleSpeed": {
-                "line": "active.bike.minutes.per.mile=",
-                "type": "float",
-                "value": None},
-            "costMinimumNonPooledTNC": {
-                "line": "TNC.single.costMinimum=",
-                "type": "float",
-                "value": None
-            },
-            "costMinimumPooledTNC": {
-                "line": "TNC.shared.costMinimum=",
-                "type": "float",
-                "value": None
-            },
-            "costPerMileFactorAV": {
-                "line": "Mobility.AV.CostPerMileFactor=",
-                "type": "float",
-                "value": None
-            },
-            "costPerMileNonPooledTNC": {
-                "line": "TNC.single.costPerMile=",
-                "type": "float",
-                "value": None
-            },
-            "costPerMilePooledTNC": {
-                "line": "TNC.shared.costPerMile=",
-                "type": "float",
-                "value": None
-            },
-            "costPerMileTaxi": {
-                "line": "taxi.costPerMile=",
-                "type": "float",
-                "value": None
-            },
-            "costPerMinuteMicroMobility": {
-                "line": "active.micromobility.variableCost=",
-                "type": "float",
-                "value": None
-            },
-            "costPerMinuteMicroTransit": {
-                "line": "active.microtransit.variableCost=",
-                "type": "float",
-                "value": None
-            },
-            "costPerMinuteNonPooledTNC": {
-                "line": "TNC.single.costPerMinute=",
-                "type": "float",
-                "value": None
-            },
-            "costPerMinutePooledTNC": {
-                "line": "TNC.shared.costPerMinute=",
-                "type": "float",
-                "value": None
-            },
-            "costPerMinuteTaxi": {
-                "line": "taxi.costPerMinute=",
-                "type": "float",
-                "value": None
-            },
-            "microMobilitySpeed": {
-                "line": "active.micromobility.speed=",
-                "type": "float",
-                "value": None},
-            "microTransitSpeed": {
-                "line": "active.microtransit.speed=",
-                "type": "float",
-                "value": None},
-            "terminalTimeFactorAV": {
-                "line": "Mobility.AV.TerminalTimeFactor=",
-                "type": "float",
-                "value": None
-            },
-            "waitTimeMicroTransit": {
-                "line": "active.microtransit.waitTime=",
-                "type": "float",
-                "value": None
-            },
-            "waitTimeNonPooledTNC": {
-                "line": "TNC.single.waitTime.mean=",
-                "type": "list",
-                "value": None
-            },
-            "waitTimePooledTNC": {
-                "line": "TNC.shared.waitTime.mean=",
-                "type": "list",
-                "value": None
-            },
-            "waitTimePopEmpDenPerMi": {
-                "line": "WaitTimeDistribution.EndPopEmpPerSqMi=",
-                "type": "list",
-                "value": None
-            },
-            "waitTimeTaxi": {
-                "line": "Taxi.waitTime.mean=",
-                "type": "list",
-                "value": None
-            },
-            "walkSpeed": {
-                "line": "active.walk.minutes.per.mile=",
-                "type": "float",
-                "value": None},
-            "year": {
-                "line": "scenarioYear=",
-                "type": "int",
-                "value": None}
+        # get the ABM properties file tokens, the file is tokenized once
+        # and shared by all classes reading it
+        properties = PropertiesFile(
+            os.path.join(self.scenario_path, "conf", "sandag_abm.properties"))
+
+        results = {
+            "accessTimeMicroTransit": properties.get_float("active.microtransit.accessTime"),
+            "aocFuel": properties.get_float("aoc.fuel"),
+            "aocMaintenance": properties.get_float("aoc.maintenance"),
+            "baseFareMicroMobility": properties.get_float("active.micromobility.fixedCost"),
+            "baseFareMicroTransit": properties.get_float("active.microtransit.fixedCost"),
+            "baseFareNonPooledTNC": properties.get_float("TNC.single.baseFare"),
+            "baseFarePooledTNC": properties.get_float("TNC.shared.baseFare"),
+            "baseFareTaxi": properties.get_float("taxi.baseFare"),
+            "bicycleSpeed": properties.get_float("active.bike.minutes.per.mile"),
+            "costMinimumNonPooledTNC": properties.get_float("TNC.single.costMinimum"),
+            "costMinimumPooledTNC": properties.get_float("TNC.shared.costMinimum"),
+            "costPerMileFactorAV": properties.get_float("Mobility.AV.CostPerMileFactor"),
+            "costPerMileNonPooledTNC": properties.get_float("TNC.single.costPerMile"),
+            "costPerMilePooledTNC": properties.get_float("TNC.shared.costPerMile"),
+            "costPerMileTaxi": properties.get_float("taxi.costPerMile"),
+            "costPerMinuteMicroMobility": properties.get_float("active.micromobility.variableCost"),
+            "costPerMinuteMicroTransit": properties.get_float("active.microtransit.variableCost"),
+            "costPerMinuteNonPooledTNC": properties.get_float("TNC.single.costPerMinute"),
+            "costPerMinutePooledTNC": properties.get_float("TNC.shared.costPerMinute"),
+            "costPerMinuteTaxi": properties.get_float("taxi.costPerMinute"),
+            "microMobilitySpeed": properties.get_float("active.micromobility.speed"),
+            "microTransitSpeed": properties.get_float("active.microtransit.speed"),
+            "terminalTimeFactorAV": properties.get_float("Mobility.AV.TerminalTimeFactor"),
+            "waitTimeMicroTransit": properties.get_float("active.microtransit.waitTime"),
+            "waitTimeNonPooledTNC": properties.get_list("TNC.single.waitTime.mean"),
+            "waitTimePooledTNC": properties.get_list("TNC.shared.waitTime.mean"),
+            "waitTimePopEmpDenPerMi": properties.get_list("WaitTimeDistribution.EndPopEmpPerSqMi"),
+            "waitTimeTaxi": properties.get_list("Taxi.waitTime.mean"),
+            "walkSpeed": properties.get_float("active.walk.minutes.per.mile"),
+            "year": properties.get_int("scenarioYear")
         }
 
-        # open the ABM scenario properties file
-        file = open(os.path.join(self.scenario_path, "conf", "sandag_abm.properties"), "r")
-
-        # loop through each line of the properties file
-        for line in file:
-            # strip all white space from the line
-            line = line.replace(" ", "")
-
-            # for each element of the properties dictionary
-            for name in lookup:
-                item = lookup[name]
-
-                if item["line"] is not None:
-                    match = re.compile(item["line"]).match(line)
-                    # if the properties file contains the matching line
-                    if match:
-                        # for waitTime properties create list from matching line
-                        #
-                        if "waitTime" in name and item["type"] == "list":
-                            value = line[match.end():].split(",")
-                            value = list(map(float, value))
-                        # otherwise take the final element of the line
-                        else:
-                            value = line[match.end():]
-
-                        # update the dictionary value using the appropriate data type
-                        if item["type"] == "float":
-                            value = float(value)
-                        elif item["type"] == "int":
-                            value = int(value)
-                        else:
-                            pass
-
-                        item["value"] = value
-                        break
-
-        file.close()
-
-        # convert the property name and value to a non-nested dictionary
-        results = {}
-        for name in lookup:
-            results[name] = lookup[name]["value"]
-
         # convert auto operating costs from cents per mile to dollars per mile
         results["aocFuel"] = results["aocFuel"] / 100
         results["aocMaintenance"] = results["aocMaintenance"] / 100
@@ -363,7 +389,8 @@ class SkimAppender(object):
         If trips in the input DataFrame are not mapped to omx files
         and matrices (non-auto mode trips) they are not present in the return
         DataFrame. The return DataFrame is an interim DataFrame ready for
-        input to the omx_auto_skim_appender
+        input to the omx_auto_skim_appender and carries the row position of
+        each record in the input DataFrame
 
         The process uses the trip departure ABM 5 TOD period, trip mode,
         transponder availability, and the trip value of time (vot) category
@@ -387,6 +414,7 @@ class SkimAppender(object):
             A Pandas DataFrame containing mapping of auto-mode trips to omx
             files and matrices containing auto-mode skims:
                 [tripID] - unique identifier of a trip
+                [row] - row position of the trip in the input DataFrame
                 [omxFileName] - omx skim file name (e.g. traffic_skims_EA)
                 [matrixName] - omx skim matrix name (e.g. EA_HOV2_M)
                 [originTAZ] - trip origin TAZ (1-4996)
@@ -441,6 +469,16 @@ class SkimAppender(object):
         # initialize empty auto trips DataFrame
         trips = pd.DataFrame()
 
+        # select the fields used in the mapping and the row position
+        # of each record in the input DataFrame
+        records = df[["tripID",
+                      "departTimeFiveTod",
+                      "tripMode",
+                      "transponderAvailable",
+                      "valueOfTimeCategory",
+                      "originTAZ",
+                      "destinationTAZ"]].assign(row=np.arange(len(df)))
+
         # map possible values of trip list columns to skim matrix names
         # filter input DataFrame to auto trips mapped to skim matrices
         for key in skim_map:
@@ -466,13 +504,10 @@ class SkimAppender(object):
                 "matrixName": "category"})
 
             # merge lookup table to trip list and append to auto trips DataFrame
-            trips = trips.append(df.merge(lookup, how="inner"), ignore_index=True)
-
-        # ABM Joint sub-model has multiple records per tripID
-        # per person on trip records are identical otherwise
-        trips.drop_duplicates(subset="tripID", inplace=True, ignore_index=True)
+            trips = trips.append(records.merge(lookup, how="inner"), ignore_index=True)
 
         return trips[["tripID",
+                      "row",
                       "omxFileName",
                       "matrixName",
                       "originTAZ",
@@ -502,6 +537,10 @@ class SkimAppender(object):
             of the input DataFrame along with fields appended by the
             aforementioned class methods. """
 
+        # copy the input DataFrame once to a DataFrame indexed by row position
+        # the included class methods assign skim fields to it in place
+        df = df.reset_index(drop=True)
+
         # append omx auto skims
         df = self.omx_auto_skim_appender(df)
 
@@ -550,7 +589,9 @@ class SkimAppender(object):
                                   "timeCommuterRailTransitInVehicle",
                                   "timeTransitInitialWait"]
 
-        df["timeTotal"] = df[df.columns.difference(transit_line_haul_cols)].filter(regex="^time").sum(axis=1)
+        time_cols = [col for col in df.columns.difference(transit_line_haul_cols)
+                     if col.startswith("time")]
+        df["timeTotal"] = df[time_cols].sum(axis=1)
 
         df["distanceTotal"] = df.filter(regex="^distance").sum(axis=1)
 
@@ -558,7 +599,8 @@ class SkimAppender(object):
 
         # sort return DataFrame by tripID for user-experience
         # and faster database loading via ORDER hints
-        df.sort_values(by="tripID", inplace=True)
+        # use a stable sort to keep the input order of records within a tripID
+        df.sort_values(by="tripID", inplace=True, kind="mergesort")
 
         return df
 
@@ -645,10 +687,10 @@ class SkimAppender(object):
                    "timeAutoTerminalWalk": "float32"}
         )
 
-        # merge auto terminal times into input DataFrame
+        # map auto terminal times to the input DataFrame destination TAZs
         # add 0s for TAZs with no terminal times
-        df = df.merge(skims, on="destinationTAZ", how="left")
-        df["timeAutoTerminalWalk"] = df["timeAutoTerminalWalk"].fillna(0)
+        df["timeAutoTerminalWalk"] = df["destinationTAZ"].map(
+            skims.set_index("destinationTAZ")["timeAutoTerminalWalk"]).fillna(0)
 
         # set auto terminal times to 0 for non-auto modes
         # reduce auto terminal time if AV is used
@@ -706,66 +748,37 @@ class SkimAppender(object):
                 [timeBike] - time in minutes for bicycle mode
                 [distanceBike] - distance in miles for bicycle mode """
 
-        # load the MGRA-MGRA bicycle skims
-        mgra_skims = pd.read_csv(
-            os.path.join(self.scenario_path, "output", "bikeMgraLogsum.csv"),
-            usecols=["i",  # origin MGRA geography
-                     "j",  # destination MGRA geography
-                     "time"],  # time in minutes
-            dtype={"i": "int16",
-                   "j": "int16",
-                   "time": "float32"}
-        )
+        # select bicycle mode records
+        records = df.loc[(df["tripMode"] == "Bike"),
+                         ["originMGRA", "destinationMGRA",
+                          "originTAZ", "destinationTAZ"]]
 
-        # load the TAZ-TAZ bicycle skims
-        taz_skims = pd.read_csv(
-            os.path.join(self.scenario_path, "output", "bikeTazLogsum.csv"),
-            usecols=["i",  # origin TAZ geography
-                     "j",  # destination TAZ geography
-                     "time"],  # time in minutes
-            dtype={"i": "int16",
-                   "j": "int16",
-                   "time": "float32"}
-        )
+        # locate the MGRA-MGRA and TAZ-TAZ bicycle skims of the records
+        # missing skims are returned as NaN
+        mgra_time = self.bike_mgra_skims.gather(
+            "time",
+            self.bike_mgra_skims.locate(records["originMGRA"],
+                                        records["destinationMGRA"]))
 
-        # merge the skims with the input DataFrame bicycle mode records
-        # use left outer joins to keep all bicycle mode records
-        # if MGRA-MGRA skims do not exist
-        # ABM Joint sub-model has multiple records per tripID
-        # per person on trip records are identical otherwise
-        records = df.loc[(df["tripMode"] == "Bike")].copy()
-        records.drop_duplicates(subset="tripID", inplace=True, ignore_index=True)
-
-        records = records.merge(
-            right=mgra_skims,
-            how="left",
-            left_on=["originMGRA", "destinationMGRA"],
-            right_on=["i", "j"]
-        )
-        records = records.merge(
-            right=taz_skims,
-            how="left",
-            left_on=["originTAZ", "destinationTAZ"],
-            right_on=["i", "j"],
-            suffixes=["MGRA", "TAZ"]
-        )
+        taz_time = self.bike_taz_skims.gather(
+            "time",
+            self.bike_taz_skims.locate(records["originTAZ"],
+                                       records["destinationTAZ"]))
 
         # if MGRA-MGRA skims do not exist use TAZ-TAZ skims
-        records["timeBike"] = pd.Series(
-            np.where(records["timeMGRA"].isna(),
-                     records["timeTAZ"],
-                     records["timeMGRA"]),
-            dtype="float32")
+        records = pd.DataFrame(index=records.index)
+        records["timeBike"] = np.where(np.isnan(mgra_time),
+                                       taz_time,
+                                       mgra_time).astype("float32")
 
         # calculate distance using bicycle speed
         records["distanceBike"] = pd.Series(
             records["timeBike"] * self.properties["bicycleSpeed"] / 60,
             dtype="float32")
 
-        # merge result set DataFrame back into initial trip list
+        # assign result set to the initial trip list by row position
         # keep missing skim records as missing skim means no bike trip
-        records = records[["tripID", "timeBike", "distanceBike"]]
-        df = df.merge(records, on="tripID", how="left")
+        df = self._assign_skims(df, records, ["timeBike", "distanceBike"])
 
         # return input DataFrame with appended skim columns
         return df
@@ -798,26 +811,7 @@ class SkimAppender(object):
                 [timeDriveTransit] - time in minutes for auto mode
                 [distanceDriveTransit] - distance in miles for auto mode """
 
-        # read in the input accessam csv file
-        # this file is used in place of auto skim matrices for drive to transit
-        skims = pd.read_csv(self.scenario_path + "/input/accessam.csv",
-                            names=["TAZ",  # TAZ geography
-                                   "TAP",  # transit access point (TAP)
-                                   "timeDriveTransit",  # time in minutes
-                                   "distanceDriveTransit",  # distance in miles
-                                   "mode"],
-                            usecols=["TAZ",
-                                     "TAP",
-                                     "timeDriveTransit",
-                                     "distanceDriveTransit"],
-                            dtype={"TAZ": "int16",
-                                   "TAP": "int16",
-                                   "timeDriveTransit": "float32",
-                                   "distanceDriveTransit": "float32"})
-
         # select drive to transit records
-        # ABM Joint sub-model has multiple records per tripID
-        # per person on trip records are identical otherwise
         modes = ["Park and Ride to Transit - Local Bus",
                  "Park and Ride to Transit - Premium Transit",
                  "Park and Ride to Transit - Local Bus and Premium Transit",
@@ -827,36 +821,138 @@ class SkimAppender(object):
                  "TNC to Transit - Local Bus",
                  "TNC to Transit - Premium Transit",
                  "TNC to Transit - Local Bus and Premium Transit"]
-        records = df.loc[(df["tripMode"].isin(modes))].copy()
-        records.drop_duplicates(subset="tripID", inplace=True, ignore_index=True)
+        records = df.loc[(df["tripMode"].isin(modes)),
+                         ["inbound",
+                          "originMGRA",
+                          "destinationMGRA",
+                          "boardingTAP",
+                          "alightingTAP"]]
 
         # create MGRA-TAP origin-destinations based on inbound direction
-        records["MGRA"] = np.where(records["inbound"],
-                                   records["destinationMGRA"],
-                                   records["originMGRA"])
+        mgra = np.where(records["inbound"],
+                        records["destinationMGRA"],
+                        records["originMGRA"])
 
-        records["TAP"] = np.where(records["inbound"],
-                                  records["alightingTAP"],
-                                  records["boardingTAP"])
+        tap = np.where(records["inbound"],
+                       records["alightingTAP"],
+                       records["boardingTAP"])
 
         # use the origin/destination MGRA to derive the origin/destination
         # TAZ, this accounts for issues where external TAZs (1-12) do not have
         # TAP-based skims, the skims are derived from the internal TAZ of the
         # internal MGRA of the trip origin/destination
-        records = records.merge(self.mgra_xref, on="MGRA")
+        taz = pd.Series(mgra).map(self.mgra_xref.set_index("MGRA")["TAZ"])
 
-        # merge with the drive to transit access skims
-        records = records[["tripID", "TAZ", "TAP"]]
-        records = records.merge(skims, how="inner", on=["TAZ", "TAP"])
-        records = records[["tripID", "timeDriveTransit", "distanceDriveTransit"]]
+        # gather the drive to transit access skims, missing skims are NaN
+        skims = self.drive_access_skims
+        pos = skims.locate(taz, tap)
 
-        # merge result set DataFrame back into initial trip list
+        result = pd.DataFrame(index=records.index)
+        result["timeDriveTransit"] = skims.gather("timeDriveTransit", pos)
+        result["distanceDriveTransit"] = skims.gather("distanceDriveTransit", pos)
+
+        # assign result set to the initial trip list by row position
         # keep missing skim records as missing skim means no transit trip
-        df = df.merge(records, on="tripID", how="left")
+        df = self._assign_skims(df, result, ["timeDriveTransit", "distanceDriveTransit"])
 
         # return input DataFrame with appended skim columns
         return df
 
+    @staticmethod
+    def _assign_skims(df: pd.DataFrame, records: pd.DataFrame, cols: list) -> pd.DataFrame:
+        """ Takes an input Pandas DataFrame and a DataFrame of skim fields for
+        a subset of its records and assigns the skim fields to the input
+        DataFrame by row position. Records not in the subset have all skims
+        set to NaN as a missing skim means no trip of the skimmed mode.
+
+        Args:
+            df: Input Pandas DataFrame indexed by row position (RangeIndex)
+            records: Pandas DataFrame of skim fields indexed by the row
+                positions of the records in the input DataFrame
+            cols: List of skim fields to assign
+
+        Returns:
+            The input Pandas DataFrame with the skim fields assigned """
+
+        rows = records.index.to_numpy()
+
+        for col in cols:
+            values = records[col].to_numpy()
+
+            # float skims keep their data type, others are upcast to float
+            # to hold the missing values of records not in the subset
+            if values.dtype.kind == "f":
+                output = np.full(len(df), np.nan, dtype=values.dtype)
+            else:
+                output = np.full(len(df), np.nan, dtype="float64")
+
+            output[rows] = values
+            df[col] = output
+
+        return df
+
+    def _gather_skims(self, fn: str, matrices: list, o: np.ndarray, d: np.ndarray) -> list:
+        """ Takes vectors of origin and destination zone numbers and returns
+        the associated skim values from a list of matrices of an OMX file.
+
+        Trip lists repeat the same origin-destination pairs heavily so the
+        pairs are factorized to their distinct values, skims are gathered
+        once per distinct pair from the skim cache, and results are
+        broadcast back to the input records by integer code. The number of
+        records and distinct pairs are added to the lookup counts reported
+        by the append_skims method.
+
+        Args:
+            fn: String location of the OMX file
+            matrices: List of string skim matrix names
+            o: NumPy array of origin zone numbers
+            d: NumPy array of destination zone numbers
+
+        Returns:
+            A list of float32 NumPy arrays of skim values, one per matrix,
+            aligned with the input origin-destination vectors """
+
+        o = np.asarray(o, dtype="int64")
+        d = np.asarray(d, dtype="int64")
+
+        if len(o) == 0:
+            return [np.empty(0, dtype="float32") for _ in matrices]
+
+        # factorize origin-destination pairs to a single integer key
+        width = d.max() + 1
+        codes, keys = pd.factorize(o * width + d)
+        o_unique, d_unique = np.divmod(keys, width)
+
+        with self._lookup_lock:
+            self._lookup_counts["records"] += len(o) * len(matrices)
+            self._lookup_counts["keys"] += len(keys) * len(matrices)
+
+        return [self.skim_cache.gather(fn, matrix, o_unique, d_unique)[codes]
+                for matrix in matrices]
+
+    def _map_skim_tasks(self, func, tasks: list) -> list:
+        """ Applies a function to a list of independent skim gathering tasks,
+        such as the records using each OMX file and skim matrix, and returns
+        the results in task order.
+
+        Tasks are run on a thread pool of the configured number of skim
+        workers. OMX reads are serialized by the skim cache while the NumPy
+        gathers release the GIL and run concurrently. Results are returned
+        in task order regardless of completion order so output does not
+        depend on the number of workers.
+
+        Args:
+            func: Function taking a single task
+            tasks: List of tasks
+
+        Returns:
+            A list of the function results, one per task """
+        if self.skim_workers <= 1 or len(tasks) <= 1:
+            return [func(task) for task in tasks]
+
+        with ThreadPoolExecutor(max_workers=min(self.skim_workers, len(tasks))) as executor:
+            return list(executor.map(func, tasks))
+
     def omx_auto_skim_appender(self, df: pd.DataFrame) -> pd.DataFrame:
         """ Takes an input Pandas DataFrame and returns the DataFrame with
         associated auto-mode skims for time, distance, and toll cost appended.
@@ -891,78 +987,43 @@ class SkimAppender(object):
         # selecting records that use the input omx file
         df_map = self._get_omx_auto_skim_dataset(df)
 
-        # initialize output skim list
-        output = []
+        # initialize output skim arrays
+        time = np.full(len(df_map), np.nan, dtype="float32")
+        distance = np.full(len(df_map), np.nan, dtype="float32")
+        toll = np.full(len(df_map), np.nan, dtype="float32")
 
-        for omx_fn in df_map.omxFileName.unique():
+        origins = df_map.originTAZ.to_numpy()
+        destinations = df_map.destinationTAZ.to_numpy()
 
-            # open the input omx file and TAZ:element mapping
-            fn = os.path.join(self.scenario_path, "output", omx_fn + ".omx")
-            omx_file = omx.open_file(fn)
-            omx_map = omx_file.mapping("zone_number")
-
-            # filter records mapped to omx file
-            records_omx = df_map.loc[df_map.omxFileName == omx_fn]
-
-            # for each skim matrix in the data-set
-            for matrix in records_omx.matrixName.unique():
-                # filter records mapped to skim matrix
-                records = records_omx.loc[records_omx.matrixName == matrix]
-
-                # create set of unique origin-destination pairs
-                # get time, distance, cost associated with the o-d pairs
-                od = set(zip(records.originTAZ, records.destinationTAZ))
-                o, d = zip(*od)
-
-                # map o-ds to omx matrix indices
-                o_idx = [omx_map[number] for number in o]
-                d_idx = [omx_map[number] for number in d]
-
-                skims = list(zip(
-                    [omx_fn] * len(o),
-                    [matrix] * len(o),
-                    o, d,
-                    omx_file[matrix + "_TIME"][o_idx, d_idx],
-                    omx_file[matrix + "_DIST"][o_idx, d_idx],
-                    omx_file[matrix + "_TOLLCOST"][o_idx, d_idx] / 100))
-
-                output.extend(skims)
-
-            omx_file.close()
-
-        # create DataFrame from output skim list
-        output = pd.DataFrame(data=output,
-                              columns=["omxFileName",
-                                       "matrixName",
-                                       "originTAZ",
-                                       "destinationTAZ",
-                                       "timeDrive",
-                                       "distanceDrive",
-                                       "costTollDrive"])
-
-        # set data types of output skims list
-        output = output.astype({
-            "omxFileName": "category",
-            "matrixName": "category",
-            "originTAZ": "int16",
-            "destinationTAZ": "int16",
-            "timeDrive": "float32",
-            "distanceDrive": "float32",
-            "costTollDrive": "float32"
-        })
+        def gather(task):
+            (omx_fn, matrix), idx = task
 
-        # merge the output skim list back to the mapped input DataFrame
-        # appending auto skims to tripIDs
-        output = output.merge(right=df_map, how="inner")
-
-        output = output[["tripID",
-                         "timeDrive",
-                         "distanceDrive",
-                         "costTollDrive"]]
+            # location of the input omx file, matrices are read by the skim cache
+            fn = os.path.join(self.scenario_path, "output", omx_fn + ".omx")
 
-        # merge the output skim list back to the original input DataFrame
+            # get time, distance, cost associated with the o-d pairs
+            return self._gather_skims(
+                fn,
+                [matrix + "_TIME", matrix + "_DIST", matrix + "_TOLLCOST"],
+                origins[idx],
+                destinations[idx])
+
+        # gather skims for each omx file and skim matrix in the data-set
+        # on the skim thread pool, assigning results in task order
+        tasks = list(df_map.groupby(["omxFileName", "matrixName"], observed=True).indices.items())
+        for (_, idx), skims in zip(tasks, self._map_skim_tasks(gather, tasks)):
+            time[idx], distance[idx], toll[idx] = skims
+
+        # create DataFrame of auto skims indexed by row position
+        # toll costs are converted from cents to dollars
+        output = pd.DataFrame({"timeDrive": time,
+                               "distanceDrive": distance,
+                               "costTollDrive": toll / 100},
+                              index=df_map.row.to_numpy())
+
+        # assign the output skims to the original input DataFrame
         # keep missing skim records as missing skim means no auto trip
-        df = df.merge(right=output, on="tripID", how="left")
+        df = self._assign_skims(df, output, ["timeDrive", "distanceDrive", "costTollDrive"])
 
         # return input DataFrame with appended skim columns
         return df
@@ -1036,9 +1097,6 @@ class SkimAppender(object):
                              "tripMode",
                              "matrixName"]}
 
-        # initialize empty result set DataFrame
-        result = pd.DataFrame()
-
         # map possible values of trip list columns to skim matrix names
         mapping = [list(i) + ["_".join(j)] for i, j in
                    zip(itertools.product(*skim_map["values"]),
@@ -1055,77 +1113,13 @@ class SkimAppender(object):
             "matrixName": "category"
         })
 
-        # merge lookup table to trip list make DataFrame unique by tripID
-        # ABM Joint sub-model has multiple records per tripID
-        # per person on trip records are identical otherwise
-        trips = df.merge(lookup, how="inner")
-        trips.drop_duplicates(subset="tripID", inplace=True, ignore_index=True)
-
-        # open omx transit skim file and get TAP:element matrix mapping
-        omx_file = omx.open_file(self.scenario_path + "/output/transit_skims.omx")
-        omx_map = omx_file.mapping("zone_number")
-
-        # for each skim matrix in the data-set
-        for matrix in trips.matrixName.unique():
-            # select records that use the skim matrix
-            records = trips.loc[(trips["matrixName"] == matrix)].copy()
-
-            # get lists of o-ds
-            o = records.boardingTAP.astype("int16").tolist()
-            d = records.alightingTAP.astype("int16").tolist()
-
-            # map o-ds to omx matrix indices
-            o_idx = [omx_map[number] for number in o]
-            d_idx = [omx_map[number] for number in d]
-
-            # append skims
-            records["timeTransitInVehicle"] = omx_file[matrix + "_TOTALIVTT"][o_idx, d_idx]
-            records["timeTier1TransitInVehicle"] = omx_file[matrix + "_TIER1IVTT"][o_idx, d_idx]
-            records["timeFreewayRapidTransitInVehicle"] = omx_file[matrix + "_BRTYELIVTT"][o_idx, d_idx]
-            records["timeArterialRapidTransitInVehicle"] = omx_file[matrix + "_BRTREDIVTT"][o_idx, d_idx]
-            records["timeExpressBusTransitInVehicle"] = omx_file[matrix + "_EXPIVTT"][o_idx, d_idx]
-            records["timeLocalBusTransitInVehicle"] = omx_file[matrix + "_BUSIVTT"][o_idx, d_idx]
-            records["timeLightRailTransitInVehicle"] = omx_file[matrix + "_LRTIVTT"][o_idx, d_idx]
-            records["timeCommuterRailTransitInVehicle"] = omx_file[matrix + "_CMRIVTT"][o_idx, d_idx]
-            records["timeTransitInitialWait"] = omx_file[matrix + "_FIRSTWAIT"][o_idx, d_idx]
-            records["timeTransitWait"] = omx_file[matrix + "_TOTALWAIT"][o_idx, d_idx]
-            records["timeTransitWalk"] = omx_file[matrix + "_TOTALWALK"][o_idx, d_idx]
-            records["distanceTransitInVehicle"] = omx_file[matrix + "_TOTDIST"][o_idx, d_idx]
-            records["costFareTransit"] = omx_file[matrix + "_FARE"][o_idx, d_idx]
-            records["transfersTransit"] = omx_file[matrix + "_XFERS"][o_idx, d_idx]
-            records["distanceTransitWalk"] = records.timeTransitWalk * self.properties["walkSpeed"] / 60
-
-            # set skim data types
-            records = records.astype({
-                "timeTransitInVehicle": "float32",
-                "timeTransitInitialWait": "float32",
-                "timeTransitWait": "float32",
-                "timeTransitWalk": "float32",
-                "distanceTransitInVehicle": "float32",
-                "costFareTransit": "float32",
-                "transfersTransit": "float32",
-                "distanceTransitWalk": "float32"})
-
-            records = records[["tripID",
-                               "timeTransitInVehicle",
-                               "timeTier1TransitInVehicle",
-                               "timeFreewayRapidTransitInVehicle",
-                               "timeArterialRapidTransitInVehicle",
-                               "timeExpressBusTransitInVehicle",
-                               "timeLocalBusTransitInVehicle",
-                               "timeLightRailTransitInVehicle",
-                               "timeCommuterRailTransitInVehicle",
-                               "timeTransitInitialWait",
-                               "timeTransitWait",
-                               "timeTransitWalk",
-                               "distanceTransitInVehicle",
-                               "distanceTransitWalk",
-                               "costFareTransit",
-                               "transfersTransit"]]
-
-            result = result.append(records, ignore_index=True)
-
-        omx_file.close()
+        # merge lookup table to the trip list fields used in the mapping
+        # keeping the row position of each record in the input DataFrame
+        trips = df[["departTimeFiveTod",
+                    "tripMode",
+                    "boardingTAP",
+                    "alightingTAP"]].assign(row=np.arange(len(df)))
+        trips = trips.merge(lookup, how="inner")
 
         skim_cols = ["timeTransitInVehicle",
                      "timeTier1TransitInVehicle",
@@ -1143,16 +1137,59 @@ class SkimAppender(object):
                      "costFareTransit",
                      "transfersTransit"]
 
-        # if there are no transit trip skim records
-        if result.empty:
-            # append skim columns to input DataFrame
-            # set to missing as a missing skim means no transit trip
-            for col in skim_cols:
-                df[col] = np.NaN
-        else:
-            # merge result set DataFrame back into initial trip list
-            # keep missing skim records as missing skim means no transit trip
-            df = df.merge(result, on="tripID", how="left")
+        # initialize output skim arrays
+        # set to missing as a missing skim means no transit trip
+        result = {col: np.full(len(df), np.nan, dtype="float32") for col in skim_cols}
+
+        # location of the omx transit skim file, matrices are read by the skim cache
+        fn = os.path.join(self.scenario_path, "output", "transit_skims.omx")
+
+        boarding = trips.boardingTAP.to_numpy()
+        alighting = trips.alightingTAP.to_numpy()
+
+        def gather(task):
+            matrix, idx = task
+
+            # map transit skim matrices to skim fields
+            skim_matrices = {
+                "timeTransitInVehicle": matrix + "_TOTALIVTT",
+                "timeTier1TransitInVehicle": matrix + "_TIER1IVTT",
+                "timeFreewayRapidTransitInVehicle": matrix + "_BRTYELIVTT",
+                "timeArterialRapidTransitInVehicle": matrix + "_BRTREDIVTT",
+                "timeExpressBusTransitInVehicle": matrix + "_EXPIVTT",
+                "timeLocalBusTransitInVehicle": matrix + "_BUSIVTT",
+                "timeLightRailTransitInVehicle": matrix + "_LRTIVTT",
+                "timeCommuterRailTransitInVehicle": matrix + "_CMRIVTT",
+                "timeTransitInitialWait": matrix + "_FIRSTWAIT",
+                "timeTransitWait": matrix + "_TOTALWAIT",
+                "timeTransitWalk": matrix + "_TOTALWALK",
+                "distanceTransitInVehicle": matrix + "_TOTDIST",
+                "costFareTransit": matrix + "_FARE",
+                "transfersTransit": matrix + "_XFERS"
+            }
+
+            # gather skims of the records that use the skim matrix
+            skims = self._gather_skims(
+                fn,
+                list(skim_matrices.values()),
+                boarding[idx].astype("int16"),
+                alighting[idx].astype("int16"))
+
+            return dict(zip(skim_matrices.keys(), skims))
+
+        # gather skims for each skim matrix in the data-set on the skim
+        # thread pool, assigning results to the row positions of the records
+        tasks = list(trips.groupby("matrixName", observed=True).indices.items())
+        for (_, idx), skims in zip(tasks, self._map_skim_tasks(gather, tasks)):
+            rows = trips.row.to_numpy()[idx]
+            for col, values in skims.items():
+                result[col][rows] = values
+
+        result["distanceTransitWalk"] = result["timeTransitWalk"] * self.properties["walkSpeed"] / 60
+
+        # append skim columns to input DataFrame
+        for col in skim_cols:
+            df[col] = result[col]
 
         # return input DataFrame with appended skim columns
         return df
@@ -1252,49 +1289,54 @@ class SkimAppender(object):
         # load the mgra based input file
         fn = "mgra13_based_input" + str(self.properties["year"]) + ".csv"
 
-        mgra = pd.read_csv(os.path.join(self.scenario_path, "input", fn),
-                           usecols=["mgra",  # MGRA geography
-                                    "PopEmpDenPerMi"],  # density per mi
-                           dtype={"mgra": "int16",
-                                  "PopEmpDenPerMi": "float32"})
+        mgra = read_csv(os.path.join(self.scenario_path, "input", fn),
+                        usecols=["mgra",  # MGRA geography
+                                 "PopEmpDenPerMi"],  # density per mi
+                        dtype={"mgra": "int16",
+                               "PopEmpDenPerMi": "float32"})
 
-        # add PopEmpDenPerMi field to the input DataFrame
-        df = df.merge(mgra, left_on="originMGRA", right_on="mgra")
+        # remove trips with an origin MGRA not in the mgra based input file
+        valid = df["originMGRA"].isin(mgra["mgra"])
+        if not valid.all():
+            df = df.loc[valid].reset_index(drop=True)
+
+        # map PopEmpDenPerMi to the input DataFrame origin MGRAs
+        density = df["originMGRA"].map(mgra.set_index("mgra")["PopEmpDenPerMi"])
 
         # select mean wait time for Taxi/TNC mode trips based on
         # the category the PopEmpDenPerMi value falls in
         # note the first true condition encountered is chosen
         conditions = [
             ((df["tripMode"] == "Non-Pooled TNC") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][0])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][0])),
             ((df["tripMode"] == "Non-Pooled TNC") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][1])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][1])),
             ((df["tripMode"] == "Non-Pooled TNC") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][2])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][2])),
             ((df["tripMode"] == "Non-Pooled TNC") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][3])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][3])),
             ((df["tripMode"] == "Non-Pooled TNC") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][4])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][4])),
             ((df["tripMode"] == "Pooled TNC") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][0])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][0])),
             ((df["tripMode"] == "Pooled TNC") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][1])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][1])),
             ((df["tripMode"] == "Pooled TNC") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][2])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][2])),
             ((df["tripMode"] == "Pooled TNC") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][3])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][3])),
             ((df["tripMode"] == "Pooled TNC") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][4])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][4])),
             ((df["tripMode"] == "Taxi") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][0])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][0])),
             ((df["tripMode"] == "Taxi") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][1])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][1])),
             ((df["tripMode"] == "Taxi") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][2])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][2])),
             ((df["tripMode"] == "Taxi") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][3])),
+                    density < self.properties["waitTimePopEmpDenPerMi"][3])),
             ((df["tripMode"] == "Taxi") & (
-                    df["PopEmpDenPerMi"] < self.properties["waitTimePopEmpDenPerMi"][4]))
+                    density < self.properties["waitTimePopEmpDenPerMi"][4]))
         ]
 
         choices = [
@@ -1307,9 +1349,6 @@ class SkimAppender(object):
             np.select(conditions, choices, default=np.NaN),
             dtype="float32")
 
-        # remove mgra, PopEmpDenPerMi from the input DataFrame
-        df.drop(columns=["mgra", "PopEmpDenPerMi"], inplace=True)
-
         # return input DataFrame with appended auto wait time column
         return df
 
@@ -1346,26 +1385,26 @@ class SkimAppender(object):
         records_at = self._walk_skims_at(df)
         records_auto = self._walk_skims_auto(df)
 
+        skim_cols = ["timeWalk",
+                     "distanceWalk",
+                     "timeMM",
+                     "distanceMM",
+                     "costFareMM",
+                     "timeMT",
+                     "distanceMT",
+                     "costFareMT"]
+
         # if there are no mm/mt/walk trip skim records
         if records_at.empty and records_auto.empty:
             # append skim columns to input DataFrame
             # set to missing as a missing skim means no walk trip
-            skim_cols = ["timeWalk",
-                         "distanceWalk",
-                         "timeMM",
-                         "distanceMM",
-                         "costFareMM",
-                         "timeMT",
-                         "distanceMT",
-                         "costFareMT"]
-
             for col in skim_cols:
                 df[col] = np.NaN
         else:
-            # merge result set DataFrame back into initial trip list
+            # assign result set to the initial trip list by row position
             # keep missing skim records as missing skim means no walk trip
-            records = records_at.append(records_auto, ignore_index=True)
-            df = df.merge(records, on="tripID", how="left")
+            records = records_at.append(records_auto)
+            df = self._assign_skims(df, records, skim_cols)
 
         # return input DataFrame with appended skim columns
         return df
@@ -1392,8 +1431,8 @@ class SkimAppender(object):
                 micro-transit, and walk mode skims for time, distance, and
                 fare cost. The DataFrame contains only micro-mobility,
                 micro-transit, and walk mode trip records that do not use the
-                auto mode skim set for time:
-                    [tripID] - unique identifier of a trip
+                auto mode skim set for time and is indexed by the row position
+                of the records in the input DataFrame:
                     [timeWalk] - time in minutes for walk mode
                     [distanceWalk] - distance in miles for walk mode
                     [timeMM] - time in minutes for micro-mobility mode
@@ -1403,42 +1442,24 @@ class SkimAppender(object):
                     [distanceMT] - distance in miles for micro-transit mode
                     [costFareMT] - fare cost in dollars for micro-transit mode
             """
-        # load the mgra-mgra walk/micro-mobility/micro-transit skim file
-        skims = pd.read_csv(os.path.join(self.scenario_path,
-                                         "output",
-                                         "microMgraEquivMinutes.csv"),
-                            usecols=["i",  # origin MGRA geography
-                                     "j",  # destination MGRA geography
-                                     "walkTime",  # walk time in minutes
-                                     "dist",  # distance in miles
-                                     "mmTime",  # micro-mobility time in minutes
-                                     "mmCost",  # micro-mobility cost in dollars
-                                     "mtTime",  # micro-transit time in minutes
-                                     "mtCost"],    # micro-transit cost in dollars
-                            dtype={"i": "int16",
-                                   "j": "int16",
-                                   "walkTime": "float32",
-                                   "dist": "float32",
-                                   "mmTime": "float32",
-                                   "mmCost": "float32",
-                                   "mtTime": "float32",
-                                   "mtCost": "float32"})
-
-        # merge the skims with the input DataFrame walk/mm/mt mode records
-        # ABM Joint sub-model has multiple records per tripID
-        # per person on trip records are identical otherwise
+        # select the input DataFrame walk/mm/mt mode records
         records = df.loc[(df["tripMode"].isin(["Micro-Mobility",
                                                "Micro-Transit",
-                                               "Walk"]))].copy()
+                                               "Walk"])),
+                         ["tripMode",
+                          "originMGRA",
+                          "destinationMGRA"]]
 
-        records.drop_duplicates(subset="tripID", inplace=True, ignore_index=True)
+        # locate the records in the mgra-mgra walk/micro-mobility/micro-transit skims
+        # some of these trips can use auto skims, remove records that are not located
+        skims = self.micro_mgra_skims
+        pos = skims.locate(records["originMGRA"], records["destinationMGRA"])
 
-        records = records.merge(
-            right=skims,
-            how="inner",  # some of these trips can use auto skims, use inner join to remove them
-            left_on=["originMGRA", "destinationMGRA"],
-            right_on=["i", "j"]
-        )
+        records = records.loc[pos >= 0].copy()
+        pos = pos[pos >= 0]
+
+        for col in ["walkTime", "dist", "mmTime", "mmCost", "mtTime", "mtCost"]:
+            records[col] = skims.gather(col, pos)
 
         # set skims based on mode
         records["timeWalk"] = np.where(records["tripMode"] == "Walk",
@@ -1475,8 +1496,7 @@ class SkimAppender(object):
 
         # return result set of walk/micro-mobility/micro-transit trips
         # that use AT skim sets
-        return records[["tripID",
-                        "timeWalk",
+        return records[["timeWalk",
                         "distanceWalk",
                         "timeMM",
                         "distanceMM",
@@ -1509,8 +1529,8 @@ class SkimAppender(object):
                 micro-transit, and walk mode skims for time, distance, and
                 fare cost. The DataFrame contains only micro-mobility,
                 micro-transit, and walk mode trip records that use the auto
-                mode skim set for time:
-                    [tripID] - unique identifier of a trip
+                mode skim set for time and is indexed by the row position of
+                the records in the input DataFrame:
                     [timeWalk] - time in minutes for walk mode
                     [distanceWalk] - distance in miles for walk mode
                     [timeMM] - time in minutes for micro-mobility mode
@@ -1520,90 +1540,59 @@ class SkimAppender(object):
                     [distanceMT] - distance in miles for micro-transit mode
                     [costFareMT] - fare cost in dollars for micro-transit mode
             """
-        # load the mgra-mgra walk/micro-mobility/micro-transit skim file
-        skims = pd.read_csv(os.path.join(self.scenario_path,
-                                         "output",
-                                         "microMgraEquivMinutes.csv"),
-                            usecols=["i",  # origin MGRA geography
-                                     "j",  # destination MGRA geography
-                                     "walkTime",  # walk time in minutes
-                                     "dist",  # distance in miles
-                                     "mmTime",  # micro-mobility time in minutes
-                                     "mmCost",  # micro-mobility cost in dollars
-                                     "mtTime",  # micro-transit time in minutes
-                                     "mtCost"],    # micro-transit cost in dollars
-                            dtype={"i": "int16",
-                                   "j": "int16",
-                                   "walkTime": "float32",
-                                   "dist": "float32",
-                                   "mmTime": "float32",
-                                   "mmCost": "float32",
-                                   "mtTime": "float32",
-                                   "mtCost": "float32"})
-
-        # merge the skims with the input DataFrame walk/mm/mt mode records
-        # ABM Joint sub-model has multiple records per tripID
-        # per person on trip records are identical otherwise
+        # select the input DataFrame walk/mm/mt mode records
         records = df.loc[(df["tripMode"].isin(["Micro-Mobility",
                                                "Micro-Transit",
-                                               "Walk"]))].copy()
-
-        records.drop_duplicates(subset="tripID", inplace=True, ignore_index=True)
+                                               "Walk"])),
+                         ["tripMode",
+                          "originMGRA",
+                          "originTAZ",
+                          "destinationMGRA",
+                          "destinationTAZ"]]
 
         # select records that are NOT in the mgra-mgra
-        # walk/micro-mobility/micro-transit skim file
-        records = records.merge(
-            right=skims,
-            how="left",  # use outer join to keep all trip records
-            left_on=["originMGRA", "destinationMGRA"],
-            right_on=["i", "j"],
-            indicator=True
-        )
+        # walk/micro-mobility/micro-transit skims
+        pos = self.micro_mgra_skims.locate(records["originMGRA"],
+                                           records["destinationMGRA"])
 
-        records = records[records["_merge"] == "left_only"]
+        records = records.loc[pos < 0].copy()
 
         # if there are no eligible records return an empty DataFrame
         if records.empty:
             return pd.DataFrame(
-                columns=["tripID",
-                         "timeWalk",
+                columns=["timeWalk",
                          "distanceWalk",
                          "timeMM",
                          "distanceMM",
                          "costFareMM",
                          "timeMT",
                          "distanceMT",
-                         "costFareMT"]
+                         "costFareMT"],
+                dtype="float32"
             )
         else:
             # append trip time from auto skim set
             # midday drive alone non-transponder low value of time
 
-            # open omx transit skim file and get TAZ matrix mapping
-            omx_file = omx.open_file(self.scenario_path + "/output/traffic_skims_MD.omx")
-            omx_map = omx_file.mapping("zone_number")
-
-            # get lists of o-ds
-            o = records.originTAZ.astype("int16").tolist()
-            d = records.destinationTAZ.astype("int16").tolist()
-
-            # map o-ds to omx matrix indices
-            o_idx = [omx_map[number] for number in o]
-            d_idx = [omx_map[number] for number in d]
+            # get the omx auto skim file from the skim cache
+            fn = os.path.join(self.scenario_path, "output", "traffic_skims_MD.omx")
 
             # append travel time skim from auto skim set
-            records["sovTime"] = omx_file["MD_SOV_NT_M_TIME"][o_idx, d_idx]
-
-            omx_file.close()
+            records["sovTime"] = self._gather_skims(
+                fn,
+                ["MD_SOV_NT_M_TIME"],
+                records.originTAZ.astype("int16").to_numpy(),
+                records.destinationTAZ.astype("int16").to_numpy())[0]
 
             # load the MGRA-MGRA based input file
             # merge with trips to get micro-mobility access time for origin MGRAs
-            records = records.merge(
+            # keep the row position of each record in the input DataFrame
+            records = records.rename_axis("row").reset_index().merge(
                 right=self.mgra_xref,
                 how="inner",
                 left_on="originMGRA",
                 right_on="MGRA"
-            )
+            ).set_index("row")
 
             # set skims based on mode
             records["timeWalk"] = np.where(records["tripMode"] == "Walk",
@@ -1643,8 +1632,7 @@ class SkimAppender(object):
 
             # return result set of walk/micro-mobility/micro-transit trips
             # that use auto mode skim set
-            return records[["tripID",
-                            "timeWalk",
+            return records[["timeWalk",
                             "distanceWalk",
                             "timeMM",
                             "distanceMM",
@@ -1701,28 +1689,6 @@ class SkimAppender(object):
                 [costFareTransitMTAccessEgress] - fare cost in dollars for
                     micro-transit portion of transit access/egress """
 
-        # load the micro-mobility, micro-transit, and walk from MGRA-TAP
-        # skim file containing time, distance, and cost
-        skims = pd.read_csv(os.path.join(self.scenario_path,
-                                         "output",
-                                         "microMgraTapEquivMinutes.csv"),
-                            usecols=["mgra",  # origin MGRA geography
-                                     "tap",  # destination TAP
-                                     "walkTime",  # walk time in minutes
-                                     "dist",  # distance in miles
-                                     "mmTime",  # micro-mobility time in minutes
-                                     "mmCost",  # micro-mobility cost in dollars
-                                     "mtTime",  # micro-transit time in minutes
-                                     "mtCost"],  # micro-transit cost in dollars
-                            dtype={"mgra": "int16",
-                                   "tap": "int16",
-                                   "walkTime": "float32",
-                                   "dist": "float32",
-                                   "mmTime": "float32",
-                                   "mmCost": "float32",
-                                   "mtTime": "float32",
-                                   "mtCost": "float32"})
-
         # filter input DataFrame to records that have access/egress
         # micro-mobility, micro-transit, or walk segments
         records = df.loc[(df["tripMode"].isin(
@@ -1737,28 +1703,28 @@ class SkimAppender(object):
              "Kiss and Ride to Transit - Local Bus and Premium Transit",
              "TNC to Transit - Local Bus",
              "TNC to Transit - Premium Transit",
-             "TNC to Transit - Local Bus and Premium Transit"]))].copy()
-
-        # ABM Joint sub-model has multiple records per tripID
-        # per person on trip records are identical otherwise
-        records.drop_duplicates(subset="tripID", inplace=True, ignore_index=True)
-
-        # merge micro-mobility, micro-transit, and walk access/egress skims
-        # for both the access and egress portions
-        records = records.merge(
-            right=skims,
-            how="left",
-            left_on=["originMGRA", "boardingTAP"],
-            right_on=["mgra", "tap"]
-        )
-
-        records = records.merge(
-            right=skims,
-            how="left",
-            left_on=["destinationMGRA", "alightingTAP"],
-            right_on=["mgra", "tap"],
-            suffixes=["Access", "Egress"]
-        )
+             "TNC to Transit - Local Bus and Premium Transit"])),
+                         [col for col in ["tripMode",
+                                          "inbound",
+                                          "originMGRA",
+                                          "destinationMGRA",
+                                          "boardingTAP",
+                                          "alightingTAP",
+                                          "microMobilityTransitAccess",
+                                          "microMobilityTransitEgress"]
+                          if col in df.columns]]
+
+        # locate micro-mobility, micro-transit, and walk access/egress skims
+        # for both the access and egress portions, missing skims are NaN
+        records = records.copy()
+        skims = self.micro_mgra_tap_skims
+
+        access = skims.locate(records["originMGRA"], records["boardingTAP"])
+        egress = skims.locate(records["destinationMGRA"], records["alightingTAP"])
+
+        for col in ["walkTime", "dist", "mmTime", "mmCost", "mtTime", "mtCost"]:
+            records[col + "Access"] = skims.gather(col, access)
+            records[col + "Egress"] = skims.gather(col, egress)
 
         # conditionally set access/egress skim fields to 0 based on trip mode
         # and inbound direction of trip, note that walk to transit uses both
@@ -1859,9 +1825,8 @@ class SkimAppender(object):
                 np.where(records["microMobilityTransitEgress"] == "Micro-Transit",
                          records["mtCostEgress"], 0)
 
-        # merge result set DataFrame back into initial trip list
-        records = records[["tripID",
-                           "timeTransitWalkAccessEgress",
+        # select result set skim fields
+        records = records[["timeTransitWalkAccessEgress",
                            "distanceTransitWalkAccessEgress",
                            "timeTransitMMAccessEgress",
                            "distanceTransitMMAccessEgress",
@@ -1887,9 +1852,9 @@ class SkimAppender(object):
             for col in skim_cols:
                 df[col] = np.NaN
         else:
-            # merge result set DataFrame back into initial trip list
+            # assign result set to the initial trip list by row position
             # keep missing skim records as missing skim means no transit trip
-            df = df.merge(records, on="tripID", how="left")
+            df = self._assign_skims(df, records, skim_cols)
 
         # return input DataFrame with appended skim columns
         return df
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+""" Skim Cache Module.
+
+This module contains the classes used by the ABM Scenario Skim Appender
+Module to hold transportation skims in memory. The SkimCache class holds
+OMX skim matrices, each read from its OMX file once as a contiguous float32
+array, and gathers skim values for whole trip lists with vectorized NumPy
+fancy-indexing in place of HDF5 point selection. The SparseSkim class holds
+sparse origin-destination skim tables (e.g. MGRA-MGRA skims) in a
+compressed sparse row (CSR) structure cached as a binary file next to the
+source csv file unless the csv file cache is switched off (see csvCache).
+
+Notes:
+    docstring style guide - http://google.github.io/styleguide/pyguide.html
+"""
+
+import collections
+import os
+import threading
+import csvCache
+import numpy as np
+import openmatrix as omx  # https://github.com/osPlanning/omx-python
+import pandas as pd
+
+
+class SkimCache(object):
+    """ This class holds OMX skim matrices as contiguous float32 NumPy
+    arrays bounded by a memory budget. Matrices are loaded on first use and
+    the least recently used matrices are evicted once the budget is
+    exceeded. A single instance is intended to be shared by every trip list
+    written by the exporter.
+
+    If a memory-map folder is given, matrices are extracted once to NumPy
+    .npy files in the folder and opened as read-only memory-maps. Memory-mapped
+    matrices are paged in by the operating system and do not count against
+    the memory budget.
+
+    The cache is thread-safe. Gathers run concurrently while reads of the
+    OMX files are serialized as the HDF5 library is not thread-safe.
+
+    Args:
+        memory_budget: Integer maximum number of bytes of skim matrices held
+            in memory (default 4GB)
+        mmap_path: Optional string location of a folder used to hold
+            extracted memory-mapped copies of the skim matrices
+
+    Methods:
+        clear: Removes all matrices and zone lookups from the cache
+        gather: Returns skim values for vectors of origin and destination
+            zone numbers
+        indices: Maps zone numbers to OMX matrix indices
+        lookup: Returns the dense zone number to OMX matrix index lookup
+            array of an OMX file
+        matrix: Returns a skim matrix as a float32 NumPy array
+
+    Properties:
+        nbytes: Number of bytes of skim matrices held in memory """
+
+    def __init__(self, memory_budget: int = 4 * 1024 ** 3, mmap_path: str = None) -> None:
+        self.memory_budget = memory_budget
+        self.mmap_path = mmap_path
+        self._matrices = collections.OrderedDict()
+        self._lookups = {}
+        self._lock = threading.RLock()  # guards the cache contents
+        self._io_lock = threading.Lock()  # serializes OMX file reads
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes of skim matrices held in memory. Memory-mapped
+        matrices are not included. """
+        with self._lock:
+            return sum(arr.nbytes for arr in self._matrices.values()
+                       if not isinstance(arr, np.memmap))
+
+    def clear(self) -> None:
+        """ Removes all matrices and zone lookups from the cache. """
+        with self._lock:
+            self._matrices.clear()
+            self._lookups.clear()
+
+    def _evict(self, nbytes: int) -> None:
+        """ Evicts least recently used in-memory matrices until a matrix of
+        the given size fits within the memory budget.
+
+        Args:
+            nbytes: Integer number of bytes of the matrix to be added """
+        used = self.nbytes
+        for key in list(self._matrices.keys()):
+            if used + nbytes <= self.memory_budget:
+                break
+            arr = self._matrices[key]
+            if not isinstance(arr, np.memmap):
+                used -= arr.nbytes
+                del self._matrices[key]
+
+    def _read(self, fn: str, name: str) -> np.ndarray:
+        """ Reads a skim matrix from an OMX file, or from its memory-mapped
+        copy if a memory-map folder is set.
+
+        Args:
+            fn: String location of the OMX file
+            name: String name of the skim matrix
+
+        Returns:
+            The skim matrix as a float32 NumPy array """
+        if self.mmap_path is not None:
+            npy_fn = os.path.join(
+                self.mmap_path,
+                os.path.splitext(os.path.basename(fn))[0] + "__" + name + ".npy")
+
+            # extract the matrix if there is no copy or it is out of date
+            if not os.path.exists(npy_fn) or \
+                    os.path.getmtime(npy_fn) < os.path.getmtime(fn):
+                os.makedirs(self.mmap_path, exist_ok=True)
+                omx_file = omx.open_file(fn)
+                try:
+                    arr = np.ascontiguousarray(omx_file[name].read(), dtype="float32")
+                finally:
+                    omx_file.close()
+                np.save(npy_fn, arr)
+
+            return np.load(npy_fn, mmap_mode="r")
+        else:
+            omx_file = omx.open_file(fn)
+            try:
+                return np.ascontiguousarray(omx_file[name].read(), dtype="float32")
+            finally:
+                omx_file.close()
+
+    def lookup(self, fn: str) -> np.ndarray:
+        """ Returns a dense lookup array of zone numbers to OMX matrix indices
+        built from the OMX file zone_number mapping. Zone numbers not in the
+        mapping hold -1.
+
+        Args:
+            fn: String location of the OMX file
+
+        Returns:
+            A NumPy integer array indexed by zone number """
+        with self._lock:
+            if fn in self._lookups:
+                return self._lookups[fn]
+
+        with self._io_lock:
+            omx_file = omx.open_file(fn)
+            try:
+                zones = np.asarray(omx_file.mapentries("zone_number"), dtype="int64")
+            finally:
+                omx_file.close()
+
+        lookup = np.full(zones.max() + 1, -1, dtype="int32")
+        lookup[zones] = np.arange(len(zones), dtype="int32")
+
+        with self._lock:
+            return self._lookups.setdefault(fn, lookup)
+
+    def indices(self, fn: str, zones: np.ndarray) -> np.ndarray:
+        """ Maps zone numbers to OMX matrix indices.
+
+        Args:
+            fn: String location of the OMX file
+            zones: NumPy array of zone numbers
+
+        Returns:
+            A NumPy integer array of OMX matrix indices
+
+        Raises:
+            KeyError: If any zone number is not in the OMX file mapping """
+        lookup = self.lookup(fn)
+        zones = np.asarray(zones, dtype="int64")
+
+        valid = (zones >= 0) & (zones < len(lookup))
+        idx = np.full(len(zones), -1, dtype="int32")
+        idx[valid] = lookup[zones[valid]]
+
+        if (idx < 0).any():
+            missing = np.unique(zones[idx < 0])
+            raise KeyError("zone numbers not in " + os.path.basename(fn) +
+                           ": " + ", ".join(map(str, missing[:10])))
+
+        return idx
+
+    def matrix(self, fn: str, name: str) -> np.ndarray:
+        """ Returns a skim matrix as a float32 NumPy array, loading it from
+        the OMX file if it is not already held in the cache.
+
+        Args:
+            fn: String location of the OMX file
+            name: String name of the skim matrix
+
+        Returns:
+            The skim matrix as a float32 NumPy array """
+        key = (fn, name)
+
+        with self._lock:
+            if key in self._matrices:
+                self._matrices.move_to_end(key)
+                return self._matrices[key]
+
+        with self._io_lock:
+            # another thread may have loaded the matrix while waiting
+            with self._lock:
+                if key in self._matrices:
+                    self._matrices.move_to_end(key)
+                    return self._matrices[key]
+
+            arr = self._read(fn, name)
+
+        with self._lock:
+            if not isinstance(arr, np.memmap):
+                self._evict(arr.nbytes)
+            self._matrices[key] = arr
+
+        return arr
+
+    def gather(self, fn: str, name: str, o: np.ndarray, d: np.ndarray) -> np.ndarray:
+        """ Returns skim values for vectors of origin and destination zone
+        numbers.
+
+        Args:
+            fn: String location of the OMX file
+            name: String name of the skim matrix
+            o: NumPy array of origin zone numbers
+            d: NumPy array of destination zone numbers
+
+        Returns:
+            A float32 NumPy array of skim values """
+        o_idx = self.indices(fn, o)
+        d_idx = self.indices(fn, d)
+
+        return self.matrix(fn, name)[o_idx, d_idx]
+
+
+class SparseSkim(object):
+    """ This class holds a sparse origin-destination skim table in a
+    compressed sparse row (CSR) structure keyed by origin with the
+    destinations of each origin sorted. Skim values for vectors of
+    origin-destination pairs are located with a vectorized binary search
+    (np.searchsorted) over the sorted origin-destination pairs.
+
+    Args:
+        indptr: NumPy integer array of length (maximum origin + 2) holding
+            the start position of the destinations of each origin
+        indices: NumPy integer array of destinations sorted within origin
+        data: Dictionary of skim field names to NumPy arrays of skim values
+            aligned with the indices array
+
+    Methods:
+        from_csv: Creates a SparseSkim from a csv file of origin-destination
+            skims, using a binary cache file next to the csv file
+        gather: Returns the values of a skim field for located
+            origin-destination pairs
+        locate: Returns the positions of origin-destination pairs in the
+            sparse skim table
+
+    Properties:
+        nbytes: Number of bytes of the sparse skim table arrays """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: dict) -> None:
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+        # composite origin-destination keys sorted by origin and destination
+        self._width = int(indices.max()) + 1 if len(indices) > 0 else 1
+        origins = np.repeat(np.arange(len(indptr) - 1, dtype="int64"), np.diff(indptr))
+        self._keys = origins * self._width + indices
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes of the sparse skim table arrays. """
+        return self.indptr.nbytes + self.indices.nbytes + self._keys.nbytes + \
+            sum(values.nbytes for values in self.data.values())
+
+    @classmethod
+    def from_csv(cls, fn: str, origin: str, destination: str, **kwargs) -> "SparseSkim":
+        """ Creates a SparseSkim from a csv file of origin-destination skims.
+
+        The CSR structure is written to a NumPy .npz file of the same name
+        next to the csv file and is read from it in place of the csv file
+        unless the csv file is newer or the skim fields differ. The .npz file
+        is neither read nor written if the csv file cache is switched off
+        (csvCache.enabled) and is skipped if it cannot be written (e.g. a
+        read-only scenario folder). Duplicate origin-destination pairs keep
+        the first record of the csv file.
+
+        Args:
+            fn: String location of the csv file
+            origin: String name of the origin field of the csv file
+            destination: String name of the destination field of the csv file
+            **kwargs: Keyword arguments passed to pandas.read_csv, the usecols
+                argument defines the origin, destination, and skim fields
+
+        Returns:
+            A SparseSkim of the csv file skim fields """
+        cols = [col for col in kwargs["usecols"] if col not in [origin, destination]]
+        npz_fn = os.path.splitext(fn)[0] + ".npz"
+
+        # use the binary cache file if it is current
+        if csvCache.enabled and os.path.exists(npz_fn) and \
+                os.path.getmtime(npz_fn) >= os.path.getmtime(fn):
+            with np.load(npz_fn) as npz:
+                if list(npz["columns"]) == cols:
+                    return cls(npz["indptr"],
+                               npz["indices"],
+                               {col: npz["data_" + col] for col in cols})
+
+        skims = pd.read_csv(fn, **kwargs)
+
+        # sort by origin and destination keeping the first duplicate record
+        skims = skims.sort_values(by=[origin, destination], kind="mergesort")
+        skims = skims.drop_duplicates(subset=[origin, destination])
+
+        o = skims[origin].to_numpy().astype("int64")
+        indices = skims[destination].to_numpy().astype("int64")
+        counts = np.bincount(o, minlength=(o.max() + 1) if len(o) > 0 else 1)
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        data = {col: skims[col].to_numpy() for col in cols}
+
+        # write to a temporary file so readers never see a partial cache
+        # file, the cache is skipped if the cache file cannot be written
+        if csvCache.enabled:
+            tmp_fn = npz_fn + "." + str(os.getpid()) + "." + str(threading.get_ident()) + ".tmp"
+            try:
+                with open(tmp_fn, "wb") as file:
+                    np.savez(file,
+                             columns=np.array(cols),
+                             indptr=indptr,
+                             indices=indices,
+                             **{"data_" + col: data[col] for col in cols})
+                os.replace(tmp_fn, npz_fn)
+            except OSError:
+                if os.path.exists(tmp_fn):
+                    os.remove(tmp_fn)
+
+        return cls(indptr, indices, data)
+
+    def locate(self, o: np.ndarray, d: np.ndarray) -> np.ndarray:
+        """ Returns the positions of origin-destination pairs in the sparse
+        skim table.
+
+        Args:
+            o: NumPy array of origins
+            d: NumPy array of destinations
+
+        Returns:
+            A NumPy integer array of positions, -1 where the
+            origin-destination pair is not in the sparse skim table """
+        o = np.asarray(o, dtype="float64")
+        d = np.asarray(d, dtype="float64")
+
+        # missing and out of range origin-destinations are not located
+        valid = (o >= 0) & (o < len(self.indptr) - 1) & (d >= 0) & (d < self._width)
+        keys = np.where(valid, o, 0).astype("int64") * self._width + \
+            np.where(valid, d, 0).astype("int64")
+
+        if len(self._keys) == 0:
+            return np.full(len(keys), -1, dtype="int64")
+
+        pos = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+
+        return np.where(valid & (self._keys[pos] == keys), pos, -1)
+
+    def gather(self, col: str, pos: np.ndarray) -> np.ndarray:
+        """ Returns the values of a skim field for located origin-destination
+        pairs.
+
+        Args:
+            col: String name of the skim field
+            pos: NumPy integer array of positions returned by the locate method
+
+        Returns:
+            A NumPy float array of skim values, NaN where the
+            origin-destination pair is not in the sparse skim table """
+        values = self.data[col][np.maximum(pos, 0)]
+
+        return np.where(pos >= 0, values, np.nan).astype(values.dtype)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+""" ABM Time Periods Module.
+
+This module contains the functions used by the ABM Scenario Data Exporter
+Modules to map times of day to ABM model time resolution periods. The ABM
+half hour and ABM five time of day period lookups are built once as NumPy
+arrays and whole columns are mapped with np.searchsorted and array
+indexing in place of per-record Python comparisons of datetime objects.
+
+Notes:
+    docstring style guide - http://google.github.io/styleguide/pyguide.html
+"""
+
+import numpy as np
+import pandas as pd
+
+# start times in minutes after midnight of the ABM half hour periods
+# sorted by start time where period 40 (12am-3am) wraps midnight and
+# period 1 covers 3am-5am, each period ends where the next one starts
+HALF_HOUR_STARTS = np.array([0, 180] + list(range(300, 1440, 30)), dtype="int64")
+HALF_HOUR_PERIODS = np.array([40] + list(range(1, 40)), dtype="int8")
+
+# ABM five time of day period of each ABM half hour period (1-40)
+# indexed by ABM half hour period with index 0 unused
+FIVE_TOD_PERIODS = np.array([np.nan] +
+                            [1] * 3 +  # EA (3am-6am)
+                            [2] * 6 +  # AM (6am-9am)
+                            [3] * 13 +  # MD (9am-3:30pm)
+                            [4] * 7 +  # PM (3:30pm-7pm)
+                            [5] * 11,  # EV (7pm-3am)
+                            dtype="float64")
+FIVE_TOD_LABELS = ["EA", "AM", "MD", "PM", "EV"]
+
+MICROSECONDS_PER_DAY = 24 * 60 * 60 * 10 ** 6
+
+
+def map_half_hour(hours: pd.Series) -> pd.Series:
+    """ Map continuous hours of the day to ABM half hour periods. Hours can
+    wrap into the following day or multiple following days (>24) with no
+    upper limit. Times are rounded to the microsecond as done by
+    datetime.timedelta.
+
+    Args:
+        hours: Pandas Series of continuous hours of the day
+
+    Returns:
+        A Pandas Series of int8 ABM half hour periods (1-40) """
+    # time of day in microseconds after midnight
+    microseconds = np.rint(np.mod(hours.to_numpy(dtype="float64"), 24) * 60 * 60 * 10 ** 6)
+    microseconds = microseconds % MICROSECONDS_PER_DAY
+
+    idx = np.searchsorted(HALF_HOUR_STARTS * 60 * 10 ** 6, microseconds, side="right") - 1
+
+    return pd.Series(HALF_HOUR_PERIODS[idx], index=hours.index, dtype="int8")
+
+
+def map_five_tod(abm_half_hour: pd.Series, labels: bool = False) -> pd.Series:
+    """ Map ABM half hour periods to ABM five time of day periods.
+
+    Args:
+        abm_half_hour: Pandas Series of ABM half hour periods (1-40)
+        labels: Boolean indicating to return the ABM five time of day
+            period labels (EA, AM, MD, PM, EV) as an ordered categorical
+            in place of the period numbers (default False)
+
+    Returns:
+        A Pandas Series of float ABM five time of day periods (1-5), or of
+        the period labels, missing for values that are not ABM half hour
+        periods """
+    values = abm_half_hour.to_numpy(dtype="float64")
+
+    # values that are not ABM half hour periods map to missing
+    valid = (values >= 1) & (values <= 40) & (values == np.floor(values))
+    five_tod = np.full(len(values), np.nan)
+    five_tod[valid] = FIVE_TOD_PERIODS[values[valid].astype("int64")]
+
+    if labels:
+        codes = np.where(valid, np.nan_to_num(five_tod) - 1, -1).astype("int8")
+        return pd.Series(pd.Categorical.from_codes(codes, categories=FIVE_TOD_LABELS, ordered=True),
+                         index=abm_half_hour.index)
+    else:
+        return pd.Series(five_tod, index=abm_half_hour.index, dtype="float")
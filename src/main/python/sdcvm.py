@@ -6,14 +6,16 @@ Created on 2010-04-20
 
 
 # Python libraries
-import copy
 import csv
 import math
+import multiprocessing
+import os
 import random
 import time
-from array import array
 from optparse import OptionParser
 
+# External libraries
+import numpy as np
 
 # CSTDM libraries
 import sdcvm_settings as settings
@@ -26,115 +28,249 @@ class excelOne(csv.excel):
 
 
 
-def logitNestToLogsums(nestDict):
-
-    #print "Evaluating logit tree structure"
-    # Logit tree evaluation bit
+def compileNest(linkDict, altList):
+    #===========================================================================
+    # Compiles a nested logit tree into index arrays once, so that it can be
+    # evaluated for all zones at the same time by evaluateNest.
     #
-    # What this does is start with a dictionary where each key corresponds to a node on a
-    # nested logit tree, including the special code "top" which is the top of the tree
-    # and the values for utility for each of the alternatives at the bottom of the tree.
-    # When the dictionary starts out, the nest nodes should have a list of connections; 
-    # each connection is itself a list of [lower node, nest coefficient]. 
+    # linkDict is a nesting dictionary as read from the control files: each key is
+    # a nest node, including the special code "top" which is the top of the tree,
+    # and holds a list of connections; each connection is itself a list of
+    # [lower node, nest coefficient]. Lower nodes are either other nests or
+    # alternatives from altList.
     #
     # For instance, a classic mode choice nest would look like:
-    # nestDict = {'top': [ ['auto', 0.8], ['transit', 0.5], ['walk', 1.0] ]
+    # linkDict = {'top': [ ['auto', 0.8], ['transit', 0.5], ['walk', 1.0] ]
     #             'auto': [ ['sov', 1.0], ['hov', 0.75] ]
     #             'transit': [ ['bus', 0.2], ['lrt', 0.2] ]
-    #             'hov': [ ['hov 2', 0.6], ['hov 3', 0.6] ]
-    #             'walk': -4.2911
-    #             'sov': 1.0109
-    #             'hov 2': -1.201
-    #             'hov 3': -1.415
-    #             'bus': -3.504
-    #             'lrt': -2.879 }
+    #             'hov': [ ['hov 2', 0.6], ['hov 3', 0.6] ] }
+    # with altList = ['walk', 'sov', 'hov 2', 'hov 3', 'bus', 'lrt']
     #
-    # The loop then iterates through the keys of the dictionary (nodes).
-    #   - If the key contains only a float (e.g. 'walk' above), this is assumed to be the 
-    #     utility or logsum, and nothing more needs to be done.
-    #   - If the key contains any list elements (connections), the nodes they refer to will be checked;
-    #     if the node it refers to contains only a float (e.g. the ['bus', 0.2] connection
-    #     for the transit nest above, where 'bus' contains the float -3.504), then the nested utility
-    #     will be multiplied by the coefficient and replace the list element. (e.g. -3.504 * 0.2 = -.7008)
-    #     if the node it refers to contains a list (e.g. the ['hov', 0.75] connection above), nothing is done.  
-    #   - If the key contains all values as floats (not the case right now with the example above, but after
-    #     the first run through, the 'hov' and 'transit' nodes will be in this state), then the logsum is taken
-    #     of all of the floats, and this replaces the node value.
+    # Nodes are numbered with the alternatives first (in altList order) and then
+    # the nests in bottom-up order, so that each nest comes after all of the nodes
+    # below it. The value of a nest is the logsum of the values of its connections,
+    # each multiplied by its nest coefficient, so a coefficient of 1 needs to be
+    # specified if no other value is to be used.
     #
-    # After the first iteration, the mode choice nest would have:
-    # nestDict = {'top': [ ['auto', 0.8], ['transit', 0.5], -4.2911 ]
-    #             'auto': [ 1.0109, ['hov', 0.75] ]
-    #             'transit': [ -0.7008, -0.5758 ]
-    #             'hov': [ -0.7206, -0.849 ]
-    #             'walk': -4.2911
-    #             'sov': 1.0109
-    #             'hov 2': -1.201
-    #             'hov 3': -1.415
-    #             'bus': -3.504
-    #             'lrt': -2.879 }
+    # Returns a dictionary with:
+    #   "nodes": node names in evaluation order
+    #   "index": node name to position in "nodes"
+    #   "nests": [node, child positions, child coefficients] in bottom-up order
+    #   "top":   position of the top node
+    #===========================================================================
+
+    if linkDict.has_key("top") is False:
+        raise LookupError("Nesting structure has no top node")
+
+    nodes = list(altList)
+    index = {}
+    for n in range(len(nodes)):
+        index[nodes[n]] = n
+
+    # Order the nests so that each one follows the nests below it
+    nestOrder = []
+
+    def visit(node, path):
+        if node in nestOrder:
+            return
+        if node in path:
+            raise RuntimeError("Can't resolve nesting structure! Nest " + node + " contains itself.")
+        for subNode, coeff in linkDict[node]:
+            if linkDict.has_key(subNode):
+                visit(subNode, path + [node])
+            elif index.has_key(subNode) is False:
+                raise LookupError("Nest " + node + " refers to " + subNode + ", which is neither a nest nor an alternative")
+        nestOrder.append(node)
+
+    visit("top", [])
+
+    nests = []
+    for node in nestOrder:
+        index[node] = len(nodes)
+        nodes.append(node)
+        children = np.array([index[subNode] for subNode, coeff in linkDict[node]])
+        coeffs = np.array([float(coeff) for subNode, coeff in linkDict[node]])
+        nests.append([index[node], children, coeffs])
+
+    return {"nodes": nodes, "index": index, "nests": nests, "top": index["top"]}
+
+
+
+def evaluateNest(nest, utils):
+    #===========================================================================
+    # Evaluates a nest compiled by compileNest for all zones at once.
     #
-    # After the second iteration, the mode choice nest would have:
-    # nestDict = {'top': [ ['auto', 0.8], ['transit', 0.5], -4.2911 ]
-    #             'auto': [ 1.0109, ['hov', 0.75] ]
-    #             'transit': 0.0568
-    #             'hov': -0.0896
-    #             'walk': -4.2911
-    #             'sov': 1.0109
-    #             'hov 2': -1.201
-    #             'hov 3': -1.415
-    #             'bus': -3.504
-    #             'lrt': -2.879 }
+    # utils is an array of alternative utilities with one row per alternative (in
+    # the altList order the nest was compiled with) and one column per zone.
     #
-    #        
-    # In essence, what happens is that the utilities are passed up; when all of the utilities for a node 
-    # have been calculated, then the logsum is taken at that node. The nest coefficients are always multiplied
-    # so a value of 1 needs to be specified if no other value is to be used.
+    # Returns two arrays with one row per node in nest["nodes"] order:
+    #   values: utilities for alternatives and logsums for nests
+    #   probs:  marginal probability of each node, i.e. the probability of the node
+    #           conditional on its parent multiplied by its parent's marginal
+    #           probability, all the way down from the top of the tree.
     #
-    # Note that this, in the way it works, destroys the connection information, replacing it by logsums
-    # at the node location instead. So a copy (not a reference, which nestDict = keepDict would do) is needed
-    # if the connection information needs to be used again.
-    
-    x = 0
-    nodeList = nestDict.keys()
-    
-    # Do this until the top node has been resolved into a float
-    while isinstance(nestDict["top"], list) is True:
-        #print 40 * "."
-        for node in nodeList:
-            #print node, nestDict[node]
-            if isinstance(nestDict[node], float): # if it's already only a float, it's a utility or logsum; do nothing
-                pass
-            else: 
-                countFloat = 0
-                countSub = 0
-                
-                for sn in range(len(nestDict[node])):
-                    if isinstance(nestDict[node][sn], float):
-                        countFloat = countFloat + 1
-                    elif isinstance(nestDict[node][sn], list):
-                        subName = nestDict[node][sn][0]
-                        if isinstance(nestDict[subName], float): # if the value this refers to is a float
-                            #print "... ", node, subName, nestDict[subName],  nestDict[node][sn][1]
-                            nestDict[node][sn] = nestDict[subName] * nestDict[node][sn][1]
-
-                        countSub = countSub + 1
-                        
-                #print node, countFloat, countSub
-                if countFloat == len(nestDict[node]): # all the values are floats; take their logsum
-                    expsum = 0
-                    for element in nestDict[node]:
-                        expsum = expsum + math.exp(element)
-                    if expsum > 0:
-                        nestDict[node] = math.log(expsum)
-                    else:
-                        nestDict[node] = -99999.9               
-        
-        if x > 250: # Prevent nesting dictionary errors
-            print 250 * "!"
-            print nestDict
-            raise RuntimeError("Can't resolve nesting structure!")
-        x = x + 1
-    return nestDict
+    # Logsums are taken as max + log(sum(exp(x - max))) so that large utilities
+    # do not overflow.
+    #===========================================================================
+
+    nZones = utils.shape[1]
+    values = np.empty((len(nest["nodes"]), nZones))
+    values[:utils.shape[0]] = utils
+
+    # Pass the utilities up the tree
+    scaled = {}
+    for node, children, coeffs in nest["nests"]:
+        s = values[children] * coeffs[:, np.newaxis]
+        m = s.max(axis=0)
+        values[node] = m + np.log(np.exp(s - m).sum(axis=0))
+        scaled[node] = s
+
+    # Pass the probabilities down the tree
+    probs = np.zeros(values.shape)
+    probs[nest["top"]] = 1.0
+    for node, children, coeffs in reversed(nest["nests"]):
+        probs[children] = probs[node] * np.exp(scaled[node] - values[node])
+
+    return values, probs
+
+
+
+def readControlFile(fileName):
+    #===========================================================================
+    # Reads the tour generation models from a sector control file.
+    #
+    # Returns a dictionary of model name to {alternative: [(variable, coefficient), ...]}
+    # (a blank variable name is a constant) for ShipNoShip, GenPerEmployee, TourTOD and
+    # VehicleTourType, along with the nesting dictionaries for TourTOD and
+    # VehicleTourType (see compileNest) under "TourTOD_nest" and "VehicleTourType_nest".
+    #===========================================================================
+
+    fin = open(fileName, "r")
+    inFile = csv.reader(fin)
+
+    paramDict = {}
+    paramDict["ShipNoShip"] = {}
+    paramDict["GenPerEmployee"] = {}
+    paramDict["TourTOD"] ={}
+    paramDict["VehicleTourType"] = {}
+
+    paramDict["TourTOD_nest"] = {}
+    paramDict["VehicleTourType_nest"] = {}
+
+    for row in inFile:
+        model = row[0]
+        if paramDict.has_key(model):
+            alt = row[1]
+            type = row[2]
+            nest = row[3]
+            param = float(row[5])
+            if nest == "nest":
+                # put into nesting dictionary
+                if paramDict[model+"_nest"].has_key(type):
+                    pass
+                else:
+                    paramDict[model+"_nest"][type] = []
+
+                if param == 0:
+                    paramDict[model+"_nest"][type].append([alt, 1])
+                else:
+                    paramDict[model+"_nest"][type].append([alt, param])
+
+            else:
+                if paramDict[model].has_key(alt):
+                    pass
+                else:
+                    paramDict[model][alt] = []
+                parSet = (type, param)
+                paramDict[model][alt].append(parSet)
+    fin.close()
+    return paramDict
+
+
+
+def compileModels(paramDict, modelDict, zonals, cvmZonals):
+    #===========================================================================
+    # Compiles the utility specifications read by readControlFile into
+    # coefficient matrices, so that the utilities of all alternatives for all
+    # zones come from a single matrix product.
+    #
+    # modelDict is a dictionary of model name to the list of variables that model
+    # takes from other models (e.g. logsums) rather than from the zonal data.
+    #
+    # All of the zonal variables used by any of the models are put in one attribute
+    # matrix, with one row per zone and a first column of ones for the constants.
+    # Variables are taken from cvmZonals first, then zonals. Each model gets
+    #   "alts":      list of alternatives
+    #   "coef":      coefficients, one row per attribute column and one column per alternative
+    #   "extra":     list of variables from other models
+    #   "extraCoef": coefficients for the variables from other models
+    #
+    # Any variables that can't be found are reported together in one LookupError.
+    #
+    # Returns the attribute matrix and a dictionary of model name to compiled model.
+    #===========================================================================
+
+    varList = []
+    varIndex = {}
+    missing = []
+    for model in sorted(modelDict.keys()):
+        for alt in paramDict[model].keys():
+            for name, par in paramDict[model][alt]:
+                if name == '' or varIndex.has_key(name):
+                    continue
+                if cvmZonals.has_key(name) or zonals.has_key(name):
+                    varIndex[name] = len(varList) + 1
+                    varList.append(name)
+                elif modelDict[model].count(name) == 0 and missing.count((model, alt, name)) == 0:
+                    missing.append((model, alt, name))
+    if len(missing) > 0:
+        raise LookupError("Couldn't find values in zonal properties files: " +
+                          ", ".join([name + " (" + model + " " + alt + ")" for model, alt, name in missing]))
+
+    columns = []
+    for name in varList:
+        if cvmZonals.has_key(name):
+            columns.append(np.asarray(cvmZonals[name], dtype=np.float64))
+        else:
+            columns.append(np.asarray(zonals[name], dtype=np.float64))
+    nZones = len(zonals[zonals.keys()[0]])
+    attrs = np.column_stack([np.ones(nZones)] + columns)
+
+    compiled = {}
+    for model in modelDict.keys():
+        altList = paramDict[model].keys()
+        extra = modelDict[model]
+        coef = np.zeros((len(varList) + 1, len(altList)))
+        extraCoef = np.zeros((len(extra), len(altList)))
+        for a in range(len(altList)):
+            for name, par in paramDict[model][altList[a]]:
+                if name == '':
+                    coef[0, a] += par
+                elif varIndex.has_key(name):
+                    coef[varIndex[name], a] += par
+                else:
+                    extraCoef[extra.index(name), a] += par
+        compiled[model] = {"alts": altList, "coef": coef, "extra": extra, "extraCoef": extraCoef}
+
+    return attrs, compiled
+
+
+
+def modelUtilities(model, attrs, extra):
+    #===========================================================================
+    # Calculates the utilities of a model compiled by compileModels for all zones.
+    #
+    # extra is a dictionary of the model's variables from other models, each an
+    # array with one value per zone.
+    #
+    # Returns an array with one row per alternative (in model["alts"] order)
+    # and one column per zone.
+    #===========================================================================
+
+    utils = attrs.dot(model["coef"])
+    for e in range(len(model["extra"])):
+        utils += np.outer(extra[model["extra"][e]], model["extraCoef"][e])
+    return utils.T
 
 
 
@@ -200,109 +336,485 @@ def zonalProperties(fileName, tazList=None):
 
 
 
-def hdf5Skim(fromList, toList, fromZoneDict, toZoneDict, table, skimDict, skimList):
-    # Reads a skim matrix; the from are the rows and the to are the columns
-    # so skim references are skim[from][to].
-    # In the application of the CVM, the from and to are the same, so the matrix is
-    # symmetric (in that the 15th cell in the 4th row and 4th cell in 15th row refer
+class SkimSet(object):
+    #===========================================================================
+    # A set of named skims on one zone system.
+    #
+    # Each skim is one contiguous float32 2-D array; the from zones are the rows
+    # and the to zones are the columns, so skim references are skim[from][to].
+    # In the application of the CVM, the from and to are the same, so the matrix
+    # is square (in that the 15th cell in the 4th row and 4th cell in 15th row refer
     # to the same two zones; one-way roads and congestion means that they won't have
     # symmetrical costs)
+    #
+    # skims[name] gives the whole matrix, skims[name][i] a row view and
+    # skims.row(name, taz) the row for a zone number. Cells for zones that are not
+    # in the source are left at the fill value.
+    #===========================================================================
 
-    
-    # Create blank skims to hold all of the data
-    
-    for s in skimList:
-        skimDict[s] = []
-    for c in range(len(fromList)):
+    def __init__(self, tazList, fill=99999.9):
+        self.tazList = list(tazList)
+        self.tazDict = {}
+        for t in range(len(self.tazList)):
+            self.tazDict[self.tazList[t]] = t
+        self.fill = fill
+        self.skims = {}
+
+    def __getitem__(self, name):
+        return self.skims[name]
+
+    def __setitem__(self, name, matrix):
+        self.skims[name] = matrix
+
+    def has_key(self, name):
+        return self.skims.has_key(name)
+
+    def keys(self):
+        return self.skims.keys()
+
+    def row(self, name, taz):
+        return self.skims[name][self.tazDict[taz]]
+
+    def blank(self, name):
+        # Creates a skim filled with the fill value
+        skim = np.empty((len(self.tazList), len(self.tazList)), dtype=np.float32)
+        skim.fill(self.fill)
+        self.skims[name] = skim
+        return skim
+
+    def positions(self, zones):
+        # Positions in tazList of an array of zone numbers; -1 for zones not in tazList
+        lookup = np.empty(max(max(self.tazList), int(np.max(zones))) + 1, dtype=np.int64)
+        lookup.fill(-1)
+        lookup[self.tazList] = np.arange(len(self.tazList))
+        zones = np.asarray(zones, dtype=np.int64)
+        pos = np.empty(len(zones), dtype=np.int64)
+        pos.fill(-1)
+        valid = zones >= 0
+        pos[valid] = lookup[zones[valid]]
+        return pos
+
+    def place(self, name, matrix, zones):
+        # Stores a matrix whose rows and columns are the given zones. If the zones
+        # are the same as tazList the matrix is kept as it is (so a memory-mapped
+        # matrix stays memory-mapped); otherwise it is copied into a blank skim.
+        if np.array_equal(zones, self.tazList):
+            self.skims[name] = matrix
+            return
+        pos = self.positions(zones)
+        found = pos >= 0
+        skim = self.blank(name)
+        skim[np.ix_(pos[found], pos[found])] = matrix[np.ix_(found, found)]
+        print "Zones in skim differ from zonal properties;", len(self.tazList) - found.sum(), "zones not in skims."
+
+    def readNpy(self, name, skimFile, zoneFile):
+        # Reads a binary skim written by the Emme export_for_commercial_vehicle tool:
+        # a float32 NPY matrix plus an NPY file of the zone number of each row/column.
+        # The matrix is memory-mapped.
+        print skimFile
+        self.place(name, np.load(skimFile, mmap_mode="r"), np.load(zoneFile))
+
+    def readOmx(self, name, omxFile, matrixName, mapping="zone_number"):
+        # Reads one matrix from an OMX file in a single read, using the zone mapping
+        # if the file has one and zones 1 to n otherwise
+        import tables
+        print omxFile, matrixName
+        fin = tables.open_file(omxFile, "r")
+        try:
+            matrix = fin.get_node("/data", matrixName).read().astype(np.float32)
+            if "/lookup/" + mapping in fin:
+                zones = fin.get_node("/lookup", mapping).read()
+            else:
+                zones = np.arange(1, matrix.shape[0] + 1)
+        finally:
+            fin.close()
+        self.place(name, matrix, zones)
+
+    def readHdf5(self, skimList, table):
+        # Reads skims from a table with origin and destination columns and one column
+        # per skim, reading the whole table at once
+        data = table.read()
+        iPos = self.positions(data["origin"])
+        jPos = self.positions(data["destination"])
+        found = (iPos >= 0) & (jPos >= 0)
         for s in skimList:
-            row = len(toList) * [99999.9]
-            row = array('f', row)
-            skimDict[s].append(row)
-            
-    # Read in the table row by row
-    x = 0
-    for row in table.iterrows():
-        if fromZoneDict.has_key(row['origin']):
-            iTaz = fromZoneDict[row['origin']]
-            if toZoneDict.has_key(row['destination']):
-                jTaz = toZoneDict[row['destination']]
-                for s in skimList:
-                    try:
-                        skimDict[s][iTaz][jTaz] = row[s]
-                    except:
-                        print "Skim reading error!", iTaz, jTaz
-                    
-        x = x + 1
-        if x % 500000 == 0:
-            pass
-            print "    read", x/1000000.0, "million rows."
-            
-    return skimDict
+            skim = self.blank(s)
+            skim[iPos[found], jPos[found]] = data[s][found]
+        print "    read", len(data) / 1000000.0, "million rows."
 
+    def readCsv(self, name, skimFile):
+        # Reads a text skim in "row format", i.e. each row is the origin zone and then
+        # all destinations for that origin, in tazList order. Blank cells are read as 0.
+        print skimFile
+        skim = self.blank(name)
+        fin = open(skimFile, "r")
+        inFile = csv.reader(fin)
+        err = 0
+        for row in inFile:
+            if self.tazDict.has_key(int(row[0])): #Orig
+                err = err + row.count("")
+                values = np.array([v or "0" for v in row[1:len(self.tazList) + 1]], dtype=np.float32)
+                skim[self.tazDict[int(row[0])], :len(values)] = values
+        fin.close()
+        print "Replaced", err, "null values."
 
-def csvSkim(fromList, toList, fromZoneDict, toZoneDict, skimFile, skimDict, skimName):
-    # Reads a skim matrix; the from are the rows and the to are the columns
-    # so skim references are skim[from][to].
-    # In the application of the CVM, the from and to are the same, so the matrix is
-    # symmetric (in that the 15th cell in the 4th row and 4th cell in 15th row refer
-    # to the same two zones; one-way roads and congestion means that they won't have
-    # symmetrical costs)
-    # Uses TransCad GISDK output which is in "row format", i.e. each row is all destinations for a given origin.
+    def read(self, name, skimFile):
+        # Reads a skim in whichever format the Emme export wrote it. skimFile is the
+        # name of the legacy text skim; if a binary version of it (same name, .npy
+        # extension) and the zone index file are next to it, those are used instead.
+        binaryFile = os.path.splitext(skimFile)[0] + ".npy"
+        zoneFile = os.path.join(os.path.dirname(skimFile), "cvm_skim_zones.npy")
+        if os.path.exists(binaryFile) and os.path.exists(zoneFile):
+            self.readNpy(name, binaryFile, zoneFile)
+        else:
+            self.readCsv(name, skimFile)
 
-    
-    # Create blank skims to hold all of the data
-    print skimFile
-    skimDict[skimName] = []
-    for c in range(len(fromList)):
-        row = len(toList) * [99999.9]
-        row = array('f', row)
-        skimDict[skimName].append(row)
 
 
+def accessibilities(tazList, zonals, skims, accDict, blockSize=500):
+    #===========================================================================
+    # Calculates the accessibility terms for all zones at once, from the skims
+    # in a SkimSet.
+    #
+    # Each accessibility in accDict ([skim, property, lambda]) is
+    #     Acc[i] = sum over j of property[j] * exp(skim[i][j] * lambda)
+    # which is computed as exp(skim * lambda) dotted with the property vector.
+    # Accessibilities sharing a skim and lambda are done in the same product.
+    # LnJobs30 is the log of the total employment reachable within 30 minutes
+    # of midday time (0 if there is none).
+    #
+    # Rows are processed in blocks of blockSize origins so that the exponentiated
+    # skim never has to be held in memory in double precision all at once.
+    #
+    # Returns a dictionary of accessibility name to array in tazList order.
+    #===========================================================================
 
-    # Open skim file and read header
-    fin = open(skimFile, "r")
-    inFile = csv.reader(fin)
-#    header = inFile.next()
-#
-#    for i in range(len(skimList)): #Replace column names in skim list with index of same-named header
-#        try:
-#            skimList[i] = header.index(skimList[i])
-#        except ValueError:
-#            print "Skim name", skimList[i], "nots found in skim file", skimFile
-#            print "Header:", header
-#            raise ValueError
-
-    # Read in the table row by row
-    x = 0
-    err = 0
-    for row in inFile:
+    nZones = len(tazList)
+    accVals = {}
+
+    # Group the accessibility types by skim and lambda
+    groups = {}
+    for accType in accDict.keys():
+        skimType, prop, lam = accDict[accType]
+        if groups.has_key((skimType, lam)) is False:
+            groups[(skimType, lam)] = []
+        groups[(skimType, lam)].append(accType)
+
+    for (skimType, lam), accTypes in groups.items():
+        skim = skims[skimType]
+        attr = np.column_stack([np.asarray(zonals[accDict[accType][1]], dtype=np.float64)
+                                for accType in accTypes])
+        result = np.empty((nZones, len(accTypes)))
+        for i in range(0, nZones, blockSize):
+            result[i:i + blockSize] = np.exp(skim[i:i + blockSize].astype(np.float64) * lam).dot(attr)
+        for c in range(len(accTypes)):
+            accVals[accTypes[c]] = result[:, c]
+
+    # Log of jobs within 30 minutes
+    time30 = skims["Time_Mid"]
+    emp = np.asarray(zonals["TotEmp"], dtype=np.float64)
+    jobs30 = np.empty(nZones)
+    for i in range(0, nZones, blockSize):
+        jobs30[i:i + blockSize] = (time30[i:i + blockSize] < 30).dot(emp)
+    lnJobs30 = np.zeros(nZones)
+    lnJobs30[jobs30 > 0] = np.log(jobs30[jobs30 > 0])
+    accVals["LnJobs30"] = lnJobs30
+
+    return accVals
+
+
+
+
+def sectorBase(sector, inputs):
+    #===========================================================================
+    # Runs the parts of tour generation for one sector that don't depend on the
+    # land use type calibration constants, for all zones.
+    #
+    # inputs is a dictionary of the data shared by all sectors:
+    #   "path":      CVM input directory, holding the <sector>.csv control files
+    #   "zonals":    zonal properties dictionary
+    #   "cvmZonals": CVM derived zonal attributes (accessibilities etc.)
+    #   "modelDict": models and the variables each takes from other models
+    #
+    # Returns a dictionary of arrays by zone, which sectorTours turns into tours:
+    #   "Gen":        tours per employee utility, without its calibration constant
+    #   "Ship":       ship utility, without CUGen and its calibration constant
+    #   "NoShip":     no ship utility, without CUGen
+    #   "ShipCUGen":  CUGen coefficients for [Ship, NoShip]
+    #   "BaseEmp":    employment generating the tours
+    #   "TOD":        time of day probabilities, one row per settings.cvmTimes period
+    #===========================================================================
+
+    print "Calculating tour generation for sector", sector
+    zonals = inputs["zonals"]
+
+    # Read in control file for this sector and compile its models
+    paramDict = readControlFile(inputs["path"] + sector + ".csv")
+    attrs, models = compileModels(paramDict, inputs["modelDict"], zonals, inputs["cvmZonals"])
+    nZones = attrs.shape[0]
+    base = {}
+
+    # ===================================================================
+    # Phase One: Pass logsums up nested logit structure
+    # ===================================================================
+
+    # --------------------------------- Tour vehicle type / purpose nest
+    model = "VehicleTourType"
+    altList = models[model]["alts"]
+    utils = modelUtilities(models[model], attrs, {})
+    vehNest = compileNest(paramDict[model + "_nest"], altList)
+    vehValues, vehProbs = evaluateNest(vehNest, utils)
+    CUPurpVeh = vehValues[vehNest["top"]]
+
+    # ------------------------------------------------------ Time Of Day
+    model = "TourTOD"
+    altList = models[model]["alts"]
+    utils = modelUtilities(models[model], attrs, {"CUPurpVeh": CUPurpVeh})
+    todNest = compileNest(paramDict[model + "_nest"], altList)
+    todValues, todProbs = evaluateNest(todNest, utils)
+    CUTimeOD = todValues[todNest["top"]]
+
+    # Marginal time of day probabilities
+    base["TOD"] = np.zeros((len(settings.cvmTimes), nZones))
+    for t in range(len(settings.cvmTimes)):
+        timePer = settings.cvmTimes[t]
+        if todNest["index"].has_key(timePer):
+            base["TOD"][t] = todProbs[todNest["index"][timePer]]
+        else:
+            print "Error in scaling tours: no time period", timePer, "in TourTOD nest for", sector
+
+    # ----------------------------------------------- Trips per employee
+    model = "GenPerEmployee"
+    altList = models[model]["alts"]
+    utils = modelUtilities(models[model], attrs, {"CUTimeOD": CUTimeOD})
+    base["Gen"] = utils[altList.index("Gen")]
+
+    # ---------------------------------------------------- Ship / No Ship
+    # CUGen depends on the generation constant, so it is added in sectorTours
+    model = "ShipNoShip"
+    altList = models[model]["alts"]
+    utils = modelUtilities(models[model], attrs, {"CUGen": np.zeros(nZones)})
+    base["Ship"] = utils[altList.index("Ship")]
+    base["NoShip"] = utils[altList.index("NoShip")]
+    cuGen = models[model]["extraCoef"][models[model]["extra"].index("CUGen")]
+    base["ShipCUGen"] = [cuGen[altList.index("Ship")], cuGen[altList.index("NoShip")]]
+
+    # Get base employment (total employment for fleet allocators)
+    if sector == "FA":
+        base["BaseEmp"] = np.asarray(zonals["TotEmp"], dtype=np.float64)
+    else:
+        base["BaseEmp"] = np.asarray(zonals["CVM_"+sector], dtype=np.float64)
+
+    return base
 
-        if fromZoneDict.has_key(int(row[0])): #Orig
-            iTaz = fromZoneDict[int(row[0])]
-#            if skimName == "Time_Mid":
 
-            while row.count("") > 0:
-                row[row.index("")] = "0"
-                err = err + 1
-            floatrow = map(float, row[1:])
-            skimDict[skimName][iTaz] = array("f", floatrow)
 
-#            else:
-#                for jTaz in toList:
-#                    if skimName == "Light_Mid":
-#                        skimDict[skimName][iTaz][jTaz-1] = float(row[jTaz])
-#                    else:
-#                        skimDict[skimName][iTaz][jTaz-1] = float(row[jTaz]) *  -0.3
-                
-            x = x + 1
-            if x % 500 == 0:
-                pass
-                print "      read", x, "rows."
-    print "Replaced", err, "null values."       
-    return skimDict
+def sectorTours(base, lu, adj, calib):
+    #===========================================================================
+    # Applies the land use type calibration constants to the results of
+    # sectorBase for one sector.
+    #
+    # lu is the land use type index of each zone, adj the sector's calibration
+    # constants [ship/no ship, generation][land use type] and calib its tour
+    # generation scale factors by land use type.
+    #
+    # Returns a dictionary of arrays by zone: "Ship" (proportion shipping),
+    # "ToursEmp" (tours per employee), "ToursAllDay" and the unscaled tours for
+    # each of the settings.cvmTimes time periods.
+    #===========================================================================
+
+    result = {}
+
+    # Calibration Adjustments; form: xn, xn-1, fn, fn-1
+    genUtil = base["Gen"] + np.array(adj[1])[lu]
+    CUGen = np.logaddexp(genUtil, 0) # 0 is utility for no tours
+
+    uShip = base["Ship"] + base["ShipCUGen"][0] * CUGen + np.array(adj[0])[lu]
+    uNoShip = base["NoShip"] + base["ShipCUGen"][1] * CUGen
+
+    # ===================================================================
+    # Phase The Second: Calculate tours by time period
+    # ===================================================================
+
+    # Ship/No Ship proportions
+    propShip = 1.0 / (1.0 + np.exp(uNoShip - uShip))
+    shipEmp = base["BaseEmp"] * propShip
+    result["Ship"] = propShip
+
+    # Generation: tours per employee
+    toursPerEmp = 10.0 / (1.0 + np.exp(-genUtil))
+    toursAllDay = shipEmp * toursPerEmp
+
+    # Scale for SANDAG behaviours
+    toursAllDay = toursAllDay * np.array(calib)[lu]
+    result["ToursEmp"] = toursPerEmp
+    result["ToursAllDay"] = toursAllDay
+
+    # Divide into time periods using the marginal time of day probabilities
+    for t in range(len(settings.cvmTimes)):
+        result[settings.cvmTimes[t]] = base["TOD"][t] * toursAllDay
+
+    return result
+
+
+
+def calibrationScores(base, result, lu, ranges, adj):
+    #===========================================================================
+    # Compares the ship/no ship proportions and tours per employee of one sector
+    # to their target ranges, and works out new calibration constants.
+    #
+    # ranges is [[low, high] proportion shipping, [low, high] tours per employee].
+    # For each model and land use type, zones with employment are counted as
+    # below, within or above the range, and the employment weighted average is
+    # compared with the range. If the average is outside the range, the constant
+    # is moved by the difference in log odds between the average and the nearest
+    # end of the range (tours per employee are a share of the maximum of 10).
+    #
+    # Returns the rows for the calibration report, as
+    #   [model, land use type, below, within, above, score, average, param, tours]
+    # and the new constants in the same form as adj.
+    #===========================================================================
+
+    def logit(p):
+        p = min(max(p, 1e-10), 1 - 1e-10)
+        return math.log(p / (1.0 - p))
+
+    rows = []
+    newAdj = [list(adj[0]), list(adj[1])]
+    models = [["ShipNoShip", result["Ship"], base["BaseEmp"], 1.0],
+              ["GenPerEmployee", result["ToursEmp"], base["BaseEmp"] * result["Ship"], 10.0]]
+
+    for m in range(len(models)):
+        model, value, weight, maxValue = models[m]
+        low, high = ranges[m]
+        for luType in range(len(adj[m])):
+            inType = (lu == luType) & (base["BaseEmp"] > 0)
+            below = int((value[inType] < low).sum())
+            above = int((value[inType] > high).sum())
+            within = int(inType.sum()) - below - above
+            if inType.sum() > 0:
+                score = within / float(inType.sum())
+            else:
+                score = ""
+
+            if weight[inType].sum() > 0:
+                average = (value[inType] * weight[inType]).sum() / weight[inType].sum()
+                target = min(max(average, low), high)
+                if target != average:
+                    newAdj[m][luType] = adj[m][luType] + logit(target / maxValue) - logit(average / maxValue)
+            else:
+                average = ""
+
+            tours = result["ToursAllDay"][lu == luType].sum()
+            rows.append([model, luType + 1, below, within, above, score, average, adj[m][luType], tours])
+
+    return rows, newAdj
+
+
+
+# Sector inputs for worker processes, set once per process by initSectorWorker
+_workerInputs = None
+
+def initSectorWorker(inputs):
+    # Process pool initializer: keeps the shared sector inputs in the worker. With
+    # fork the data is inherited from the parent; otherwise it is sent once per
+    # worker rather than once per sector.
+    global _workerInputs
+    _workerInputs = inputs
+
+
+def runSectorWorker(sector):
+    return sectorBase(sector, _workerInputs)
+
+
+
+def writeAccessTrace(fileName, traceZones, tazList, zonals, skims, accDict):
+    # Writes the individual origin-destination terms of each accessibility for the
+    # trace zones (as origins), i.e. the cost, attraction and attr * exp(cost * lambda)
+    # for each destination. Zones not in tazList are skipped.
+    tazDict = {}
+    for t in range(len(tazList)):
+        tazDict[tazList[t]] = t
+    accList = accDict.keys()
+
+    fout = open(fileName, "w")
+    outFile = csv.writer(fout, excelOne)
+    outFile.writerow(["I", "J", "AccType", "Cost", "Attr", "AccVal"])
+    for iTaz in traceZones:
+        if tazDict.has_key(iTaz) is False:
+            print "Trace zone", iTaz, "is not in the zonal properties file"
+            continue
+        columns = []
+        for accType in accList:
+            skimType, prop, lam = accDict[accType]
+            cost = skims[skimType][tazDict[iTaz]].astype(np.float64)
+            attr = np.asarray(zonals[prop], dtype=np.float64)
+            columns.append([cost.tolist(), attr.tolist(), (attr * np.exp(cost * lam)).tolist()])
+        for jIdx in range(len(tazList)):
+            for a in range(len(accList)):
+                cost, attr, accVal = columns[a]
+                outFile.writerow([iTaz, tazList[jIdx], accList[a], cost[jIdx], attr[jIdx], accVal[jIdx]])
+    fout.close()
+
+
+
+def writeToursAccess(fileName, tazList, cvmZonals, sidecar=None):
+    #===========================================================================
+    # Writes the CVM tours and accessibility file, one row per zone in tazList
+    # and one column per cvmZonals key in sorted order, in a single bulk write.
+    # Integer columns are written as integers and the rest as the shortest text
+    # that reads back to the same double.
+    #
+    # sidecar can be "feather" or "parquet" to also write the same table in that
+    # format next to the CSV (same name, different extension); this needs pandas
+    # (and pyarrow), and is skipped with a message if they can't be imported.
+    #===========================================================================
+
+    keyList = cvmZonals.keys()
+    keyList.sort()
+    header = ["Taz"] + keyList
+
+    table = np.column_stack([np.asarray(tazList, dtype=np.float64)] +
+                            [np.asarray(cvmZonals[key], dtype=np.float64) for key in keyList])
+    fmt = ["%d"]
+    for key in keyList:
+        if np.asarray(cvmZonals[key]).dtype.kind in "iub":
+            fmt.append("%d")
+        else:
+            fmt.append("%r")
+    np.savetxt(fileName, table, fmt=fmt, delimiter=",", newline="\n",
+               header=",".join(header), comments="")
+
+    if sidecar is not None:
+        try:
+            import pandas as pd
+            frame = pd.DataFrame(dict([(key, cvmZonals[key]) for key in keyList]), columns=keyList)
+            frame.insert(0, "Taz", np.asarray(tazList, dtype=np.int32))
+            if sidecar == "feather":
+                frame.to_feather(os.path.splitext(fileName)[0] + ".feather")
+            else:
+                frame.to_parquet(os.path.splitext(fileName)[0] + ".parquet")
+        except ImportError, e:
+            print "Couldn't write", sidecar, "copy of", fileName, "-", e
+
 
 
+def readToursAccess(fileName):
+    # Reads a CVM tours and accessibility file back into tazList and a cvmZonals style
+    # dictionary of arrays, from its feather or parquet copy if there is an up to date one
+    base = os.path.splitext(fileName)[0]
+    for ext in [".feather", ".parquet"]:
+        if os.path.exists(base + ext) and os.path.getmtime(base + ext) >= os.path.getmtime(fileName):
+            import pandas as pd
+            if ext == ".feather":
+                frame = pd.read_feather(base + ext)
+            else:
+                frame = pd.read_parquet(base + ext)
+            return frame["Taz"].tolist(), dict([(key, frame[key].values) for key in frame.columns if key != "Taz"])
+
+    table = np.genfromtxt(fileName, delimiter=",", names=True)
+    return table["Taz"].astype(int).tolist(), dict([(key, table[key]) for key in table.dtype.names if key != "Taz"])
+
 
 
 def bigrun():
@@ -313,11 +825,25 @@ def bigrun():
     # ===============================================================================
     parser = OptionParser()
     parser.add_option("-s", "--scale",
-                      action="store", dest="scale", default=1.0,
-                      help="scale factor for multiple runs")
+                      action="store", dest="scale", default="1.0",
+                      help="scale factor for multiple runs; a comma-separated list of scale "
+                           "factors writes one CVMToursAccess_<scale>.csv for each")
     parser.add_option("-p", "--path",
                       action="store", dest="path",
                       help="project scenario path")
+    parser.add_option("-w", "--workers",
+                      action="store", dest="workers", type="int", default=1,
+                      help="number of processes to run the sectors on")
+    parser.add_option("-c", "--calibrate",
+                      action="store", dest="calibrate", type="int", default=0,
+                      help="number of calibration iterations for the land use type constants")
+    parser.add_option("-t", "--trace",
+                      action="store", dest="trace",
+                      help="comma-separated list of zones to write accessibility traces for "
+                           "(overrides the trace settings in sdcvm_settings)")
+    parser.add_option("-b", "--binary",
+                      action="store", dest="sidecar", choices=["feather", "parquet"],
+                      help="also write CVMToursAccess in feather or parquet format")
     (options, args) = parser.parse_args()
     # ===============================================================================
     # Input File Names
@@ -343,17 +869,22 @@ def bigrun():
 #                scale = float(row[s+1:])
 #                scaleName = row
 
-    scale = float(options.scale)
+    scaleList = [float(s) for s in str(options.scale).split(",")]
+    workers = options.workers
+    calibIters = options.calibrate
     print 40*"-"
-    print "Scaling tour gen with scale factor", scale
+    print "Scaling tour gen with scale factor(s)", ", ".join([str(s) for s in scaleList])
     print 40*"-"
     print
 
 
-    testZones = [1578, 88, 971, 2178, 3798, 2711, 4286]
-    fout = open("AccessVals.csv", "w")
-    outFileTest = csv.writer(fout, excelOne)
-    outFileTest.writerow(["I", "J", "AccType", "Cost", "Attr", "AccVal"])
+    # Zones to trace
+    if options.trace is not None:
+        traceZones = [int(z) for z in options.trace.split(",") if z != ""]
+    elif settings.cvmTraceOn:
+        traceZones = settings.cvmTraceZones
+    else:
+        traceZones = []
 
 
     # ===============================================================================
@@ -361,6 +892,7 @@ def bigrun():
     # ===============================================================================
     # Read in zonal properties file
     tazList, zonals = zonalProperties(fileName=cvmZonalProperties)
+    nZones = len(tazList)
     tazDict = {}
     #tazList = tazList[:25]
     for t in range(len(tazList)):
@@ -369,116 +901,64 @@ def bigrun():
     # Calculate accessibilities
     print "Calculating accessibilities", round(time.clock(), 2)
     
-    cvmZonals = {} # This is a zonal properties style dictionary, indexed by thing and containing a list in order of properties
+    # This is a zonal properties style dictionary, indexed by thing and containing
+    # a typed array of values in tazList order
+    cvmZonals = {}
     accDict = settings.cvmAccDict # Dictionary for creating accessibilities; [skim, property, lambda] 
     accList = accDict.keys()
     
     
     skimList = []
     for accType in accList:
-        cvmZonals[accType] = []
         if skimList.count(accDict[accType][0]) == 0:
             skimList.append(accDict[accType][0])
-    cvmZonals["LnJobs30"] = []
-    cvmZonals["REZone"] = []
-    
+
+    totEmp = np.asarray(zonals["TotEmp"], dtype=np.float64)
+
     # Calculate percentage employment by industry; binary over 3000 flag
     sectors = ["SV", "IN", "RE", "TH", "WH", "GO"]
     for sect in sectors:
-        cvmZonals["Pct" + sect] = []
-        cvmZonals["Over3K_" + sect] = []
-    for taz in tazList:
-        idx = tazDict[taz]
-        for sect in sectors:
-            cvmZonals["Pct" + sect].append(zonals["CVM_" + sect][idx] / (zonals["TotEmp"][idx] + 0.0001))
-            if zonals["CVM_" + sect][idx] > 3000:
-                cvmZonals["Over3K_" + sect].append(1)
-            else:
-                cvmZonals["Over3K_" + sect].append(0)
-        if cvmZonals["PctRE"][idx] > 0.5:
-            cvmZonals["REZone"].append(1)
-        else:
-            cvmZonals["REZone"].append(0)    
-    
+        sectEmp = np.asarray(zonals["CVM_" + sect], dtype=np.float64)
+        cvmZonals["Pct" + sect] = sectEmp / (totEmp + 0.0001)
+        cvmZonals["Over3K_" + sect] = (sectEmp > 3000).astype(np.int32)
+    cvmZonals["REZone"] = (cvmZonals["PctRE"] > 0.5).astype(np.int32)
+
     # Calculate employment and population density and cap if necessary
-    cvmZonals["PopDensCap"] = []
-    cvmZonals["EmpDensCap"] = []
-    for taz in tazList:
-        idx = tazDict[taz]
-        pop = zonals["Pop"][idx]
-        emp = zonals["TotEmp"][idx]
-        area = zonals["Area_SqMi"][idx]
-        if area > 0:
-            cvmZonals["PopDensCap"].append(min(pop/area, 50000))
-            cvmZonals["EmpDensCap"].append(min(emp/area, 100000))
-        else:
-            cvmZonals["PopDensCap"].append(0)
-            cvmZonals["EmpDensCap"].append(0)
-            
+    pop = np.asarray(zonals["Pop"], dtype=np.float64)
+    area = np.asarray(zonals["Area_SqMi"], dtype=np.float64)
+    hasArea = area > 0
+    cvmZonals["PopDensCap"] = np.zeros(nZones)
+    cvmZonals["EmpDensCap"] = np.zeros(nZones)
+    cvmZonals["PopDensCap"][hasArea] = np.minimum(pop[hasArea] / area[hasArea], 50000)
+    cvmZonals["EmpDensCap"][hasArea] = np.minimum(totEmp[hasArea] / area[hasArea], 100000)
+
 
     # Read in skims
  
     print "Reading in CVM skims. Time:", round(time.clock()-ts, 2)    
-    skimDict = {}
+    skims = SkimSet(tazList)
 
     for skimName in skimFileDict.keys():
         print "...", skimName,  round(time.clock()-ts, 2) 
         skimList.append(skimName)
-        skimDict = csvSkim(tazList, tazList, tazDict, tazDict,
-                           skimFileDict[skimName][0], skimDict, skimName)
+        skims.read(skimName, skimFileDict[skimName][0])
 
-    print skimDict.keys()
+    print skims.keys()
     print len(tazDict.keys())
     print len(tazList)
     #print tazDict
     
     print "Skims read in. Time:", round(time.clock()-ts, 2)
-    idx = 0
-    for iTaz in tazList:
-        currAcc = len(accList) * [0]
-        jobs30 = 0
-#        maxCost = [999999, -1, -1]
-        for jTaz in tazList:
-            iIdx = tazDict[iTaz]
-            jIdx = tazDict[jTaz]
-            for accType in accList:
-                skimType = accDict[accType][0]
-                try:
-                    cost = skimDict[skimType][iIdx][jIdx]
-                except:
-                    print skimType, iTaz, jTaz, iIdx, jIdx
-                    print len(skimDict[skimType])
-                    print len(skimDict[skimType][0])
-                    crash
-#                if accType == "Acc_LE" and cost < maxCost[0]:
-#                    maxCost[0] = cost
-#                    maxCost[1] = jTaz
-#                    maxCost[2] = jIdx
-                attr = zonals[accDict[accType][1]][jIdx]
-                lam = accDict[accType][2]
-                accVal = attr * math.exp(cost * lam)
-                #print accType, accList
-                currAcc[accList.index(accType)] = currAcc[accList.index(accType)] + accVal
-                if testZones.count(iTaz) > 0:
-                    outFileTest.writerow([iTaz, jTaz, accType, cost, attr, accVal])
-
-                
-            cost = skimDict["Time_Mid"][iIdx][jIdx]
-            if cost < 30:
-                jobs30 = jobs30 +  zonals["TotEmp"][jIdx]        
-    
-            if idx % 250000 == 0:
-                print "Processed", idx, "OD pairs, most recently", iTaz, jTaz, round(time.clock()-ts,2)
-    
-            idx = idx + 1
-#        if idx < 2000000:
-#            print iTaz, iIdx, maxCost
-        for c in range(len(accList)):
-            cvmZonals[accList[c]].append(currAcc[c])
-        if jobs30 > 0:
-            cvmZonals["LnJobs30"].append(math.log(jobs30))
-        else:
-            cvmZonals["LnJobs30"].append(0)
+    accVals = accessibilities(tazList, zonals, skims, accDict)
+    for accType in accList:
+        cvmZonals[accType] = accVals[accType]
+    cvmZonals["LnJobs30"] = accVals["LnJobs30"]
+    print "Accessibilities calculated. Time:", round(time.clock()-ts, 2)
+
+    # Write out the individual OD terms for the trace zones
+    if traceZones:
+        print "Writing accessibility trace for zones", traceZones
+        writeAccessTrace(settings.cvmTraceFile, traceZones, tazList, zonals, skims, accDict)
 
     
     # First set is ship/no ship, second set is tours/emp
@@ -502,339 +982,99 @@ def bigrun():
     # Scale to match proportions for SANDAG
     adjSandagDict = settings.genCalibDict
 
+    # Tour generation models, with the variables each one takes from the models before it
+    modelDict = {"VehicleTourType": [],
+                 "TourTOD": ["CUPurpVeh"],
+                 "GenPerEmployee": ["CUTimeOD"],
+                 "ShipNoShip": ["CUGen"]}
 
 
-#    cout = open("e:/sjvitm_sdcvm_calibration.csv", "w")
-#    calibOut = csv.writer(cout, excelOne)
-#    calibOut.writerow(['Sector', 'Model', 'Iteration', 'Below', 'Within', 'Above', 'Score', 'Average', 'Param', 'Tours'])
-    
-    for iter in range(1):
-        print 15 * "-", "Iteration", iter, 15 * "-" 
-    
-        # ===========================================================================
-        # Big loop: iterate through each industry and create generation
-        # ===========================================================================
+
+    # Land use type of each zone, for the calibration adjustments
+    lu = np.array([int(round(float(luType))) - 1 for luType in zonals["CVM_LU_Type"]])
+
+    # Inputs shared by all of the sectors; once the accessibilities are known the
+    # sectors are independent of each other, so they can be run in any order.
+    sectorInputs = {"path": cvmInputPath,
+                    "zonals": zonals,
+                    "cvmZonals": dict(cvmZonals),
+                    "modelDict": modelDict}
+
+    # ===========================================================================
+    # Big loop: create generation for each industry
+    # ===========================================================================
+    if workers > 1:
+        print "Running", len(settings.cvmSectors), "sectors on", workers, "processes", round(time.clock()-ts, 2)
+        pool = multiprocessing.Pool(min(workers, len(settings.cvmSectors)), initSectorWorker, (sectorInputs,))
+        bases = pool.map(runSectorWorker, settings.cvmSectors)
+        pool.close()
+        pool.join()
+    else:
+        bases = []
         for sector in settings.cvmSectors:
-            print "Calculating tour generation for sector", sector, round(time.clock()-ts, 2)
-            # Read in control file for this sector
-            fin = open(cvmInputPath + sector + ".csv", "r")
-            inFile = csv.reader(fin)
-            
-            paramDict = {}
-            paramDict["ShipNoShip"] = {}
-            paramDict["GenPerEmployee"] = {}
-            paramDict["TourTOD"] ={}
-            paramDict["VehicleTourType"] = {}
-    
-            paramDict["TourTOD_nest"] = {}
-            paramDict["VehicleTourType_nest"] = {}
-            
-            for row in inFile:
-                model = row[0]
-                if paramDict.has_key(model):
-                    alt = row[1]
-                    type = row[2]
-                    nest = row[3]
-                    param = float(row[5])
-                    if nest == "nest":
-                        # put into nesting dictionary
-                        if paramDict[model+"_nest"].has_key(type):
-                            pass
-                        else:
-                            paramDict[model+"_nest"][type] = []
-                            
-                        if param == 0:
-                            paramDict[model+"_nest"][type].append([alt, 1])
-                        else:
-                            paramDict[model+"_nest"][type].append([alt, param])
-                        
-                    else:
-                        if paramDict[model].has_key(alt):
-                            pass
-                        else:
-                            paramDict[model][alt] = []
-                        parSet = (type, param)
-                        paramDict[model][alt].append(parSet)
-    
-            #print paramDict
-            
-            # add to CVM zonals file / clear out values
-            for timePer in settings.cvmTimes:
-                cvmZonals[sector + "_" + timePer] = []
-            cvmZonals[sector + "_Ship"] = []
-            cvmZonals[sector + "_ToursEmp"] = []
-                 
-        
-            # Medium loop: iterate through each TAZ
-            for tazNum in tazList:
-                taz = tazDict[tazNum]
-                lu = int(round(float(zonals["CVM_LU_Type"][taz])))-1
-                
-                # ===================================================================
-                # Phase One: Pass logsums up nested logit structure
-                # ===================================================================
-             
-                # --------------------------------- Tour vehicle type / purpose nest
-                
-                model = "VehicleTourType"
-                #print "Processing:", model, round(time.clock(), 2)
-               
-                altList = paramDict[model].keys()
-                utilDict = {}
-                
-                # Begin by calculating the utilities for each alternative
-                for alt in altList:
-                    util = 0
-                    for name, par in paramDict[model][alt]:
-                        if name == '':
-                            util = util + par
-                            val = "const"
-                        else:
-                            if cvmZonals.has_key(name):
-                                util = util + cvmZonals[name][taz] * par
-                                val = cvmZonals[name][taz]
-                            elif zonals.has_key(name):
-                                util = util + zonals[name][taz] * par
-                                val = zonals[name][taz]
-                            else:
-                                raise LookupError("Couldn't find value " + name + " in zonal properties files, for alternative " + alt)
-                        utilDict[alt] = util
-#                        if tazNum < 20:
-#                            print alt, util, name, par, val
-#                    if tazNum < 20:
-#                        print 20 * "-"
-                    
-                # Add the parameters to the nested model and pass it to the logsumerizer
-                modNest = "VehicleTourType_nest"
-    
-                for alt in altList:
-                    paramDict[modNest][alt] = utilDict[alt]
-    
-                nestDict = copy.deepcopy(paramDict[modNest])
-                #print taz, nestDict
-                vehAndPurpNest = logitNestToLogsums(nestDict)
-                CUPurpVeh = vehAndPurpNest["top"]
-                #print CUPurpVeh
-                        
-            
-                # ------------------------------------------------------ Time Of Day
-                model = "TourTOD"
-                #print "Processing:", model, round(time.clock(), 2)
-               
-                altList = paramDict[model].keys()
-                utilDict = {}
-                
-                # Begin by calculating the utilities for each alternative
-                for alt in altList:
-                    util = 0
-                    for name, par in paramDict[model][alt]:
-                        if name == '':
-                            util = util + par
-                            val = "const"
-                        else:
-                            if cvmZonals.has_key(name):
-                                util = util + cvmZonals[name][taz] * par
-                                val = cvmZonals[name][taz]
-                            elif zonals.has_key(name):
-                                util = util + zonals[name][taz] * par
-                                val = zonals[name][taz]
-                            elif name == "CUPurpVeh":
-                                util = util + CUPurpVeh * par
-                                val = CUPurpVeh
-                            else:
-                                raise LookupError("Couldn't find value " + name + " in zonal properties files, for alternative " + alt)
-                        utilDict[alt] = util
-                        #print alt, util, name, par, val
-                    #print 20 * "-"
-                    
-                # Add the parameters to the nested model and pass it to the logsumerizer
-                modNest = "TourTOD_nest"
-    
-                for alt in altList:
-                    paramDict[modNest][alt] = utilDict[alt]
-    
-                nestDict = copy.deepcopy(paramDict[modNest])
-                #print nestDict
-                tourTODNest = logitNestToLogsums(nestDict)
-                CUTimeOD = tourTODNest["top"]
-                #print tourTODNest
-                #print CUTimeOD
-            
-            
-                # ----------------------------------------------- Trips per employee
-                model = "GenPerEmployee"
-                #print "Processing:", model, round(time.clock(), 2)
-               
-                altList = paramDict[model].keys()
-                utilDict = {}
-                # Begin by calculating the utilities for each alternative
-                for alt in altList:
-                    util = 0
-                    for name, par in paramDict[model][alt]:
-                        if name == '':
-                            util = util + par
-                            val = "const"
-                        else:
-                            if cvmZonals.has_key(name):
-                                util = util + cvmZonals[name][taz] * par
-                                val = cvmZonals[name][taz]
-                            elif zonals.has_key(name):
-                                util = util + zonals[name][taz] * par
-                                val = zonals[name][taz]
-                            elif name == "CUTimeOD":
-                                util = util + CUTimeOD * par
-                                val = CUTimeOD
-                            else:
-                                raise LookupError("Couldn't find value " + name + " in zonal properties files, for alternative " + alt)
-                        utilDict[alt] = util
-                        #print alt, util, name, par, val
-                    #print 20 * "-"
-                    
-                # Calibration Adjustments; form: xn, xn-1, fn, fn-1
-                utilDict["Gen"] = utilDict["Gen"] + adjDict[sector][1][lu]
-                                 
-                genUtil = utilDict["Gen"]
-                CUGen = math.log(math.exp(genUtil) + math.exp(0)) # 0 is utility for no tours
-        
-                # ---------------------------------------------------- Ship / No Ship
-                model = "ShipNoShip"
-                #print "Processing:", model, round(time.clock(), 2)
-               
-                altList = paramDict[model].keys()
-                utilDict = {}
-                
-                # Begin by calculating the utilities for each alternative
-                for alt in altList:
-                    util = 0
-                    for name, par in paramDict[model][alt]:
-                        if name == '':
-                            util = util + par
-                            val = "const"
-                        else:
-                            if cvmZonals.has_key(name):
-                                util = util + cvmZonals[name][taz] * par
-                                val = cvmZonals[name][taz]
-                            elif zonals.has_key(name):
-                                util = util + zonals[name][taz] * par
-                                val = zonals[name][taz]
-                            elif name == "CUGen":
-                                util = util + CUGen * par
-                                val = CUGen
-                            else:
-                                raise LookupError("Couldn't find value " + name + " in zonal properties files, for alternative " + alt)
-                        utilDict[alt] = util
-                        #print alt, util, name, par, val
-                # Calibration Adjustments; form: xn, xn-1, fn, fn-1
-                utilDict["Ship"] = utilDict["Ship"] + adjDict[sector][0][lu]
-
-
-                # ===================================================================
-                # Phase The Second: Calculate tours by time period
-                # ===================================================================
-    
-                # Get base employment (total employment for fleet allocators)
-                if sector == "FA":
-                    baseEmp = zonals["TotEmp"][taz]
-                else:
-                    baseEmp = zonals["CVM_"+sector][taz]
-                
-                #print "Base Employment:", baseEmp
-                
-                # Ship/No Ship proportions
-                
-                uShip = utilDict["Ship"]
-                uNoShip = utilDict["NoShip"]
-                
-                propShip = math.exp(uShip) / (math.exp(uShip) + math.exp(uNoShip))
-                
-                shipEmp = baseEmp * propShip
-                
-#                tempOut.writerow([sector, tazList[taz], 'ShipNoShip', 'PropShip', propShip])
-                cvmZonals[sector + "_Ship"].append(propShip)
-                #print "Shipping employees:", shipEmp, propShip
-                
-                # Generation: tours per employee
-                toursPerEmp = (10 * math.exp(genUtil)) / (1 + math.exp(genUtil))
-                toursAllDay = shipEmp * toursPerEmp
-
-                # Scale for SANDAG behaviours
-                toursAllDay = toursAllDay * adjSandagDict[sector][lu]
-                
-                
-                #print "Tours per employee:", toursPerEmp, toursAllDay
-#                tempOut.writerow([sector, tazList[taz], 'Generation', 'ToursPerEmp', toursPerEmp])
-                cvmZonals[sector + "_ToursEmp"].append(toursPerEmp)
-                
-                # Time period: calculate probabilities of time period
-                linkDict = paramDict["TourTOD_nest"]
-                utilDict = tourTODNest
-                
-                #print linkDict
-                #print utilDict
-    
-                #print 20 * "-"
-                probDict = {}
-                
-                # First calculate probabilities for each node with subnodes
-                for node in linkDict.keys():
-                    if isinstance(linkDict[node], float):
-                        pass
-                    else:
-                        #print node
-                        expSum = 0
-                        for subNode in linkDict[node]:
-                            expSum = expSum + math.exp(utilDict[subNode[0]] * subNode[1])
-                            #print subNode[0], utilDict[subNode[0]], subNode[1], expSum
-                        
-                        for subNode in linkDict[node]:
-                            probDict[subNode[0]] = math.exp(utilDict[subNode[0]] * subNode[1]) / expSum
-                #print probDict
-                
-                # Now go down from top node and scale probabilities of any subnests by the nest prob
-                # (note: this only goes down one level; this works for the existing time of day nests, but needs to be changed for reuse
-                for node, coeff in linkDict["top"]:
-                    if isinstance(linkDict[node], float):
-                        pass
-                    else:
-                        for subNode, subcoeff in linkDict[node]:
-                            probDict[subNode] = probDict[subNode] * probDict[node]
-                #print probDict 
-
-                
-                # Divide into time periods and write out               
-                for timePer in settings.cvmTimes:
-                    
-                    try:
-                        tours = probDict[timePer] * toursAllDay * scale
-                    except:
-                        print "Error in scaling tours:", probDict[timePer], toursAllDay, scale
-                        tours = 0
-                    cvmZonals[sector + "_" + timePer].append(round(tours, 2))
-                    
+            bases.append(sectorBase(sector, sectorInputs))
+
+    # ===========================================================================
+    # Calibration: only the land use type constants change between iterations,
+    # so each iteration just re-applies them to the sector base utilities
+    # ===========================================================================
+    if calibIters > 0:
+        cout = open(options.path + "/output/CVMCalibration.csv", "w")
+        calibOut = csv.writer(cout, excelOne)
+        calibOut.writerow(['Sector', 'Model', 'Iteration', 'LandUseType', 'Below', 'Within', 'Above',
+                           'Score', 'Average', 'Param', 'Tours'])
+
+        for iter in range(calibIters + 1):
+            print 15 * "-", "Calibration iteration", iter, 15 * "-"
+            for sector, base in zip(settings.cvmSectors, bases):
+                result = sectorTours(base, lu, adjDict[sector], adjSandagDict[sector])
+                rows, newAdj = calibrationScores(base, result, lu, rangeDict[sector], adjDict[sector])
+                for row in rows:
+                    calibOut.writerow([sector, row[0], iter] + row[1:])
+                    print sector, row[0], "LU", row[1], "below/within/above:", row[2], row[3], row[4]
+                # The last iteration only reports the final constants
+                if iter < calibIters:
+                    adjDict[sector] = newAdj
+        cout.close()
+
+        # Write out the calibrated constants
+        cout = open(options.path + "/output/CVMCalibratedConstants.csv", "w")
+        calibOut = csv.writer(cout, excelOne)
+        calibOut.writerow(['Sector', 'Model', 'Low dens', 'Residential', 'Retail/Comm', 'Industrial', 'Emp Node'])
+        for sector in settings.cvmSectors:
+            calibOut.writerow([sector, 'ShipNoShip'] + adjDict[sector][0])
+            calibOut.writerow([sector, 'GenPerEmployee'] + adjDict[sector][1])
+        cout.close()
+
+    # Merge the sectors in order
+    results = []
+    for sector, base in zip(settings.cvmSectors, bases):
+        result = sectorTours(base, lu, adjDict[sector], adjSandagDict[sector])
+        cvmZonals[sector + "_Ship"] = result["Ship"]
+        cvmZonals[sector + "_ToursEmp"] = result["ToursEmp"]
+        results.append(result)
+    print "Tour generation done. Time:", round(time.clock()-ts, 2)
 
 # ==========================================================================
 # Output CVM Gen and Accessibility file
 # ==========================================================================
-    print "Writing the data out...", round(time.clock(),2)
-    fout = open(cvmInputPath + "CVMToursAccess.csv", "w")
-    outFile = csv.writer(fout, excelOne)
-    
-    header = ["Taz"]
-    keyList = cvmZonals.keys()
-    keyList.sort()
-    header.extend(keyList)
-    outFile.writerow(header)
-    
-    for c in range(len(tazList)):    
-        rowOut = [tazList[c]]
-        for keyType in keyList:
-            rowOut.append(cvmZonals[keyType][c])
-        outFile.writerow(rowOut)
-    fout.close()
-    
+    # Only the tours depend on the scale factor, so each scale factor just
+    # rescales the tours already calculated
+    for scale in scaleList:
+        for sector, result in zip(settings.cvmSectors, results):
+            for timePer in settings.cvmTimes:
+                cvmZonals[sector + "_" + timePer] = np.array([round(t, 2) for t in (result[timePer] * scale).tolist()])
+
+        if len(scaleList) == 1:
+            fileName = cvmInputPath + "CVMToursAccess.csv"
+        else:
+            fileName = cvmInputPath + "CVMToursAccess_" + str(scale) + ".csv"
+        print "Writing the data out to", fileName, round(time.clock()-ts, 2)
+        writeToursAccess(fileName, tazList, cvmZonals, options.sidecar)
+
 #    tout.close()
 #    cout.close()
     print "DonE!"
-    
+
 if __name__ == '__main__':
     bigrun()
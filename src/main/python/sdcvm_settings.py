@@ -31,6 +31,12 @@ cvmAccDict = {"Acc_LE": ["Light_Mid", "TotEmp", 3.0],
               "Acc_HP": ["Heavy_Mid", "Pop", 1.0]
               }
 
+# Accessibility trace: writes the origin-destination terms of the accessibilities
+# for the trace zones (as origins) to cvmTraceFile; sdcvm.py -t overrides these
+cvmTraceOn = False
+cvmTraceZones = [1578, 88, 971, 2178, 3798, 2711, 4286]
+cvmTraceFile = "AccessVals.csv"
+
 # Calibration adjustment scale factors for tour generation
 # Factors by land use type:
 #     [Low dens, Residential, Retail/Comm, Industrial, Emp Node] 
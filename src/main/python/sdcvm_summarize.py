@@ -38,14 +38,13 @@ for t in range(len(tazList)):
 # Read in skims
 
 print "Reading in CVM skims. Time:", round(time.clock()-ts, 2)    
-skimDict = {}
+skims = sdcvm.SkimSet(tazList)
 skimList = []
 
 
 print "... Midday distance",  round(time.clock()-ts, 2) 
 skimList.append("Dist_Mid")
-skimDict = sdcvm.csvSkim(tazList, tazList, tazDict, tazDict,
-                         skimPath + "impldt_MD_Dist.TXT", skimDict, "Dist_Mid")
+skims.read("Dist_Mid", skimPath + "impldt_MD_Dist.TXT")
 
 
 bigDict = {}
@@ -77,7 +76,7 @@ for ind in settings.cvmSectors:
                 bigDict[key] = [0, 0, 0, 0]
 
             bigDict[key][1] = bigDict[key][1] + 1
-            bigDict[key][2] = bigDict[key][2] + skimDict["Dist_Mid"][iIdx][newjIdx]
+            bigDict[key][2] = bigDict[key][2] + skims["Dist_Mid"][iIdx][newjIdx]
             if trip == 1:
                 bigDict[key][0] = bigDict[key][0] + 1
             if iTaz == jTaz: